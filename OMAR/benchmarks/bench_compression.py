@@ -0,0 +1,84 @@
+"""Benchmark response compression of a large quick documents payload.
+
+Encodes the synthetic documents list from bench_json_response (about 5 MB of
+JSON by default) once, then times compressing it:
+
+  * gzip-<level> - one-shot gzip at levels 1, 6 (default) and 9
+  * stream-6     - gzip level 6 in 64 KiB chunks with a sync flush after each
+                   one, as the middleware does for NDJSON
+  * br-<q>       - brotli at qualities 4 (default) and 9, if installed
+
+Usage:
+    python OMAR/benchmarks/bench_compression.py [--mb 5] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_json_response import build_documents  # noqa: E402
+from omar.utils import compression as C  # noqa: E402
+
+_CHUNK = 64 * 1024
+
+
+def best_of(fn, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def one_shot(encoder, data: bytes) -> bytes:
+    return encoder.compress(data) + encoder.finish()
+
+
+def chunked(encoder, data: bytes) -> bytes:
+    out = [encoder.compress(data[i:i + _CHUNK]) + encoder.flush() for i in range(0, len(data), _CHUNK)]
+    out.append(encoder.finish())
+    return b''.join(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--mb', type=float, default=5.0)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    data = json.dumps(build_documents(int(args.mb * 1024 * 1024)), ensure_ascii=False).encode('utf-8')
+    stages = [
+        ('gzip-1', lambda: one_shot(C._GzipEncoder(1), data)),
+        ('gzip-6', lambda: one_shot(C._GzipEncoder(6), data)),
+        ('gzip-9', lambda: one_shot(C._GzipEncoder(9), data)),
+        ('stream-6', lambda: chunked(C._GzipEncoder(6), data)),
+    ]
+    if C.brotli is not None:
+        stages += [
+            ('br-4', lambda: one_shot(C._BrotliEncoder(4), data)),
+            ('br-9', lambda: one_shot(C._BrotliEncoder(9), data)),
+        ]
+    else:
+        print('brotli: not installed, skipped')
+
+    print(f"body={len(data) / 1024 / 1024:.2f} MB")
+    print(f"{'stage':>8} {'best ms':>9} {'out KB':>9} {'ratio':>7}")
+    for label, fn in stages:
+        out = fn()
+        best = best_of(fn, args.repeat)
+        print(f"{label:>8} {best * 1e3:>9.1f} {len(out) / 1024:>9.1f} {len(out) / len(data):>7.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""Benchmark DocumentSearchIndex over a synthetic chart.
+
+Generates N notes (2,000 by default) of about 400 words drawn from a
+Zipf-like vocabulary of several thousand terms, serves them from a fake
+gateway and times:
+
+  * build   - DocumentSearchIndex.build() over every note
+  * hydrate - hydrate_texts() for the 10% of notes built without text
+  * phrase  - quoted phrase queries (ms per query, position caches warm)
+  * page    - first page of 50 for broad term queries (ms per query)
+  * substr  - word fragments ("tfor" -> metformin), first page of 50
+  * fuzzy   - misspelled terms ("metfromin"), first page of 50
+  * shared  - another worker's view of the index: "before" builds it again,
+              "after" maps the published /dev/shm snapshot (skipped without
+              /dev/shm); publish is the builder's extra cost per snapshot
+
+For build/hydrate, "before" runs the previous _reindex_document, which
+scanned every posting list to drop a document and re-sorted the vocabulary
+after each one; "after" is the current index (forward doc -> terms map,
+vocabulary sorted once per batch, positional postings). For phrase, both
+sides are a full search(q, fields={'full'}) with every row and snippet built:
+"before" is the previous search, which lower-cased and substring-scanned
+every note per phrase; "after" is search() intersecting position lists. For page, "before" builds
+every result row and snippet and slices 50; "after" is search_page().
+For substr, "before" is a linear scan of every note's lower-cased text for
+the fragment; for fuzzy, "before" computes the edit distance to every
+vocabulary term. "after" is search_page() expanding through the trigram
+index (services/term_trigrams.py), whose one-time build and size are
+printed separately.
+
+Usage:
+    python OMAR/benchmarks/bench_document_index.py [--notes 2000] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from collections import defaultdict
+from typing import Any, Dict, List, Set
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+# Time the index, not the per-site hydration rate limit in front of the fake gateway
+os.environ.setdefault('DOCUMENT_HYDRATE_SITE_RATE', '0')
+
+from omar.services import document_index_snapshot as shared_index  # noqa: E402
+from omar.services.document_search_service import DocumentSearchIndex  # noqa: E402
+from omar.services.term_trigrams import TermTrigramIndex, edit_distance, max_edits  # noqa: E402
+
+_COMMON = ('patient', 'reports', 'chest', 'pain', 'denies', 'fever', 'metformin', 'a1c', 'follow',
+           'assessment', 'plan', 'hypertension', 'controlled', 'stable', 'blood', 'pressure',
+           'history', 'exam', 'normal', 'labs', 'reviewed', 'continue', 'medication', 'return')
+_TITLES = ('PRIMARY CARE NOTE', 'CARDIOLOGY CONSULT', 'NURSING NOTE', 'DISCHARGE SUMMARY', 'RADIOLOGY REPORT')
+_AUTHORS = ('PROVIDER,ONE', 'PROVIDER,TWO', 'NURSE,THREE', 'RESIDENT,FOUR')
+
+
+def build_vocabulary(size: int, rng: random.Random) -> List[str]:
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set(_COMMON)
+    while len(words) < size:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(4, 11))))
+    ordered = list(_COMMON) + sorted(words - set(_COMMON))
+    return ordered
+
+
+def build_entries(notes: int, words_per_note: int, missing_ratio: float, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    vocab = build_vocabulary(max(2000, notes * 3), rng)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    entries: List[Dict[str, Any]] = []
+    for i in range(notes):
+        words = rng.choices(vocab, weights=weights, k=words_per_note)
+        text = '\n'.join(' '.join(words[j:j + 12]) for j in range(0, len(words), 12))
+        missing = rng.random() < missing_ratio
+        entries.append({
+            'doc_id': f'urn:va:document:500:1:{1000 + i}',
+            'rpc_id': str(1000 + i),
+            'quick': {
+                'title': f'{_TITLES[i % len(_TITLES)]} {i % 97}',
+                'author': _AUTHORS[i % len(_AUTHORS)],
+                'documentType': 'Progress Note',
+                'documentClass': 'PROGRESS NOTES',
+                'date': f'20{10 + i % 15:02d}-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}T09:30:00Z',
+            },
+            'raw': {'uid': f'urn:va:document:500:1:{1000 + i}'},
+            'text': '' if missing else text,
+            '_text': text,
+        })
+    return entries
+
+
+class FakeGateway:
+    station = '500'
+    duz = '983'
+
+    def __init__(self, entries: List[Dict[str, Any]]) -> None:
+        self.entries = entries
+        self.texts = {e['rpc_id']: e['_text'].split('\n') for e in entries}
+
+    def get_document_index_entries(self, dfn: str, params: Any = None) -> List[Dict[str, Any]]:
+        return [dict(e) for e in self.entries]
+
+    def get_document_texts(self, dfn: str, ids: List[str]) -> Dict[str, List[str]]:
+        return {i: self.texts[i] for i in ids if i in self.texts}
+
+
+class BeforeIndex(DocumentSearchIndex):
+    """The previous reindex: scan every posting list, re-sort the vocabulary per document."""
+
+    def _reindex_document(self, doc_id: str) -> None:
+        for token in list(self.postings.keys()):
+            bucket = self.postings[token]
+            if doc_id in bucket:
+                del bucket[doc_id]
+                if not bucket:
+                    self.postings.pop(token, None)
+        tokens = self._tokenize(self.text.get(doc_id, ''))
+        self.doc_len[doc_id] = len(tokens)
+        for token in tokens:
+            self.postings[token][doc_id] += 1
+        meta_entry = self.meta.get(doc_id, {}) or {}
+        for field, boost in (('title', 3), ('author', 2), ('type', 2), ('class', 1)):
+            for token in self._tokenize(str(meta_entry.get(field) or '')):
+                self.postings[token][doc_id] += boost
+        self.vocab_sorted = sorted(self.postings.keys())
+
+
+_PHRASES = ('"blood pressure"', '"chest pain"', '"follow up plan"', '"reports patient denies"')
+_TERMS = ('chest pain', 'metf', 'hypert', 'patient stable')
+_FRAGMENTS = ('tfor', 'ertens', 'edicat', 'ssessm')
+_TYPOS = ('metfromin', 'hypertensoin', 'medicaton', 'asessment')
+
+
+def substring_scan(index: DocumentSearchIndex, q: str) -> List[str]:
+    """Lower-case every note and substring-search it for ``q``."""
+    phrase = q.strip('"').lower()
+    return [doc_id for doc_id, full in index.text.items() if full and phrase in full.lower()]
+
+
+def _previous_snippet(text: str, cues: List[str], width: int = 180) -> str:
+    if not text or not cues:
+        return ''
+    low = text.lower()
+    for c in cues:
+        c = c.strip().lower()
+        if not c:
+            continue
+        i = low.find(c)
+        if i != -1:
+            start = max(0, i - width // 2)
+            end = min(len(text), i + len(c) + width // 2)
+            prefix = '...' if start > 0 else ''
+            suffix = '...' if end < len(text) else ''
+            return prefix + text[start:end].replace('\n', ' ') + suffix
+    return text[:width] + ('...' if len(text) > width else '')
+
+
+def previous_search(index: DocumentSearchIndex, q: str, fields: Set[str]) -> List[Dict[str, Any]]:
+    """The previous search(): BM25-lite terms, substring-scanned phrases, every row built."""
+    phrases, terms = index._iter_terms(q)
+    scores: Dict[str, float] = defaultdict(float)
+    n = max(1, len(index.doc_len))
+    avg_len = max(1.0, index._avg_len())
+    for t in terms:
+        for et in set(index._expand_prefix(t)):
+            postings = index.postings.get(et) or {}
+            if not postings:
+                continue
+            idf = max(0.0, math.log((n - len(postings) + 0.5) / (len(postings) + 0.5) + 1.0))
+            for doc_id, tf in postings.items():
+                scores[doc_id] += (tf / (0.5 + 1.5 * (index.doc_len.get(doc_id, 0) / avg_len))) * idf
+    for phr in phrases:
+        phr_l = phr.lower()
+        for doc_id, full in index.text.items():
+            if 'full' in fields and full and phr_l in full.lower():
+                scores[doc_id] += 3.0
+        if 'title' in fields:
+            for doc_id, m in index.meta.items():
+                if (m.get('title') or '').lower().find(phr_l) != -1:
+                    scores[doc_id] += 2.0
+    items: List[Dict[str, Any]] = []
+    for doc_id, score in sorted(scores.items(), key=lambda kv: kv[1], reverse=True):
+        meta = index.meta.get(doc_id, {})
+        items.append({
+            'doc_id': doc_id,
+            'score': float(score),
+            'snippet': _previous_snippet(index.text.get(doc_id, ''), phrases or terms),
+            'title': meta.get('title') or None,
+            'date': meta.get('date') or None,
+        })
+    return items
+
+
+def vocabulary_scan(index: DocumentSearchIndex, q: str) -> List[str]:
+    """Edit distance from a misspelled term to every vocabulary term."""
+    limit = max_edits(q)
+    return [term for term in index.vocab_sorted if edit_distance(q, term, limit) <= limit]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--notes', type=int, default=2000)
+    ap.add_argument('--words', type=int, default=400)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    entries = build_entries(args.notes, args.words, missing_ratio=0.1)
+    gateway = FakeGateway(entries)
+    missing = [e['doc_id'] for e in entries if not e['text']]
+
+    def _build(cls) -> DocumentSearchIndex:
+        index = cls('1', gateway=gateway)
+        index.build()
+        return index
+
+    def _hydrate(cls) -> None:
+        index = _build(cls)
+        t0 = time.perf_counter()
+        index.hydrate_texts(missing)
+        return time.perf_counter() - t0
+
+    sample = _build(DocumentSearchIndex)
+    print(f"notes={args.notes} vocabulary={len(sample.postings)} missing_text={len(missing)}")
+    print(f"{'stage':>8} {'index':>7} {'best ms':>10}")
+    for label, cls in (('before', BeforeIndex), ('after', DocumentSearchIndex)):
+        best = best_of(lambda: _build(cls), args.repeat)
+        print(f"{'build':>8} {label:>7} {best * 1e3:>10.1f}")
+    for label, cls in (('before', BeforeIndex), ('after', DocumentSearchIndex)):
+        best = min(_hydrate(cls) for _ in range(args.repeat))
+        print(f"{'hydrate':>8} {label:>7} {best * 1e3:>10.1f}")
+    sample.hydrate_texts(missing)
+    for label, fn in (('before', lambda: [previous_search(sample, q, {'full'}) for q in _PHRASES]),
+                      ('after', lambda: [sample.search(q, fields={'full'}) for q in _PHRASES])):
+        best = best_of(fn, args.repeat)
+        print(f"{'phrase':>8} {label:>7} {best * 1e3 / len(_PHRASES):>10.1f}")
+    for label, fn in (('before', lambda: [sample.search(q)[:50] for q in _TERMS]),
+                      ('after', lambda: [sample.search_page(q, limit=50) for q in _TERMS])):
+        best = best_of(fn, args.repeat)
+        print(f"{'page':>8} {label:>7} {best * 1e3 / len(_TERMS):>10.1f}")
+    best = best_of(lambda: TermTrigramIndex(sample.vocab_sorted), args.repeat)
+    trigrams = sample._term_trigrams()
+    print(f"{'trigram':>8} {'build':>7} {best * 1e3:>10.1f}")
+    for label, fn in (('before', lambda: [substring_scan(sample, q) for q in _FRAGMENTS]),
+                      ('after', lambda: [sample.search_page(q, limit=50) for q in _FRAGMENTS])):
+        best = best_of(fn, args.repeat)
+        print(f"{'substr':>8} {label:>7} {best * 1e3 / len(_FRAGMENTS):>10.1f}")
+    for label, fn in (('before', lambda: [vocabulary_scan(sample, q) for q in _TYPOS]),
+                      ('after', lambda: [sample.search_page(q, limit=50) for q in _TYPOS])):
+        best = best_of(fn, args.repeat)
+        print(f"{'fuzzy':>8} {label:>7} {best * 1e3 / len(_TYPOS):>10.1f}")
+    print(f"trigrams={len(trigrams.grams)} entries={trigrams.entries()} size={trigrams.size() / 1024 / 1024:.1f} MB")
+    if not os.path.isdir('/dev/shm'):
+        print("shared: /dev/shm not available, skipped")
+        return
+    best = best_of(lambda: _build(DocumentSearchIndex).search_page(_TERMS[0], limit=50), args.repeat)
+    print(f"{'shared':>8} {'before':>7} {best * 1e3:>10.1f}")
+    with tempfile.TemporaryDirectory(dir='/dev/shm') as shm_dir:
+        os.environ['DOCUMENT_INDEX_SHARED'] = '1'
+        os.environ['DOCUMENT_INDEX_SHM_DIR'] = shm_dir
+        best = best_of(lambda: shared_index.write_snapshot(sample), args.repeat)
+        print(f"{'publish':>8} {'after':>7} {best * 1e3:>10.1f}")
+
+        def _adopt() -> None:
+            reader = DocumentSearchIndex('1', gateway=gateway)
+            assert reader.adopt_shared()
+            reader.search_page(_TERMS[0], limit=50)
+
+        best = best_of(_adopt, args.repeat)
+        print(f"{'shared':>8} {'after':>7} {best * 1e3:>10.1f}")
+        size = shared_index.snapshot_stats().get('bytes', 0)
+        print(f"snapshot={size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark JSON response encoding with context injection.
+
+Builds a synthetic quick documents list with full note text (about 5 MB of
+JSON by default) and times turning it into a response with a context block:
+
+  * before       - Flask's default provider (sorted keys) followed by the old
+                   after_request hook: get_json, merge_context, json.dumps
+  * jsonify      - OmarJSONProvider.response: Flask's output format, context
+                   merged while encoding (one pass)
+  * stdlib       - fast_jsonify with the stdlib encoder (no key sorting, UTF-8)
+  * orjson       - the same with the orjson backend (skipped if not installed)
+
+Usage:
+    python OMAR/benchmarks/bench_json_response.py [--mb 5] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from flask import Blueprint, Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from omar.utils.context import context_blueprint, merge_context  # noqa: E402
+from omar.utils.json_provider import OmarJSONProvider  # noqa: E402
+
+_WORDS = ('patient', 'reports', 'chest', 'pain', 'denies', 'fever', 'metformin', 'a1c', 'follow-up',
+          'assessment', 'plan', 'hypertension', 'controlled', 'café', 'µg', 'stable')
+
+
+def build_documents(target_bytes: int) -> List[Dict[str, Any]]:
+    docs: List[Dict[str, Any]] = []
+    size = 0
+    i = 0
+    while size < target_bytes:
+        text = ' '.join(_WORDS[(i * 7 + k) % len(_WORDS)] for k in range(400))
+        doc = {
+            'uid': f'urn:va:document:500:1:{1000 + i}',
+            'docId': str(1000 + i),
+            'title': f'PRIMARY CARE NOTE {i}',
+            'documentClass': 'PROGRESS NOTES',
+            'documentType': 'Progress Note',
+            'date': f'2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}T09:30:00Z',
+            'author': 'PROVIDER,ONE',
+            'status': 'COMPLETED',
+            'encounterName': 'GEN MED Oct 01, 2024',
+            'text': text,
+        }
+        size += len(json.dumps(doc))
+        docs.append(doc)
+        i += 1
+    return docs
+
+
+def best_of(fn, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--mb', type=float, default=5.0)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    docs = build_documents(int(args.mb * 1024 * 1024))
+    app = Flask(__name__)
+    bp = context_blueprint(Blueprint('bench', __name__))
+    bp.add_url_rule('/<dfn>/quick/documents', 'docs', lambda dfn: '')
+    app.register_blueprint(bp, url_prefix='/bench')
+
+    default_provider = DefaultJSONProvider(app)
+
+    def _before() -> bytes:
+        resp = default_provider.response(docs)
+        data = resp.get_json(silent=True)
+        wrapped = merge_context(data)
+        resp.set_data(json.dumps(wrapped, ensure_ascii=False))
+        return resp.get_data()
+
+    stages = [('before', _before)]
+    for backend in ('stdlib', 'orjson'):
+        os.environ['OMAR_JSON_BACKEND'] = backend
+        provider = OmarJSONProvider(app)
+        if provider.backend != backend:
+            print(f"{backend}: not installed, skipped")
+            continue
+        if backend == 'stdlib':
+            stages.append(('jsonify', lambda p=provider: p.response(docs).get_data()))
+        stages.append((backend, lambda p=provider: p.fast_response(docs).get_data()))
+
+    with app.test_request_context('/bench/1/quick/documents'):
+        print(f"documents={len(docs)}")
+        print(f"{'stage':>7} {'best ms':>9} {'body MB':>8}")
+        for label, fn in stages:
+            body = fn()
+            best = best_of(fn, args.repeat)
+            print(f"{label:>7} {best * 1e3:>9.1f} {len(body) / 1024 / 1024:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
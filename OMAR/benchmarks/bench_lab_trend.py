@@ -0,0 +1,125 @@
+"""Benchmark lab trend queries: columnar LabStore vs scanning quick rows.
+
+Builds synthetic quick lab rows (50k by default, spread over ~40 tests and ten
+years), packs them into a LabStore once, then times per-query latency for
+one-LOINC trends with and without a one-year window, against the list scan the
+quick/labs path does (date range + LOINC match + min/max/last in Python).
+
+Usage:
+    python OMAR/benchmarks/bench_lab_trend.py [--rows 50000] [--tests 40] [--repeat 200]
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from omar.services.lab_store import LabStore  # noqa: E402
+from omar.services.transforms import QuickList  # noqa: E402
+
+_BASE_EPOCH = 1_577_836_800.0  # 2020-01-01T00:00:00Z
+_SPAN = 10 * 365 * 86400.0
+
+
+def build_rows(count: int, tests: int) -> QuickList:
+    rows: List[Dict[str, Any]] = []
+    epochs: List[float] = []
+    for i in range(count):
+        t = i % tests
+        epoch = _BASE_EPOCH + (i * 7919 % count) / count * _SPAN
+        value = 3.5 + ((i * 31) % 40) / 10.0
+        rows.append({
+            'name': f'TEST {t}',
+            'test': f'TEST {t}',
+            'result': f'{value:.1f}' if i % 50 else 'CANC',
+            'units': 'mmol/L',
+            'referenceRange': '3.5 - 5.1',
+            'abnormal': value > 5.1,
+            'loinc': f'{1000 + t}-{t % 10}',
+            'source': 'vpr',
+        })
+        epochs.append(epoch)
+    return QuickList(rows, epochs)
+
+
+def _num(x: Any) -> Optional[float]:
+    try:
+        return float(x)
+    except Exception:
+        return None
+
+
+def scan_trend(rows: QuickList, code: str, start: Optional[float], end: Optional[float]) -> Dict[str, Any]:
+    picked = []
+    for r, e in zip(rows, rows._epochs):
+        if r.get('loinc') != code:
+            continue
+        if e is None or (start is not None and e < start) or (end is not None and e > end):
+            continue
+        picked.append((e, r))
+    picked.sort(key=lambda pair: pair[0])
+    picked = [r for _, r in picked]
+    nums = [v for v in (_num(r.get('result')) for r in picked) if v is not None]
+    return {
+        'count': len(picked),
+        'min': min(nums) if nums else None,
+        'max': max(nums) if nums else None,
+        'last': picked[-1] if picked else None,
+    }
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--rows', type=int, default=50000)
+    ap.add_argument('--tests', type=int, default=40)
+    ap.add_argument('--repeat', type=int, default=200)
+    args = ap.parse_args()
+
+    rows = build_rows(args.rows, args.tests)
+    t0 = time.perf_counter()
+    store = LabStore(rows, generation=1)
+    build_s = time.perf_counter() - t0
+    print(f"rows={len(store)} tests={len(store.tests)} build={build_s * 1e3:.1f} ms")
+
+    code = '1007-7'
+    year_start = _BASE_EPOCH + 5 * 365 * 86400.0
+    year_end = year_start + 365 * 86400.0
+    cases = (
+        ('all dates', None, None),
+        ('1-year window', year_start, year_end),
+    )
+    print(f"{'case':>14} {'impl':>16} {'best ms':>9}")
+    scan_repeat = max(3, args.repeat // 40)
+    for label, start, end in cases:
+        ref = scan_trend(rows, code, start, end)
+        got = store.query(loinc_codes=[code], start=start, end=end, include_series=False)[0]
+        if (ref['count'], ref['min'], ref['max']) != (got['count'], got['min'], got['max']):
+            print(f"  !! mismatch for {label}: scan={ref['count'], ref['min'], ref['max']} store={got['count'], got['min'], got['max']}")
+        timings = (
+            ('scan', best_of(lambda: scan_trend(rows, code, start, end), scan_repeat)),
+            ('store aggregates', best_of(lambda: store.query(loinc_codes=[code], start=start, end=end, include_series=False), args.repeat)),
+            ('store + series', best_of(lambda: store.query(loinc_codes=[code], start=start, end=end), args.repeat)),
+        )
+        for impl, best in timings:
+            print(f"{label:>14} {impl:>16} {best * 1e3:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Benchmark order classification in vpr_to_quick_orders.
+
+Builds a synthetic 10k-order payload with a realistic mix of services,
+display groups, order types, statuses and a few hundred distinct order names,
+normalizes it the way the socket gateway does, then times:
+
+  * classify - status bucket + category for every order (the per-order calls
+               vpr_to_quick_orders makes),
+  * no-memo  - the same calls bypassing the memo (matchers only), and
+  * quick    - the whole vpr_to_quick_orders transform.
+
+"cold" clears the memo before each run; within one 10k payload it still
+warms up after the first few hundred distinct (service, group, type, name).
+
+Usage:
+    python OMAR/benchmarks/bench_order_classify.py [--orders 10000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from omar.gateways.vista_dual_socket_gateway import _normalize_domain_item  # noqa: E402
+from omar.gateways.vpr_xml_parser import parse_vpr_results_xml  # noqa: E402
+from omar.services import transforms as T  # noqa: E402
+
+_KINDS = (
+    ('LR', 'CH', 'LABORATORY', ('CBC', 'BASIC METABOLIC PANEL', 'HEMOGLOBIN A1C', 'BLOOD CULTURE', 'LIPID PANEL')),
+    ('PSO', 'O RX', 'OUTPATIENT MEDICATIONS', ('METFORMIN 500MG TAB', 'LISINOPRIL 10MG TAB', 'ATORVASTATIN 40MG TAB')),
+    ('PSJ', 'UD RX', 'INPATIENT MEDICATIONS', ('HEPARIN 5000 UNIT INJ', 'CEFAZOLIN 1GM IV', 'ACETAMINOPHEN 650MG')),
+    ('RA', 'XRAY', 'IMAGING', ('CHEST 2 VIEWS', 'CT HEAD W/O CONTRAST', 'MRI LUMBAR SPINE')),
+    ('GMRC', 'CSLT', 'CONSULTS', ('CARDIOLOGY CONSULT', 'PHYSICAL THERAPY REFERRAL')),
+    ('OR', 'NURS', 'NURSING', ('VITAL SIGNS Q4H', 'STRICT I&amp;O', 'FALL PRECAUTIONS')),
+    ('OR', 'DIET', 'DIETETICS', ('REGULAR DIET', 'NPO AFTER MIDNIGHT')),
+    ('SD', 'SCH', 'SCHEDULING', ('RETURN TO CLINIC 3 MONTHS',)),
+)
+_STATUSES = (
+    ('ACTIVE', 'actv'), ('PENDING', 'pend'), ('COMPLETE', 'comp'), ('DISCONTINUED', 'dc'),
+    ('EXPIRED', 'exp'), ('UNRELEASED', 'unr'), ('HOLD', 'hold'), ('LAPSED', 'laps'),
+)
+
+
+def build_orders_xml(count: int) -> str:
+    parts: List[str] = ['<results version="1.13" timeZone="-0700">', f'<orders total="{count}">']
+    for i in range(count):
+        service, group, type_name, names = _KINDS[i % len(_KINDS)]
+        # A few hundred distinct names: base name plus a variant suffix
+        name = f'{names[i % len(names)]} #{i % 37}' if i % 4 == 0 else names[i % len(names)]
+        status, code = _STATUSES[(i // 3) % len(_STATUSES)]
+        day = f'{(i % 28) + 1:02d}'
+        parts.append(
+            '<order>'
+            f'<uid value="urn:va:order:500:1:{30000 + i}"/>'
+            f'<id value="{30000 + i}"/>'
+            f'<name value="{name}" code="{1000 + i % 300}"/>'
+            f'<group value="{group}"/>'
+            f'<service value="{service}"/>'
+            f'<type name="{type_name}" code="{service}"/>'
+            f'<status name="{status}" code="urn:va:order-status:{code}" vuid="{4500000 + i % 8}"/>'
+            f'<entered value="32401{day}.0915"/>'
+            f'<start value="32401{day}.1000"/>'
+            '<provider name="PROVIDER,ONE" code="983" id="983"/>'
+            '<facility code="500" name="CAMP MASTER"/>'
+            '<location name="GEN MED" code="23"/>'
+            '<content>Take one tablet by mouth daily</content>'
+            '</order>'
+        )
+    parts.append('</orders></results>')
+    return ''.join(parts)
+
+
+def load_orders(count: int) -> List[Dict[str, Any]]:
+    items = parse_vpr_results_xml(build_orders_xml(count), domain='order')['items']
+    return [_normalize_domain_item('order', it) for it in items]
+
+
+def classify_all(items: List[Dict[str, Any]], *, memo: bool = True) -> None:
+    bucket = T._order_status_bucket
+    categorize = T._order_categorize
+    if not memo:
+        # Compiled matchers without the memo layer (no-op before it existed)
+        bucket = getattr(bucket, '__wrapped__', bucket)
+        categorize = getattr(categorize, '__wrapped__', categorize)
+    for it in items:
+        status = it.get('status') if isinstance(it.get('status'), dict) else {}
+        bucket(status.get('name'), status.get('code'))
+        type_node = it.get('type') if isinstance(it.get('type'), dict) else {}
+        categorize(it.get('service'), it.get('group'), type_node.get('name'), it.get('orderName') or it.get('name'))
+
+
+def _clear_memo() -> None:
+    for fn in (T._order_status_bucket, T._order_categorize):
+        clear = getattr(fn, 'cache_clear', None)
+        if clear:
+            clear()
+
+
+def best_of(fn, repeat: int, *, cold: bool) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        if cold:
+            _clear_memo()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--orders', type=int, default=10000)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    items = load_orders(args.orders)
+    payload = {'items': items}
+    print(f"orders={len(items)} memoized={'yes' if hasattr(T._order_categorize, 'cache_clear') else 'no'}")
+    print(f"{'stage':>9} {'cache':>6} {'best ms':>9} {'us/order':>9}")
+    stages = (
+        ('classify', lambda: classify_all(items)),
+        ('no-memo', lambda: classify_all(items, memo=False)),
+        ('quick', lambda: T.vpr_to_quick_orders(payload)),
+    )
+    for label, fn in stages:
+        for cold in (True, False):
+            best = best_of(fn, args.repeat, cold=cold)
+            print(f"{label:>9} {'cold' if cold else 'warm':>6} {best * 1e3:>9.1f} {best / len(items) * 1e6:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark the vitals series endpoint path against returning every reading.
+
+Builds synthetic quick vitals (blood pressure, pulse, weight; 40k readings by
+default), packs them into a VitalsSeries once, then reports for each point
+budget the query + downsample time and the serialized JSON size, next to
+the size of the full quick vitals list that /quick/vitals returns.
+
+Usage:
+    python OMAR/benchmarks/bench_vitals_series.py [--rows 40000] [--budgets 200,500,2000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from omar.services.transforms import QuickList  # noqa: E402
+from omar.services.vitals_series import VitalsSeries  # noqa: E402
+
+_BASE_EPOCH = 1_577_836_800.0  # 2020-01-01T00:00:00Z
+
+
+def build_rows(count: int) -> QuickList:
+    rows: List[Dict[str, Any]] = []
+    epochs: List[float] = []
+    for i in range(count):
+        epoch = _BASE_EPOCH + i * 3600.0
+        iso = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+        kind = i % 3
+        if kind == 0:
+            value = f'{120 + int(20 * math.sin(i / 50.0)) + i % 7}/{78 + i % 9}'
+            rows.append({'type': 'Blood Pressure', 'value': value, 'units': 'mmHg', 'code': 'BP'})
+        elif kind == 1:
+            rows.append({'type': 'Pulse', 'value': str(70 + int(15 * math.sin(i / 80.0)) + i % 5), 'units': 'bpm', 'code': 'P'})
+        else:
+            rows.append({'type': 'Weight', 'value': f'{180 + 10 * math.sin(i / 900.0):.1f}', 'units': 'lbs', 'code': 'WT'})
+        rows[-1]['takenDate'] = iso
+        epochs.append(epoch)
+    return QuickList(rows, epochs)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--rows', type=int, default=40000)
+    ap.add_argument('--budgets', default='200,500,2000')
+    ap.add_argument('--repeat', type=int, default=20)
+    args = ap.parse_args()
+    budgets = [int(b) for b in args.budgets.split(',') if b.strip()]
+
+    rows = build_rows(args.rows)
+    full_json = json.dumps(rows)
+    t0 = time.perf_counter()
+    store = VitalsSeries(rows, generation=1)
+    build_s = time.perf_counter() - t0
+    print(f"readings={len(store)} series={len(store.series)} build={build_s * 1e3:.1f} ms")
+    print(f"full /quick/vitals list: {len(full_json) / 1024:.0f} KiB")
+
+    print(f"{'method':>7} {'budget':>7} {'points':>7} {'query ms':>9} {'json KiB':>9}")
+    for method in ('lttb', 'minmax'):
+        for budget in budgets:
+            series = store.query(budget=budget, method=method)
+            best = best_of(lambda: store.query(budget=budget, method=method), args.repeat)
+            size = len(json.dumps(series))
+            points = sum(s['returned'] for s in series)
+            print(f"{method:>7} {budget:>7} {points:>7} {best * 1e3:>9.2f} {size / 1024:>9.0f}")
+    series = store.query(budget=0)
+    best = best_of(lambda: store.query(budget=0), max(1, args.repeat // 4))
+    print(f"{'none':>7} {'-':>7} {sum(s['returned'] for s in series):>7} {best * 1e3:>9.2f} {len(json.dumps(series)) / 1024:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark lazy VPR item views against eager normalization.
+
+For lab and document payloads this times "normalize every item + build the
+quick list" (what list endpoints do) with VISTA_LAZY_VPR_ITEMS off and on,
+and reports tracemalloc peak for the same work. Documents carry a nested text
+block that quick lists never read, which is where lazy views pay off most.
+
+Usage:
+    python OMAR/benchmarks/bench_vpr_lazy_items.py [--items 5000] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+BENCH_DIR = Path(__file__).resolve().parent
+if str(BENCH_DIR) not in sys.path:
+    sys.path.insert(0, str(BENCH_DIR))
+
+from bench_vpr_xml_parse import build_lab_xml  # noqa: E402
+from omar.gateways import vista_dual_socket_gateway as socket_gw  # noqa: E402
+from omar.gateways.vpr_xml_parser import parse_vpr_results_xml  # noqa: E402
+from omar.services.transforms import vpr_to_quick_labs, vpr_to_quick_notes  # noqa: E402
+
+
+def build_document_xml(count: int) -> str:
+    body = ' '.join(['Patient seen for follow up of chronic conditions.'] * 40)
+    parts: List[str] = ['<results version="1.13" timeZone="-0700">', f'<documents total="{count}">']
+    for i in range(count):
+        parts.append(
+            '<document>'
+            f'<id value="{4000 + i}"/><localId value="{4000 + i}"/>'
+            f'<uid value="urn:va:document:500:1:{4000 + i}"/>'
+            '<localTitle value="PRIMARY CARE NOTE"/><documentClass value="PROGRESS NOTES"/>'
+            '<documentTypeName value="Progress Note"/><statusName value="COMPLETED"/>'
+            f'<referenceDateTime value="3240{(i % 12) + 1:02d}{(i % 28) + 1:02d}1015"/>'
+            '<facility code="500" name="CAMP MASTER"/>'
+            '<nationalTitle code="4696" name="PRIMARY CARE NOTE"/>'
+            '<encounter name="GEN MED Jan 01, 2024" uid="urn:va:visit:500:1:1"/>'
+            '<clinicians><clinician name="PROVIDER,ONE" role="A" uid="urn:va:user:500:983"/>'
+            '<clinician name="PROVIDER,ONE" role="S" signedDateTime="3240101.1100"/></clinicians>'
+            f'<text><content>{body}</content><dateTime value="3240101.1015"/><status value="COMPLETED"/></text>'
+            '</document>'
+        )
+    parts.append('</documents></results>')
+    return ''.join(parts)
+
+
+def run(domain: str, items: List[Dict[str, Any]], quick: Callable[[Any], Any]) -> Any:
+    normalize_item = socket_gw._domain_item_factory(domain)
+    normalized = [normalize_item(it) for it in items]
+    return quick({'items': normalized})
+
+
+def measure(domain: str, items: List[Dict[str, Any]], quick: Callable[[Any], Any], repeat: int) -> Dict[str, float]:
+    best = float('inf')
+    for _ in range(repeat):
+        batch = copy.deepcopy(items)
+        t0 = time.perf_counter()
+        run(domain, batch, quick)
+        best = min(best, time.perf_counter() - t0)
+    batch = copy.deepcopy(items)
+    tracemalloc.start()
+    run(domain, batch, quick)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'best': best, 'peak_mb': peak / (1024 * 1024)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--items', type=int, default=5000)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+
+    cases = (
+        ('lab', build_lab_xml(args.items), vpr_to_quick_labs),
+        ('document', build_document_xml(args.items), vpr_to_quick_notes),
+    )
+    print(f"{'domain':>9} {'mode':>6} {'best s':>8} {'us/item':>8} {'peak MB':>8}")
+    for domain, xml_text, quick in cases:
+        items = parse_vpr_results_xml(xml_text, domain=domain)['items']
+        for lazy in (False, True):
+            socket_gw._LAZY_VPR_ITEMS = lazy
+            res = measure(domain, items, quick, args.repeat)
+            mode = 'lazy' if lazy else 'eager'
+            per_item = res['best'] / max(1, len(items)) * 1e6
+            print(f"{domain:>9} {mode:>6} {res['best']:>8.3f} {per_item:>8.1f} {res['peak_mb']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
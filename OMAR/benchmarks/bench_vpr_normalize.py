@@ -0,0 +1,86 @@
+"""Benchmark per-item VPR normalization on lab and order payloads.
+
+Parses synthetic <results> XML once, then times the socket gateway's
+per-domain item normalization (_normalize_domain_item) over every item and
+reports the cost per item in microseconds.
+
+Usage:
+    python OMAR/benchmarks/bench_vpr_normalize.py [--items 5000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+BENCH_DIR = Path(__file__).resolve().parent
+if str(BENCH_DIR) not in sys.path:
+    sys.path.insert(0, str(BENCH_DIR))
+
+from bench_vpr_xml_parse import build_lab_xml  # noqa: E402
+from omar.gateways.vista_dual_socket_gateway import _normalize_domain_item  # noqa: E402
+from omar.gateways.vpr_xml_parser import parse_vpr_results_xml  # noqa: E402
+
+
+def build_order_xml(count: int) -> str:
+    parts: List[str] = ['<results version="1.13" timeZone="-0700">', f'<orders total="{count}">']
+    for i in range(count):
+        parts.append(
+            '<order>'
+            f'<uid value="urn:va:order:500:1:{30000 + i}"/>'
+            f'<localId value="{30000 + i}"/>'
+            f'<name value="{"CBC" if i % 3 else "POTASSIUM CHLORIDE 20MEQ TAB"}"/>'
+            f'<displayGroup value="{"CH" if i % 3 else "O RX"}"/>'
+            f'<service value="{"LR" if i % 3 else "PSO"}"/>'
+            '<statusName value="ACTIVE"/><statusCode value="urn:va:order-status:actv"/>'
+            f'<entered value="3240{(i % 12) + 1:02d}{(i % 28) + 1:02d}0915"/>'
+            f'<start value="3240{(i % 12) + 1:02d}{(i % 28) + 1:02d}1000"/>'
+            '<provider name="PROVIDER,ONE" uid="urn:va:user:500:983"/>'
+            '<facility code="500" name="CAMP MASTER"/>'
+            '<location name="GEN MED" uid="urn:va:location:500:23"/>'
+            '<content>Take one tablet by mouth daily</content>'
+            '<clinicians><clinician name="PROVIDER,ONE" role="S" signedDateTime="3240101.1000"/></clinicians>'
+            '<results><result uid="urn:va:lab:500:1:CH;1" name="CBC" status="COMPLETE"/></results>'
+            '</order>'
+        )
+    parts.append('</orders></results>')
+    return ''.join(parts)
+
+
+def time_domain(domain: str, items: List[Dict[str, Any]], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        batch = copy.deepcopy(items)
+        t0 = time.perf_counter()
+        for it in batch:
+            _normalize_domain_item(domain, it)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--items', type=int, default=5000)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    payloads = {
+        'lab': build_lab_xml(args.items),
+        'order': build_order_xml(args.items),
+    }
+    print(f"{'domain':>7} {'items':>7} {'total s':>9} {'us/item':>9}")
+    for domain, xml_text in payloads.items():
+        items = parse_vpr_results_xml(xml_text, domain=domain)['items']
+        best = time_domain(domain, items, args.repeat)
+        print(f"{domain:>7} {len(items):>7} {best:>9.3f} {best / max(1, len(items)) * 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark VPR <results> XML parsing: streaming parser vs xmltodict.
+
+Builds synthetic lab payloads (1k/10k/50k items by default) and reports wall
+time and tracemalloc peak for:
+
+  * legacy  - xmltodict.parse of the whole document followed by a recursive
+              plain-dict copy of every item (the previous implementation)
+  * stream  - gateways.vpr_xml_parser.parse_vpr_results_xml (XMLPullParser)
+
+Usage:
+    python OMAR/benchmarks/bench_vpr_xml_parse.py [--sizes 1000,10000,50000] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import xmltodict  # noqa: E402
+
+from omar.gateways.vpr_xml_parser import parse_vpr_results_xml  # noqa: E402
+
+
+def build_lab_xml(count: int) -> str:
+    parts: List[str] = ['<results version="1.13" timeZone="-0700">', f'<labs total="{count}">']
+    for i in range(count):
+        parts.append(
+            '<lab>'
+            f'<id value="{i}"/>'
+            f'<uid value="urn:va:lab:500:1:CH;{6879000 - i};{i}"/>'
+            f'<observed value="3240{(i % 12) + 1:02d}{(i % 28) + 1:02d}0830"/>'
+            '<test value="POTASSIUM"/><loinc value="2823-3"/>'
+            f'<result value="{3.5 + (i % 20) / 10:.1f}"/>'
+            '<units value="mmol/L"/><low value="3.5"/><high value="5.1"/>'
+            '<specimen name="SERUM" code="0X500"/>'
+            '<facility code="500" name="CAMP MASTER"/>'
+            '<comment>Reference ranges updated &amp; verified.</comment>'
+            '</lab>'
+        )
+    parts.append('</labs></results>')
+    return ''.join(parts)
+
+
+def _to_plain(x: Any):
+    if isinstance(x, dict):
+        return {k: _to_plain(v) for k, v in x.items()}
+    if isinstance(x, list):
+        return [_to_plain(v) for v in x]
+    return x
+
+
+def legacy_parse(xml_text: str) -> List[Dict[str, Any]]:
+    parsed = xmltodict.parse(xml_text)
+    items = parsed['results']['labs']['lab']
+    if not isinstance(items, list):
+        items = [items]
+    return [_to_plain(it) for it in items]
+
+
+def stream_parse(xml_text: str) -> List[Dict[str, Any]]:
+    return parse_vpr_results_xml(xml_text, domain='lab')['items']
+
+
+def measure(fn: Callable[[str], Any], payload: str, repeat: int) -> Tuple[float, float, Any]:
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(payload)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(payload)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default='1000,10000,50000')
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    print(f"{'items':>8} {'xml MB':>8} {'impl':>7} {'best s':>9} {'peak MB':>9}")
+    for n in sizes:
+        payload = build_lab_xml(n)
+        xml_mb = len(payload) / (1024 * 1024)
+        outputs = {}
+        for name, fn in (('legacy', legacy_parse), ('stream', stream_parse)):
+            best, peak, out = measure(fn, payload, args.repeat)
+            outputs[name] = out
+            print(f"{n:>8} {xml_mb:>8.1f} {name:>7} {best:>9.3f} {peak:>9.1f}")
+        if outputs['legacy'] != outputs['stream']:
+            print(f"  !! output mismatch at {n} items")
+
+
+if __name__ == '__main__':
+    main()
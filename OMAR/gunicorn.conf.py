@@ -14,3 +14,11 @@ accesslog = "-"
 errorlog = "-"
 loglevel = os.getenv("GUNICORN_LOGLEVEL", "info")
 worker_tmp_dir = os.getenv("GUNICORN_WORKER_TMP_DIR", "/dev/shm")
+
+# Workers share built document indexes through /dev/shm (services/document_index_snapshot.py)
+if workers > 1:
+    os.environ.setdefault("DOCUMENT_INDEX_SHARED", "1")
+
+# Each open /api/patient/<dfn>/stream holds a worker thread while it waits for readiness;
+# keep at least half of the threads for ordinary requests
+os.environ.setdefault("PATIENT_STREAM_MAX_CONCURRENT", str(max(1, threads // 2)))
@@ -29,6 +29,13 @@ def create_app():
     )
     app.secret_key = os.getenv('FLASK_SECRET_KEY', 'dev-secret')
 
+    # JSON: Flask's output format, context merged while encoding; fast_jsonify opts in to orjson
+    from .utils.json_provider import OmarJSONProvider
+    app.json = OmarJSONProvider(app)
+    # gzip/brotli for large JSON and NDJSON bodies (runs after the other after_request hooks)
+    from .utils.compression import init_compression
+    init_compression(app)
+
     app.config['PACKAGE_ROOT'] = package_root
     app.config['SRC_ROOT'] = src_root
     app.config['PROJECT_ROOT'] = project_root
@@ -142,10 +149,14 @@ def create_app():
     def _security_headers(resp):
         try:
             if not request.path.startswith('/static'):
-                resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate'
-                resp.headers['Pragma'] = 'no-cache'
-                resp.headers['Expires'] = '0'
-                resp.headers['Vary'] = 'Cookie'
+                if 'ETag' in resp.headers:
+                    # Validated patient views: private, revalidate on every use
+                    resp.headers['Cache-Control'] = 'private, no-cache'
+                else:
+                    resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate'
+                    resp.headers['Pragma'] = 'no-cache'
+                    resp.headers['Expires'] = '0'
+                resp.vary.add('Cookie')
             resp.headers['Referrer-Policy'] = 'no-referrer'
             resp.headers['X-Content-Type-Options'] = 'nosniff'
             resp.headers['X-Frame-Options'] = 'DENY'
@@ -233,3 +233,25 @@ def logout():
         return jsonify({ 'ok': True })
     except Exception as e:
         return jsonify({ 'error': str(e) }), 500
+
+
+@bp.get('/api/gateway/stats')
+def gateway_stats():
+    """Report tuning counters for the active gateway (coalescing, patient snapshots), response
+    compression and the resident document indexes of this worker."""
+    try:
+        gw = get_gateway()
+        mode = str(flask_session.get('gateway_mode') or 'demo')
+        stats: Dict[str, Any] = {'mode': mode}
+        stats_fn = getattr(gw, 'coalescing_stats', None)
+        if callable(stats_fn):
+            stats['coalescing'] = stats_fn()
+        from ..services.patient_snapshot import patient_snapshot_stats
+        stats['snapshots'] = patient_snapshot_stats()
+        from ..utils.compression import compression_stats
+        stats['compression'] = compression_stats()
+        from ..services.document_search_service import document_index_stats
+        stats['documentIndexes'] = document_index_stats()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({ 'error': str(e) }), 500
@@ -1,29 +1,9 @@
 from __future__ import annotations
-import json
 from flask import Blueprint, jsonify, g
 from ..gateways.factory import get_gateway
-from ..utils.context import merge_context
+from ..utils.context import context_blueprint
 
-bp = Blueprint('cprs_api', __name__)
-
-
-@bp.after_request
-def _attach_context(response):  # type: ignore[override]
-    try:
-        if not response.is_json:
-            return response
-        data = response.get_json(silent=True)
-        if data is None:
-            return response
-        wrapped = merge_context(data)
-        if wrapped is data:
-            return response
-        response.set_data(json.dumps(wrapped, ensure_ascii=False))
-        response.headers['Content-Type'] = 'application/json'
-        response.headers['Content-Length'] = str(len(response.get_data()))
-    except Exception:
-        pass
-    return response
+bp = context_blueprint(Blueprint('cprs_api', __name__))
 
 
 def _update_gateway_context(**values: str) -> None:
@@ -1,13 +1,26 @@
 from __future__ import annotations
+import base64
+import functools
+import hashlib
 import json
 import os
-from typing import Any, Dict
-from flask import Blueprint, jsonify, current_app, request, g
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable
+from flask import Blueprint, Response, jsonify, current_app, request, g, stream_with_context
+from werkzeug.datastructures import MultiDict
 from ..services.patient_service import PatientService
+from ..services.patient_snapshot import DocumentOrder, domain_generation
 from ..gateways.factory import get_gateway
+from ..gateways.lazy_items import materialize_payload
+from ..services import quick_views as Q
 from ..services import transforms as T
+from ..services.lab_store import get_lab_store
+from ..services.vitals_series import DOWNSAMPLE_METHODS, get_vitals_series
 from ..services import user_settings
-from ..utils.context import merge_context
+from ..utils.context import build_context, context_blueprint, merge_context
+from ..utils.json_provider import fast_jsonify
 try:
     from omar.services.loinc_index import LoincIndex
     from omar.query.query_models.default.services.rag_store import store as rag_store
@@ -20,7 +33,7 @@ try:
 except Exception:
     from ..services.document_search_service import get_or_build_index_for_dfn  # type: ignore
 
-bp = Blueprint('patient_api', __name__)
+bp = context_blueprint(Blueprint('patient_api', __name__))
 
 # Very small composition for now; later use DI container
 
@@ -54,23 +67,6 @@ def _capture_dfn(_: str | None, values: dict[str, Any] | None) -> None:
         _update_gateway_context(dfn=dfn)
 
 
-@bp.after_request
-def _inject_context(response):  # type: ignore[override]
-    try:
-        if not response.is_json:
-            return response
-        data = response.get_json(silent=True)
-        if data is None:
-            return response
-        wrapped = merge_context(data)
-        if wrapped is data:
-            return response
-        response.set_data(json.dumps(wrapped, ensure_ascii=False))
-        response.headers['Content-Type'] = 'application/json'
-        response.headers['Content-Length'] = str(len(response.get_data()))
-    except Exception:
-        pass
-    return response
 
 def _get_patient_service() -> PatientService:
     """Build PatientService using the active gateway mode.
@@ -95,171 +91,18 @@ def _get_patient_service() -> PatientService:
     station = str(flask_session.get('station') or os.getenv('DEFAULT_STATION','500'))
     duz = str(flask_session.get('duz') or os.getenv('DEFAULT_DUZ','983'))
     gw = get_gateway(station=station, duz=duz)
-    return PatientService(gateway=gw)
+    svc = PatientService(gateway=gw)
+    g.patient_service = svc
+    return svc
 
 
 # ----------------- Maintainability helpers -----------------
 
-# Per-domain allowlists for pass-through filters
-_ALLOWED: dict[str, tuple[str, ...]] = {
-    'meds': ('start','stop','max','id','uid','vaType','raw'),
-    'labs': ('start','stop','max','id','uid','category','nowrap','raw'),
-    'vitals': ('start','stop','max','id','uid','raw'),
-    'documents': ('start','stop','max','id','uid','status','category','text','nowrap','raw'),
-    'radiology': ('start','stop','max','id','uid','raw'),
-    'procedures': ('start','stop','max','id','uid','raw'),
-    'encounters': ('start','stop','max','id','uid','raw'),
-    'problems': ('max','id','uid','status','raw'),
-    'allergies': ('start','stop','max','id','uid','raw'),
-    # Additional VPR domains
-    'appointment': ('start','stop','max','id','uid','raw'),
-    'order': ('start','stop','max','id','uid','raw'),
-    'consult': ('start','stop','max','id','uid','nowrap','raw'),
-    'immunization': ('start','stop','max','id','uid','raw'),
-    'cpt': ('start','stop','max','id','uid','raw'),
-    'exam': ('start','stop','max','id','uid','raw'),
-    'education': ('start','stop','max','id','uid','raw'),
-    'factor': ('start','stop','max','id','uid','raw'),
-    'pov': ('start','stop','max','id','uid','raw'),
-    'skin': ('start','stop','max','id','uid','raw'),
-    'obs': ('start','stop','max','id','uid','raw'),
-    'ptf': ('start','stop','max','id','uid','raw'),
-    'surgery': ('start','stop','max','id','uid','raw'),
-    'image': ('start','stop','max','id','uid','raw'),
-}
-
 def _collect_for(domain_key: str, *extra: str) -> dict:
-    keys = list(_ALLOWED.get(domain_key, ())) + list(extra)
+    keys = list(Q.ALLOWED_PARAMS.get(domain_key, ())) + list(extra)
     return _collect_params(*keys)
 
 
-# ----------------- Helpers to enrich quick results from raw -----------------
-
-def _extract_full_text(raw_item: dict) -> str | None:
-    try:
-        # Common patterns across documents/radiology/procedures
-        # 1) text: [ { content: "..." }, ... ]
-        txt = raw_item.get('text')
-        if isinstance(txt, list) and txt:
-            pieces = []
-            for block in txt:
-                if isinstance(block, dict):
-                    c = block.get('content') or block.get('text') or block.get('summary')
-                    if isinstance(c, str) and c.strip():
-                        pieces.append(c)
-                elif isinstance(block, str) and block.strip():
-                    pieces.append(block)
-            if pieces:
-                return "\n".join(pieces)
-        # 2) report/impression (radiology)
-        rpt = raw_item.get('report') or raw_item.get('impression')
-        if isinstance(rpt, str) and rpt.strip():
-            return rpt
-        # 3) body/content/documentText
-        for k in ('body','content','documentText','noteText','clinicalText','details'):
-            v = raw_item.get(k)
-            if isinstance(v, str) and v.strip():
-                return v
-        # 4) nested content
-        doc = raw_item.get('document')
-        if isinstance(doc, dict):
-            for k in ('content','text','body'):
-                v = doc.get(k)
-                if isinstance(v, str) and v.strip():
-                    return v
-    except Exception:
-        pass
-    return None
-
-
-def _extract_encounter_info(raw_item: dict) -> dict | None:
-    try:
-        enc = None
-        # VPR shapes: 'visit' or 'encounter' or 'appointment'
-        if isinstance(raw_item.get('visit'), dict):
-            enc = raw_item.get('visit')
-        elif isinstance(raw_item.get('encounter'), dict):
-            enc = raw_item.get('encounter')
-        elif isinstance(raw_item.get('appointment'), dict):
-            enc = raw_item.get('appointment')
-        out = {}
-        # visit/encounter identifiers
-        uid = None
-        if isinstance(enc, dict):
-            uid = enc.get('uid') or enc.get('visitUid')
-        if not uid:
-            uid = raw_item.get('encounterUid') or raw_item.get('visitUid') or raw_item.get('uid')
-        if uid:
-            out['visitUid'] = uid
-        # date/time
-        date_val = None
-        for k in ('dateTime','referenceDateTime','start','time'):
-            if isinstance(enc, dict) and enc.get(k):
-                date_val = enc.get(k)
-                break
-        if not date_val:
-            date_val = raw_item.get('dateTime') or raw_item.get('referenceDateTime') or raw_item.get('observed')
-        dt_iso = T._parse_any_datetime_to_iso(date_val)  # type: ignore
-        if dt_iso:
-            out['date'] = dt_iso
-        # location
-        loc_name = None
-        try:
-            if isinstance(raw_item.get('location'), dict):
-                loc_name = raw_item['location'].get('name') or raw_item['location'].get('displayName')
-        except Exception:
-            pass
-        if not loc_name:
-            for k in ('locationName','clinicName','clinic','wardName'):
-                v = raw_item.get(k)
-                if isinstance(v, str) and v.strip():
-                    loc_name = v
-                    break
-        if loc_name:
-            out['location'] = loc_name
-        # human-readable encounter name when present
-        ename = raw_item.get('encounterName')
-        if isinstance(ename, str) and ename.strip():
-            out['encounterName'] = ename
-        return out or None
-    except Exception:
-        return None
-
-
-def _is_problem_active(status_val: str | None) -> bool | None:
-    if not status_val:
-        return None
-    s = status_val.strip().lower()
-    # Treat resolved/inactive/historical as inactive
-    if 'inactive' in s or 'resolved' in s or 'historical' in s or 'entered in error' in s:
-        return False
-    if 'active' in s and 'inactive' not in s:
-        return True
-    return None
-
-
-def _extract_problem_comments(raw_item: dict) -> list[dict] | None:
-    try:
-        comments = raw_item.get('comments')
-        out = []
-        if isinstance(comments, list):
-            for c in comments:
-                if not isinstance(c, dict):
-                    continue
-                txt = c.get('comment') or c.get('text')
-                when = c.get('entered') or c.get('date') or c.get('enteredDateTime')
-                who = c.get('enteredBy') or c.get('author') or c.get('authorDisplayName')
-                if txt:
-                    out.append({
-                        'text': txt,
-                        'date': T._parse_any_datetime_to_iso(when),  # type: ignore
-                        'author': who
-                    })
-        return out or None
-    except Exception:
-        return None
-
-
 # ----------------- Simple pagination helpers (envelope) -----------------
 
 def _parse_limit(default: int = 50, max_limit: int = 200) -> int:
@@ -302,6 +145,41 @@ def _envelope_list(items: list[dict] | list) -> dict:
     }
 
 
+# Keyset cursors: 'k1.' + base64url(JSON [date, uid]) of the last item sent.
+# Accepted in cursor=, next= or offset= (the documents UI echoes `next`
+# back as `offset`); plain integers there are still offsets.
+_CURSOR_PREFIX = 'k1.'
+# Extra documents fetched past a pushed-down page so notes sharing the
+# cursor's date can be skipped without another round trip
+_CURSOR_TIE_SLACK = 25
+# Document payloads other than the default (params=None) the list may page over
+_LIST_DOCUMENT_PARAMS = ({'text': '0'}, {'text': '1'})
+DOCUMENTS_LIST_PUSHDOWN = os.getenv('DOCUMENTS_LIST_PUSHDOWN', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def _encode_cursor(key: tuple[str, str]) -> str:
+    raw = json.dumps([key[0], key[1]], separators=(',', ':')).encode('utf-8')
+    return _CURSOR_PREFIX + base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _parse_cursor() -> tuple[str, str] | None:
+    """(date, uid) from a keyset cursor arg; None when the request has none.
+
+    Raises ValueError for a token with the cursor prefix that does not decode.
+    """
+    for name in ('cursor', 'next', 'offset'):
+        raw = (request.args.get(name) or '').strip()
+        if not raw.startswith(_CURSOR_PREFIX):
+            continue
+        body = raw[len(_CURSOR_PREFIX):]
+        try:
+            date, uid = json.loads(base64.urlsafe_b64decode(body + '=' * (-len(body) % 4)))
+        except Exception:
+            raise ValueError('invalid cursor')
+        return str(date or ''), str(uid or '')
+    return None
+
+
 # ----------------- Sensitive record check -----------------
 
 @bp.get('/<dfn>/sensitive')
@@ -371,103 +249,186 @@ def sensitive_check(dfn: str):
 # ----------------- VPR pass-through param helpers -----------------
 
 def _collect_params(*keys: str) -> dict:
-    """Collect allowed params and normalize dates.
-    - Converts start/stop to FileMan when provided.
-    - Supports relative range via last=14d|2w|6m|1y when start/stop absent; emits start/stop.
-    """
-    out: dict = {}
-    provided_keys = set(keys)
-    for k in keys:
-        v = request.args.get(k)
-        if v is None:
-            continue
-        s = str(v).strip()
-        if s == '':
-            continue
-        if k in ('start','stop'):
-            fm = T.to_fileman_datetime(s)
-            out[k] = fm or s
-        else:
-            out[k] = s
-    # Relative date convenience: only if endpoint accepts start/stop and not already provided
-    if ('start' in provided_keys or 'stop' in provided_keys) and ('start' not in out and 'stop' not in out):
-        last = request.args.get('last')
-        if last:
-            rng = T.parse_relative_last_to_iso_range(last)  # type: ignore
-            if rng:
-                s_iso, e_iso = rng
-                s_fm = T.to_fileman_datetime(s_iso)
-                e_fm = T.to_fileman_datetime(e_iso)
-                if s_fm:
-                    out['start'] = s_fm
-                if e_fm:
-                    out['stop'] = e_fm
-    return out
-
-
-_STATUS_COMPLETED_PATTERNS = ('complete', 'comp', 'result', 'done', 'finish', 'final')
-_STATUS_DISCONTINUED_PATTERNS = ('discont', 'cancel', 'void', 'stop', 'expire', 'lapse')
-_STATUS_PENDING_PATTERNS = ('pend', 'hold', 'draft', 'unsigned', 'in process', 'inprocess', 'in-progress', 'require', 'pre-release', 'prerelease', 'new')
-_STATUS_ACTIVE_PATTERNS = ('active', 'current', 'released', 'processing', 'in effect', 'in-effect', 'inforce', 'in force')
-
-
-def _orders_status_alias(value: str | None) -> str:
-    v = str(value or '').strip().lower()
-    if v in ('active', 'a'):
-        return 'active'
-    if v in ('pending', 'pend', 'p', 'hold', 'unsigned', 'draft'):
-        return 'pending'
-    if v in ('completed', 'complete', 'comp', 'finished', 'done', 'resulted', 'final'):
-        return 'completed'
-    if v in ('discontinued', 'cancelled', 'canceled', 'dc', 'void', 'stopped', 'expired', 'exp', 'lapsed', 'cancel'):
-        return 'discontinued'
-    if v in ('current', 'actpend', 'active+pending', 'ap', 'cur', 'c'):
-        return 'current'
-    if v in ('all', '*', 'any'):
-        return 'all'
-    return 'current'
-
-
-def _orders_type_alias(value: str | None) -> str:
-    v = str(value or '').strip().lower()
-    if v in ('med', 'meds', 'medication', 'medications', 'pharmacy', 'rx', 'drug', 'drugs'):
-        return 'meds'
-    if v in ('lab', 'labs', 'laboratory', 'chemistry', 'microbiology', 'pathology'):
-        return 'labs'
-    if v in ('imaging', 'image', 'radiology', 'rad', 'ct', 'mri', 'xray', 'x-ray', 'ultrasound', 'nuclear', 'pet'):
-        return 'imaging'
-    if v in ('consult', 'consults', 'referral', 'gmrc'):
-        return 'consults'
-    if v in ('nursing', 'nurse', 'nurs'):
-        return 'nursing'
-    if v in ('schedule', 'scheduling', 'appointment', 'appointments', 'appt', 'appts'):
-        return 'scheduling'
-    if v in ('other', 'misc', 'unknown'):
-        return 'other'
-    if v in ('all', '*', 'any'):
-        return 'all'
-    return 'all'
+    """Allowed VPR params from the request args (see ``quick_views.collect_params``)."""
+    return Q.collect_params(request.args, *keys)
 
 
 def _raw_requested() -> bool:
+    return Q.wants_raw(request.args)
+
+
+def _json_with_optional_raw(payload, vpr_payload, *, list_label: str | None = None, fast: bool = False):
+    encode = fast_jsonify if fast else jsonify
+    return encode(Q.with_raw(payload, vpr_payload, request.args, list_label=list_label))
+
+# ----------------- NDJSON streaming -----------------
+
+_NDJSON_MIMETYPE = 'application/x-ndjson'
+_NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+def _stream_requested() -> bool:
+    """Opt-in streaming: ?stream=1 or an Accept header preferring NDJSON over JSON."""
+    if request.args.get('stream', '0').lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    accept = request.accept_mimetypes
+    return accept[_NDJSON_MIMETYPE] > accept['application/json']
+
+
+def _payload_meta(payload: Any) -> dict:
+    """Top-level payload fields without the item lists (for the trailer record)."""
+    if not isinstance(payload, dict):
+        return {}
+    meta = {}
+    for key, value in payload.items():
+        if key in ('items', 'value') and isinstance(value, list):
+            continue
+        if key in ('data', 'payload') and isinstance(value, dict):
+            value = _payload_meta(value)
+        meta[key] = value
+    return meta
+
+
+def _json_bytes(obj: Any) -> bytes:
+    """Encode with the app's JSON provider (fast backend when configured)."""
+    dumps_bytes = getattr(current_app.json, 'dumps_bytes', None)
+    if dumps_bytes is not None:
+        return dumps_bytes(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _ndjson_response(items: Iterable[Any], meta: Callable[[], dict] | None = None, *, dfn: str | None = None):
+    """Stream one JSON record per item, then a trailer record.
+
+    The trailer is ``{done: true, total, meta, elapsedMs, context}``; ``meta``
+    is called after the last item so it can report counts gathered while
+    iterating. Lines are written in chunks of about 64 KiB (the first item
+    goes out on its own so the client sees data early). An error while
+    iterating ends the stream with ``{done: true, error}``.
+    """
+    started = time.perf_counter()
+
+    def _lines():
+        total = 0
+        buf: list[bytes] = []
+        size = 0
+        try:
+            for item in items:
+                line = _json_bytes(item) + b'\n'
+                buf.append(line)
+                size += len(line)
+                total += 1
+                if total == 1 or size >= _NDJSON_CHUNK_BYTES:
+                    yield b''.join(buf)
+                    buf, size = [], 0
+            trailer = {'done': True, 'total': total, 'meta': meta() if meta else {}}
+        except Exception as e:
+            trailer = {'done': True, 'total': total, 'error': str(e)}
+        if buf:
+            yield b''.join(buf)
+        trailer['elapsedMs'] = round((time.perf_counter() - started) * 1000.0, 1)
+        trailer['context'] = build_context(dfn=dfn)
+        yield _json_bytes(trailer) + b'\n'
+
+    return Response(stream_with_context(_lines()), mimetype=_NDJSON_MIMETYPE)
+
+
+# ----------------- Conditional GET (ETags) -----------------
+
+PATIENT_ETAGS = os.getenv('PATIENT_ETAGS', '1').lower() not in ('0', 'false', 'no', 'off')
+# Query args whose result moves with the clock, not with the payload generation
+_RELATIVE_WINDOW_ARGS = ('days', 'last')
+
+
+def _etag_for(svc: PatientService, dfn: str, reads: list) -> str | None:
+    """Strong validator for this request over the generations of ``reads``.
+
+    Covers the snapshot token (a new snapshot never reuses a tag), endpoint,
+    DFN, query args, the context headers and the UTC date (ages and other
+    day-relative fields); None when any read has no generation (expired,
+    uncached or a gateway without generations).
+    """
+    parts = [
+        svc.snapshot(dfn).token,
+        time.strftime('%Y-%m-%d', time.gmtime()),
+        request.endpoint or '',
+        str(dfn),
+        repr(sorted(request.args.items(multi=True))),
+        request.headers.get('X-OMAR-Session-Id', ''),
+        request.headers.get('X-OMAR-Session-Order', ''),
+    ]
+    for read_dfn, domain, params in sorted(reads, key=lambda r: (r[0], r[1], repr(sorted((r[2] or {}).items())))):
+        generation = domain_generation(svc.gateway, read_dfn, domain, params)
+        if generation is None:
+            return None
+        parts.append(f"{read_dfn}|{domain}|{sorted((params or {}).items())!r}|{generation}")
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _conditional_get(view: Callable) -> Callable:
+    """ETag / If-None-Match for views built only from snapshot reads.
+
+    After a 200, the response gets a strong ETag derived from the generations
+    of the domain payloads the view read, and ``Cache-Control: private,
+    no-cache``; the tag and its reads are remembered on the patient snapshot.
+    A later request carrying that tag is answered 304 from the current
+    generations alone, before any fetch, transform or serialization. Views
+    that also called the gateway outside the snapshot (RPC lab panels,
+    document texts, demographics) get no ETag, nor do windows relative to now
+    (``days``, ``last``). Streaming and bundle requests are left alone.
+    """
+
+    @functools.wraps(view)
+    def _wrapped(dfn: str, *args: Any, **kwargs: Any):
+        if (
+            not PATIENT_ETAGS
+            or request.method != 'GET'
+            or _stream_requested()
+            or any(request.args.get(name) for name in _RELATIVE_WINDOW_ARGS)
+        ):
+            return view(dfn, *args, **kwargs)
+        key = (request.endpoint, tuple(sorted(request.args.items(multi=True))))
+        if request.if_none_match:
+            try:
+                svc = _get_patient_service()
+                memo = svc.snapshot(dfn).validator(key)
+                if memo is not None:
+                    etag, reads = memo
+                    if request.if_none_match.contains(etag) and _etag_for(svc, dfn, reads) == etag:
+                        resp = Response(status=304)
+                        resp.set_etag(etag)
+                        resp.headers['Cache-Control'] = 'private, no-cache'
+                        return resp
+            except Exception:
+                pass
+        resp = current_app.make_response(view(dfn, *args, **kwargs))
+        if resp.status_code != 200 or resp.is_streamed:
+            return resp
+        try:
+            svc = getattr(g, 'patient_service', None)
+            reads = svc.tracked_reads() if svc is not None else None
+            if reads:
+                etag = _etag_for(svc, dfn, reads)
+                if etag:
+                    svc.snapshot(dfn).remember_validator(key, etag, reads)
+                    resp.set_etag(etag)
+                    resp.headers['Cache-Control'] = 'private, no-cache'
+        except Exception:
+            pass
+        return resp
+
+    return _wrapped
+
+
+def _quick_response(dfn: str, view: Callable, *, fast: bool = False):
+    """Serialize one quick view (``services.quick_views``) for this request."""
+    svc = _get_patient_service()
     try:
-        return str(request.args.get('raw', '')).strip().lower() in ('1','true','yes','on')
-    except Exception:
-        return False
-
-
-def _json_with_optional_raw(payload, vpr_payload, *, list_label: str | None = None):
-    if not _raw_requested():
-        return jsonify(payload)
-    raw_text = None
-    if isinstance(vpr_payload, dict):
-        raw_text = vpr_payload.get('raw')
-    if isinstance(payload, dict):
-        body = dict(payload)
-        body['raw'] = raw_text
-        return jsonify(body)
-    key = list_label or 'result'
-    return jsonify({key: payload, 'raw': raw_text})
+        body = view(svc, dfn, request.args)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return (fast_jsonify if fast else jsonify)(body)
+
 
 @bp.get('/<dfn>/demographics')
 def demographics(dfn: str):
@@ -479,625 +440,142 @@ def demographics(dfn: str):
         return jsonify({'error': str(e)}), 500
 
 @bp.get('/<dfn>/quick/demographics')
+@_conditional_get
 def demographics_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'patient', params=raw_params)
-        quick = svc.get_demographics_quick(dfn)
-        if (request.args.get('includeRaw', '0').lower() in ('1', 'true', 'yes', 'on')):
-            # Attach first raw item for traceability
-            item = None
-            try:
-                arr = T._get_nested_items(vpr)  # type: ignore
-                item = arr[0] if arr else None
-            except Exception:
-                item = None
-            if isinstance(quick, dict):
-                quick = dict(quick)
-                quick['_raw'] = item
-        return _json_with_optional_raw(quick, vpr)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.demographics)
 
 @bp.get('/<dfn>/quick/meds')
 @bp.get('/<dfn>/quick/medications')  # alias to match frontend calls
+@_conditional_get
 def medications_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'meds', params=raw_params)
-        quick = svc.get_medications_quick(dfn, params=raw_params)
-
-        # Optional filtering: status, days/start/end, name
-        status_raw = (request.args.get('status') or 'ALL').strip().upper()
-        # Normalize status filter to a set of allowed quick statuses
-        status_map = {
-            'ACTIVE': {'active'},
-            'PENDING': {'pending'},
-            'ACTIVE+PENDING': {'active', 'pending', 'new', 'hold'},
-            'CURRENT': {'active', 'pending'},
-            'ALL': None,
-        }
-        allowed_status = status_map.get(status_raw, None)
-
-        # Date range: support days (relative), start, end in common formats
-        from datetime import datetime, timezone, timedelta
-        def _to_iso(x):
-            try:
-                return T._parse_any_datetime_to_iso(x)  # type: ignore
-            except Exception:
-                return None
-        now = datetime.now(timezone.utc)
-        start_iso = None
-        end_iso = None
-        days = None
-        try:
-            d = request.args.get('days')
-            if d is not None:
-                di = int(str(d).strip() or '0')
-                if di and di > 0:
-                    days = di
-        except Exception:
-            days = None
-        if days:
-            start_iso = (now - timedelta(days=days)).isoformat().replace('+00:00','Z')
-            end_iso = now.isoformat().replace('+00:00','Z')
-        s_arg = request.args.get('start')
-        e_arg = request.args.get('end')
-        if s_arg:
-            s_parsed = _to_iso(s_arg)
-            if s_parsed:
-                start_iso = s_parsed
-        if e_arg:
-            e_parsed = _to_iso(e_arg)
-            if e_parsed:
-                end_iso = e_parsed
-
-        name_filter = (request.args.get('name') or '').strip().lower()
-
-        def _in_date_range(item):
-            if not (start_iso or end_iso):
-                return True
-            try:
-                sd = item.get('startDate')
-                ed = item.get('endDate')
-                # Default to startDate when endDate missing
-                cand = _to_iso(ed) or _to_iso(sd)
-                if not cand:
-                    return False
-                if start_iso and cand < start_iso:
-                    return False
-                if end_iso and cand > end_iso:
-                    return False
-                return True
-            except Exception:
-                return True
-
-        def _status_ok(item):
-            if not allowed_status:
-                return True
-            s = (item.get('status') or '').strip().lower()
-            return s in allowed_status
-
-        def _name_ok(item):
-            if not name_filter:
-                return True
-            n = (item.get('name') or '').strip().lower()
-            return name_filter in n
-
-        # Apply filters when requested
-        if isinstance(quick, list):
-            filtered = [q for q in quick if _status_ok(q) and _in_date_range(q) and _name_ok(q)]
-        else:
-            filtered = quick
-
-        include_raw_requested = request.args.get('includeRaw','0').lower() in ('1','true','yes','on')
-        if include_raw_requested and isinstance(filtered, list):
-            # Best effort: only attach _raw when no filters applied to preserve index alignment
-            filters_applied = (allowed_status is not None) or bool(days) or bool(start_iso) or bool(end_iso) or bool(name_filter)
-            if not filters_applied:
-                raw_items = []
-                try:
-                    raw_items = T._get_nested_items(vpr)  # type: ignore
-                except Exception:
-                    raw_items = []
-                out = []
-                for idx, q in enumerate(filtered):
-                    obj = dict(q)
-                    if idx < len(raw_items):
-                        obj['_raw'] = raw_items[idx]
-                    out.append(obj)
-                filtered = out
-        payload = {'medications': filtered if isinstance(filtered, list) else (filtered or [])}
-        return _json_with_optional_raw(payload, vpr)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.medications)
 
 # Quick routes for other domains
 @bp.get('/<dfn>/quick/labs')
+@_conditional_get
 def labs_quick(dfn: str):
+    return _quick_response(dfn, Q.labs)
+
+@bp.get('/<dfn>/labs/trend')
+@_conditional_get
+def labs_trend(dfn: str):
+    """Per-test lab trends from the columnar lab store.
+
+    Query: loinc=<code,...>, names=<token,...> (LOINC-aware, like quick/labs),
+    days | start/end, series=0 to return aggregates only.
+    """
     svc = _get_patient_service()
     try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'labs', params=raw_params)
-
-        # Server-side filters: names (comma-separated), days, start, end
+        from datetime import datetime, timezone, timedelta
+        codes = [c.strip() for c in (request.args.get('loinc') or '').split(',') if c.strip()]
         names_raw = (request.args.get('names') or '').strip()
         name_tokens = [s.strip() for s in names_raw.split(',') if s.strip()] if names_raw else []
+        substrings: set[str] = set()
+        if name_tokens:
+            name_codes, substrings = LoincIndex.load().resolve_tokens(name_tokens)
+            codes.extend(name_codes)
 
-        from datetime import datetime, timezone, timedelta
-        def _to_iso(x):
-            try:
-                return T._parse_any_datetime_to_iso(x)  # type: ignore
-            except Exception:
-                return None
-        now = datetime.now(timezone.utc)
-        start_iso = None
-        end_iso = None
-        # days → relative range
-        days = None
+        start_epoch = None
+        end_epoch = None
         try:
-            d = request.args.get('days')
-            if d is not None:
-                di = int(str(d).strip() or '0')
-                if di and di > 0:
-                    days = di
+            days = int(str(request.args.get('days') or '0').strip() or '0')
         except Exception:
-            days = None
-        if days:
-            start_iso = (now - timedelta(days=days)).isoformat().replace('+00:00','Z')
-            end_iso = now.isoformat().replace('+00:00','Z')
-        s_arg = request.args.get('start')
-        e_arg = request.args.get('end')
-        if s_arg:
-            s_parsed = _to_iso(s_arg)
-            if s_parsed:
-                start_iso = s_parsed
-        if e_arg:
-            e_parsed = _to_iso(e_arg)
-            if e_parsed:
-                end_iso = e_parsed
-
-        filters_payload: dict[str, Any] = {'start': start_iso, 'end': end_iso}
-        max_panels_arg = request.args.get('maxPanels') or request.args.get('max')
-        if max_panels_arg:
-            try:
-                filters_payload['max_panels'] = int(str(max_panels_arg).strip())
-            except Exception:
-                pass
-
-        quick = svc.get_labs_quick(dfn, params=raw_params, filters=filters_payload)
-
-        def _date_ok(item):
-            if not (start_iso or end_iso):
-                return True
-            try:
-                # quick labs include observedDate/resulted as ISO; fallback to observed/collected
-                cand = item.get('observedDate') or item.get('resulted') or item.get('collected') or item.get('date')
-                iso = _to_iso(cand) or cand
-                if not iso:
-                    return False
-                if start_iso and iso < start_iso:
-                    return False
-                if end_iso and iso > end_iso:
-                    return False
-                return True
-            except Exception:
-                return True
-
-        # LOINC-aware name/code filtering
-        loinc_idx = LoincIndex.load()
-        if isinstance(quick, list):
-            quick = loinc_idx.annotate_labs(quick)
-        codes_set, substrings_set = loinc_idx.resolve_tokens(name_tokens)
-        def _name_ok(item):
-            if not name_tokens:
-                return True
-            try:
-                test = (item.get('test') or item.get('name') or item.get('display') or '').strip()
-                code = (item.get('loinc') or item.get('code') or item.get('typeCode') or '').strip().lower()
-                if code and code in codes_set:
-                    return True
-                key = ''.join(ch.lower() if ch.isalnum() else ' ' for ch in test).strip()
-                return any(w in key for w in substrings_set)
-            except Exception:
-                return True
-
-        filtered = quick
-        filters_applied = bool(name_tokens) or bool(days) or bool(start_iso) or bool(end_iso)
-        if isinstance(quick, list) and filters_applied:
-            filtered = [q for q in quick if _date_ok(q) and _name_ok(q)]
-
-        include_raw_items = request.args.get('includeRaw','0').lower() in ('1','true','yes','on')
-        if include_raw_items and isinstance(filtered, list):
-            if not filters_applied:
-                raw_items = []
-                try:
-                    raw_items = T._get_nested_items(vpr)  # type: ignore
-                except Exception:
-                    raw_items = []
-                vpr_index = 0
-                out = []
-                for q in filtered:
-                    obj = dict(q)
-                    if q.get('source') != 'rpc' and vpr_index < len(raw_items):
-                        obj['_raw'] = raw_items[vpr_index]
-                        vpr_index += 1
-                    out.append(obj)
-                filtered = out
-        return _json_with_optional_raw(filtered, vpr, list_label='labs')
+            days = 0
+        if days > 0:
+            now = datetime.now(timezone.utc)
+            start_epoch = (now - timedelta(days=days)).timestamp()
+            end_epoch = now.timestamp()
+        if request.args.get('start'):
+            start_epoch = T.datetime_to_epoch(request.args.get('start')) or start_epoch
+        if request.args.get('end'):
+            end_epoch = T.datetime_to_epoch(request.args.get('end')) or end_epoch
+        include_series = request.args.get('series', '1').lower() not in ('0', 'false', 'no', 'off')
+
+        store = get_lab_store(svc, dfn)
+        tests = store.query(
+            loinc_codes=codes,
+            name_substrings=substrings,
+            start=start_epoch,
+            end=end_epoch,
+            include_series=include_series,
+        )
+        return jsonify({
+            'dfn': dfn,
+            'generation': store.generation,
+            'start': start_epoch,
+            'end': end_epoch,
+            'total': sum(t['count'] for t in tests),
+            'tests': tests,
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.get('/<dfn>/quick/orders')
 @bp.get('/<dfn>/quick/order')
+@_conditional_get
 def orders_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        include_raw = str(request.args.get('includeRaw', '0')).strip().lower() in ('1', 'true', 'yes', 'on')
-        status_filter = _orders_status_alias(request.args.get('status', 'current'))
-        type_filter = _orders_type_alias(request.args.get('type', 'all'))
-
-        params = dict(_collect_for('order'))
-        days_arg = request.args.get('days')
-        start_arg = request.args.get('start')
-        end_arg = request.args.get('end')
-
-        from datetime import datetime, timezone, timedelta
-
-        now = datetime.now(timezone.utc)
-
-        def _coerce_iso(val: str | None) -> str | None:
-            if not val:
-                return None
-            try:
-                iso = T._parse_any_datetime_to_iso(val)  # type: ignore[attr-defined]
-            except Exception:
-                iso = None
-            if iso:
-                return iso
-            try:
-                txt = str(val).strip()
-            except Exception:
-                txt = ''
-            return txt or None
-
-        start_iso = _coerce_iso(start_arg)
-        end_iso = _coerce_iso(end_arg)
-
-        days_int = None
-        if days_arg is not None:
-            try:
-                days_int = int(str(days_arg).strip() or '0')
-                if days_int <= 0:
-                    days_int = None
-            except Exception:
-                days_int = None
-
-        if days_int and not start_iso:
-            start_iso = (now - timedelta(days=days_int)).isoformat().replace('+00:00', 'Z')
-        if days_int and not end_iso:
-            end_iso = now.isoformat().replace('+00:00', 'Z')
-
-        if start_iso and start_iso.endswith('+00:00'):
-            start_iso = start_iso[:-6] + 'Z'
-        if end_iso and end_iso.endswith('+00:00'):
-            end_iso = end_iso[:-6] + 'Z'
-
-        if start_iso:
-            try:
-                fm_start = T.to_fileman_datetime(start_iso)
-                if fm_start:
-                    params['start'] = fm_start
-            except Exception:
-                pass
-        if end_iso:
-            try:
-                fm_stop = T.to_fileman_datetime(end_iso)
-                if fm_stop:
-                    params['stop'] = fm_stop
-            except Exception:
-                pass
-
-        if (raw_requested or include_raw) and 'raw' not in params:
-            params['raw'] = '1'
-
-        pass_params = params or None
-
-        vpr = svc.get_vpr_raw(dfn, 'order', params=pass_params)
-        quick = svc.get_orders_quick(dfn, params=pass_params)
-        orders = quick if isinstance(quick, list) else []
-
-        tokens_cache: dict[int, set[str]] = {}
-
-        def _status_tokens(order: dict) -> set[str]:
-            key = id(order)
-            if key in tokens_cache:
-                return tokens_cache[key]
-            tokens: set[str] = set()
-            for field in ('status_bucket', 'current_status', 'status', 'status_code'):
-                val = order.get(field)
-                if not val:
-                    continue
-                text = str(val).strip().lower()
-                if text:
-                    tokens.add(text)
-            tokens_cache[key] = tokens
-            return tokens
-
-        def _matches_patterns(token_set: set[str], patterns: tuple[str, ...]) -> bool:
-            for token in token_set:
-                for pattern in patterns:
-                    if pattern and pattern in token:
-                        return True
-            return False
-
-        def _status_matches(order: dict) -> bool:
-            bucket = str(order.get('status_bucket') or '').strip().lower()
-            tokens = _status_tokens(order)
-            if bucket:
-                tokens = set(tokens)
-                tokens.add(bucket)
-            if status_filter == 'all':
-                return True
-            if status_filter == 'current':
-                if bucket:
-                    return bucket in ('active', 'pending')
-                closed = _matches_patterns(tokens, _STATUS_COMPLETED_PATTERNS + _STATUS_DISCONTINUED_PATTERNS)
-                return not closed
-            if status_filter == 'active':
-                if bucket:
-                    return bucket == 'active'
-                return _matches_patterns(tokens, _STATUS_ACTIVE_PATTERNS)
-            if status_filter == 'pending':
-                if bucket:
-                    return bucket == 'pending'
-                return _matches_patterns(tokens, _STATUS_PENDING_PATTERNS)
-            if status_filter == 'completed':
-                if bucket:
-                    return bucket == 'completed'
-                return _matches_patterns(tokens, _STATUS_COMPLETED_PATTERNS)
-            if status_filter == 'discontinued':
-                if bucket:
-                    return bucket == 'discontinued'
-                return _matches_patterns(tokens, _STATUS_DISCONTINUED_PATTERNS)
-            return True
-
-        def _type_matches(order: dict) -> bool:
-            if type_filter == 'all':
-                return True
-            category = str(order.get('category') or '').strip().lower()
-            if category:
-                if category == type_filter:
-                    return True
-            type_text = str(order.get('type') or '').strip().lower()
-            if type_text and type_text == type_filter:
-                return True
-            detail = str(order.get('type_detail') or '').strip().lower()
-            if not detail:
-                return type_filter == 'other'
-            if type_filter == 'labs':
-                return any(token in detail for token in ('lab', 'chem', 'hemat', 'micro', 'path'))
-            if type_filter == 'meds':
-                return any(token in detail for token in ('med', 'pharm', 'rx', 'drug'))
-            if type_filter == 'imaging':
-                return any(token in detail for token in ('imaging', 'radiology', 'x-ray', 'xray', 'ct', 'mri', 'ultrasound', 'nuclear', 'pet'))
-            if type_filter == 'consults':
-                return 'consult' in detail or 'referral' in detail
-            if type_filter == 'nursing':
-                return 'nurs' in detail or 'nursing' in detail
-            if type_filter == 'scheduling':
-                return any(token in detail for token in ('schedule', 'scheduling', 'appointment', 'appt'))
-            if type_filter == 'other':
-                return True
-            return False
-
-        def _to_dt(val: str | None) -> datetime | None:
-            if not val:
-                return None
-            text = str(val).strip()
-            if not text:
-                return None
-            try:
-                if text.endswith('Z'):
-                    text = text[:-1] + '+00:00'
-                return datetime.fromisoformat(text)
-            except Exception:
-                try:
-                    iso_val = T._parse_any_datetime_to_iso(text)  # type: ignore[attr-defined]
-                except Exception:
-                    iso_val = None
-                if not iso_val:
-                    return None
-                try:
-                    adj = iso_val[:-1] + '+00:00' if iso_val.endswith('Z') else iso_val
-                    return datetime.fromisoformat(adj)
-                except Exception:
-                    return None
-
-        start_dt_filter = _to_dt(start_iso)
-        end_dt_filter = _to_dt(end_iso)
-
-        def _date_matches(order: dict) -> bool:
-            if not (start_dt_filter or end_dt_filter):
-                return True
-            candidates = [
-                order.get('date'),
-                order.get('start'),
-                order.get('released'),
-                order.get('entered'),
-                order.get('signed'),
-                order.get('stop'),
-            ]
-            candidate_dt = None
-            for candidate in candidates:
-                candidate_dt = _to_dt(candidate)
-                if candidate_dt:
-                    break
-            if not candidate_dt:
-                return True
-            if start_dt_filter and candidate_dt < start_dt_filter:
-                return False
-            if end_dt_filter and candidate_dt > end_dt_filter:
-                return False
-            return True
-
-        filtered: list[dict] = []
-        for order in orders:
-            if not isinstance(order, dict):
-                continue
-            if not _status_matches(order):
-                continue
-            if not _type_matches(order):
-                continue
-            if not _date_matches(order):
-                continue
-            filtered.append(order)
-
-        filtered.sort(key=lambda rec: (rec.get('date') or '', rec.get('fm_date') or ''), reverse=True)
-
-        limit_arg = request.args.get('limit')
-        if limit_arg is not None:
-            try:
-                limit_val = int(str(limit_arg).strip())
-                if limit_val > 0:
-                    filtered = filtered[:limit_val]
-            except Exception:
-                pass
-
-        if include_raw and isinstance(filtered, list):
-            raw_items = []
-            try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore[attr-defined]
-            except Exception:
-                raw_items = []
-
-            def _raw_keys(raw_item: dict) -> list[str]:
-                keys: list[str] = []
-                if not isinstance(raw_item, dict):
-                    return keys
-                uid_val = raw_item.get('uid')
-                if isinstance(uid_val, str) and uid_val.strip():
-                    keys.append(uid_val.strip())
-                def _pick(node):
-                    if node is None:
-                        return None
-                    if isinstance(node, dict):
-                        for attr in ('value', 'name', 'id', 'code'):
-                            if node.get(attr):
-                                return str(node[attr])
-                        return None
-                    if isinstance(node, str):
-                        return node
-                    return None
-                id_val = _pick(raw_item.get('id'))
-                if id_val and str(id_val).strip():
-                    keys.append(str(id_val).strip())
-                result_val = _pick(raw_item.get('resultID'))
-                if result_val and str(result_val).strip():
-                    keys.append(str(result_val).strip())
-                return [k for k in keys if k]
-
-            raw_index: dict[str, dict] = {}
-            for raw in raw_items:
-                if not isinstance(raw, dict):
-                    continue
-                for key in _raw_keys(raw):
-                    if key not in raw_index:
-                        raw_index[key] = raw
-
-            enriched: list[dict] = []
-            for order in filtered:
-                obj = dict(order)
-                key_candidates = [
-                    obj.get('order_id'),
-                    obj.get('id'),
-                    obj.get('uid'),
-                    obj.get('result_id'),
-                ]
-                for key in key_candidates:
-                    if not key:
-                        continue
-                    key_str = str(key).strip()
-                    if key_str and key_str in raw_index:
-                        obj['_raw'] = raw_index[key_str]
-                        break
-                enriched.append(obj)
-            filtered = enriched
-
-        return _json_with_optional_raw(filtered, vpr, list_label='orders')
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.orders)
 
 @bp.get('/<dfn>/quick/vitals')
+@_conditional_get
 def vitals_quick(dfn: str):
+    return _quick_response(dfn, Q.vitals)
+
+@bp.get('/<dfn>/vitals/series')
+@_conditional_get
+def vitals_series(dfn: str):
+    """Per-type vitals series, downsampled to a point budget.
+
+    Query: types=<BP,P,WT,...>, days | start/end, points=<budget per type>
+    (default 500, 0 = every point), method=lttb|minmax.
+    """
     svc = _get_patient_service()
     try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'vitals', params=raw_params)
-        quick = svc.get_vitals_quick(dfn, params=raw_params)
-        if (request.args.get('includeRaw','0').lower() in ('1','true','yes','on')) and isinstance(quick, list):
-            raw_items = []
-            try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore
-            except Exception:
-                raw_items = []
-            out = []
-            for idx, q in enumerate(quick):
-                obj = dict(q)
-                if idx < len(raw_items):
-                    obj['_raw'] = raw_items[idx]
-                out.append(obj)
-            quick = out
-        return _json_with_optional_raw(quick, vpr, list_label='vitals')
+        from datetime import datetime, timezone, timedelta
+        types = [t.strip() for t in (request.args.get('types') or request.args.get('type') or '').split(',') if t.strip()]
+        start_epoch = None
+        end_epoch = None
+        try:
+            days = int(str(request.args.get('days') or '0').strip() or '0')
+        except Exception:
+            days = 0
+        if days > 0:
+            now = datetime.now(timezone.utc)
+            start_epoch = (now - timedelta(days=days)).timestamp()
+            end_epoch = now.timestamp()
+        if request.args.get('start'):
+            start_epoch = T.datetime_to_epoch(request.args.get('start')) or start_epoch
+        if request.args.get('end'):
+            end_epoch = T.datetime_to_epoch(request.args.get('end')) or end_epoch
+        try:
+            budget = max(0, min(int(request.args.get('points', '500')), 20000))
+        except Exception:
+            budget = 500
+        method = (request.args.get('method') or 'lttb').strip().lower()
+        if method not in DOWNSAMPLE_METHODS:
+            return jsonify({'error': f"method must be one of {', '.join(DOWNSAMPLE_METHODS)}"}), 400
+
+        store = get_vitals_series(svc, dfn)
+        series = store.query(types=types, start=start_epoch, end=end_epoch, budget=budget, method=method)
+        return jsonify({
+            'dfn': dfn,
+            'generation': store.generation,
+            'start': start_epoch,
+            'end': end_epoch,
+            'points': budget,
+            'method': method,
+            'series': series,
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.get('/<dfn>/quick/notes')
+@_conditional_get
 def notes_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'notes', params=raw_params)
-        quick = svc.get_notes_quick(dfn, params=raw_params)
-        include_raw = request.args.get('includeRaw','0').lower() in ('1','true','yes','on')
-        include_text = request.args.get('includeText','0').lower() in ('1','true','yes','on')
-        include_enc = request.args.get('includeEncounter','0').lower() in ('1','true','yes','on')
-        if (include_raw or include_text or include_enc) and isinstance(quick, list):
-            raw_items = []
-            try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore
-            except Exception:
-                raw_items = []
-            out = []
-            for idx, q in enumerate(quick):
-                obj = dict(q)
-                if idx < len(raw_items):
-                    r = raw_items[idx]
-                    if include_raw:
-                        obj['_raw'] = r
-                    if include_text:
-                        txt = _extract_full_text(r)
-                        if txt:
-                            obj['text'] = txt
-                    if include_enc:
-                        enc = _extract_encounter_info(r)
-                        if enc:
-                            obj['encounter'] = enc
-                out.append(obj)
-            quick = out
-        return _json_with_optional_raw(quick, vpr, list_label='notes')
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.notes)
 
 @bp.get('/<dfn>/quick/documents')
+@_conditional_get
 def documents_quick(dfn: str):
     """Unified documents endpoint with filters and enrichment.
     Query params:
@@ -1108,118 +586,42 @@ def documents_quick(dfn: str):
       - includeText=1: include full text under 'text' when available.
       - includeEncounter=1: include encounter details under 'encounter'.
       - includeRaw=1: include _raw payload for each item.
+      - stream=1 (or Accept: application/x-ndjson): one NDJSON line per document, then a trailer.
     """
+    if not _stream_requested():
+        # Note text makes this the largest quick payload: fast encoder, unsorted keys
+        return _quick_response(dfn, Q.documents, fast=True)
     svc = _get_patient_service()
     try:
-        raw_requested = _raw_requested()
-        include_raw = request.args.get('includeRaw','0').lower() in ('1','true','yes','on')
-        include_text = request.args.get('includeText','0').lower() in ('1','true','yes','on')
-        include_enc = request.args.get('includeEncounter','0').lower() in ('1','true','yes','on')
-        # Fetch raw and quick lists
-        doc_params: Dict[str, str] = {}
-        if include_text or raw_requested:
-            doc_params['text'] = '1'
-        else:
-            doc_params['text'] = '0'
-        if raw_requested or include_raw:
-            doc_params['raw'] = '1'
-        vpr = svc.get_vpr_raw(dfn, 'document', params=doc_params)
-        quick_list = svc.get_documents_quick(dfn, params=dict(doc_params))
-
-        # Proactively build keyword index if not present (lazy in search too)
-        try:
-            _ = get_or_build_index_for_dfn(str(dfn), gateway=svc.gateway, async_build=True)
-        except Exception:
-            pass
-
-        # Normalize filters
-        def _split_params(val: str | None) -> list[str]:
-            if not val:
-                return []
-            parts = []
-            for p in str(val).split(','):
-                s = p.strip()
-                if s:
-                    parts.append(s)
-            return parts
-
-        class_filters = [s.lower() for s in _split_params(request.args.get('class'))]
-        type_filters = [s.lower() for s in _split_params(request.args.get('type'))]
-
-        raw_items = []
-        try:
-            raw_items = T._get_nested_items(vpr)  # type: ignore
-        except Exception:
-            raw_items = []
-
-        # Pair quick with raw by original index to preserve alignment, then filter
-        pairs: list[tuple[dict, dict | None]] = []
-        if isinstance(quick_list, list):
-            for idx, q in enumerate(quick_list):
-                r = raw_items[idx] if idx < len(raw_items) else None
-                if not isinstance(q, dict):
-                    continue
-                pairs.append((q, r if isinstance(r, dict) else None))
-
-        # Apply class filter if provided
-        if class_filters:
-            def _class_matches(q: dict, r: dict | None) -> bool:
-                qc = (q.get('documentClass') or '')
-                rc = (r.get('documentClass') if isinstance(r, dict) else '')
-                s = (qc or rc or '')
-                return s.strip().lower() in class_filters
-            pairs = [(q, r) for (q, r) in pairs if _class_matches(q, r)]
-
-        # Apply type filter if provided (match by name or code)
-        if type_filters:
-            def _type_matches(q: dict, r: dict | None) -> bool:
-                # Name from quick
-                name = (q.get('documentType') or '')
-                # Fallbacks from raw
-                rname = (r.get('documentTypeName') if isinstance(r, dict) else '')
-                rcode = (r.get('documentTypeCode') if isinstance(r, dict) else '')
-                vals = [str(name).lower(), str(rname).lower(), str(rcode).lower()]
-                return any(v in type_filters for v in vals if v)
-            pairs = [(q, r) for (q, r) in pairs if _type_matches(q, r)]
-
-        # Enrichment
-        out = []
-        for (q, r) in pairs:
-            obj = dict(q)
-            if include_raw and isinstance(r, dict):
-                obj['_raw'] = r
-            if include_text and isinstance(r, dict):
-                txt = _extract_full_text(r)
-                if txt:
-                    obj['text'] = txt
-            if include_enc and isinstance(r, dict):
-                enc = _extract_encounter_info(r)
-                if enc:
-                    obj['encounter'] = enc
-            out.append(obj)
-
-        # No background embedding; RAG uses the keyword index's in-memory texts
-
-        result = out if (include_raw or include_text or include_enc or class_filters or type_filters) else quick_list
-        return _json_with_optional_raw(result, vpr, list_label='documents')
+        rows, meta, _quick, _plain = Q.document_rows(svc, dfn, request.args)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    # Enrich while writing: full texts are never all held as one list
+    return _ndjson_response(rows, lambda: meta, dfn=dfn)
 
 
 @bp.get('/<dfn>/list/documents')
+@_conditional_get
 def documents_list_envelope(dfn: str):
     """Paginated list envelope for documents with optional filters.
-    Returns: { items: [], next: string|null, total: number }
+    Returns: { items: [], next: string|null, total: number|null }
     Filters via query params `class` and `type` are supported (same as /quick/documents) but
     envelope is always applied to the resulting list. Full text/raw are not included here by default
     to keep payloads small; clients can follow-up on individual items using quick endpoints with
     includeText/includeEncounter when needed.
+
+    The default order (newest first) pages with keyset cursors over the snapshot's (date, uid)
+    document order: `next` is a cursor to pass back as `cursor`, `next` or `offset`. When the
+    chart's documents are not cached yet and no filter is given, the page is fetched with VPR
+    `stop`/`max` instead of the whole domain and `total` is null. `sort=` other than date
+    descending keeps integer offsets over the fully sorted list.
     """
     svc = _get_patient_service()
     try:
-        # Reuse the quick + filters logic to get the full filtered list, then paginate and sort
-        vpr = svc.get_vpr_raw(dfn, 'notes')  # alias -> documents
-        quick_list = svc.get_documents_quick(dfn)
+        try:
+            cursor = _parse_cursor()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
         def _split_params(val: str | None) -> list[str]:
             if not val:
@@ -1233,36 +635,10 @@ def documents_list_envelope(dfn: str):
 
         class_filters = [s.lower() for s in _split_params(request.args.get('class'))]
         type_filters = [s.lower() for s in _split_params(request.args.get('type'))]
+        sort_param = (request.args.get('sort') or '').strip().lower()
+        keyset = sort_param in ('', 'date', 'date:desc')
 
-        if not isinstance(quick_list, list):
-            quick_list = []
-
-        # Filter using the same rules as documents_quick (without enrichment)
-        items: list[dict] = []
-        raw_items = []
-        try:
-            raw_items = T._get_nested_items(vpr)  # type: ignore
-        except Exception:
-            raw_items = []
-        for idx, q in enumerate(quick_list):
-            if not isinstance(q, dict):
-                continue
-            r = raw_items[idx] if idx < len(raw_items) else None
-            # Class filter
-            if class_filters:
-                qc = (q.get('documentClass') or '')
-                rc = (r.get('documentClass') if isinstance(r, dict) else '')
-                s = (qc or rc or '')
-                if s.strip().lower() not in class_filters:
-                    continue
-            # Type filter
-            if type_filters:
-                name = (q.get('documentType') or '')
-                rname = (r.get('documentTypeName') if isinstance(r, dict) else '')
-                rcode = (r.get('documentTypeCode') if isinstance(r, dict) else '')
-                vals = [str(name).lower(), str(rname).lower(), str(rcode).lower()]
-                if not any(v in type_filters for v in vals if v):
-                    continue
+        def _list_item(q, r):
             # Attach minimal identifiers to support viewer/text-batch on the client
             try:
                 if isinstance(r, dict):
@@ -1277,39 +653,116 @@ def documents_list_envelope(dfn: str):
                         q['uid'] = str(uid)
             except Exception:
                 pass
-            items.append(q)
+            return q
 
-        # Sorting support: sort=field:dir where field in [date,title,author,type,encounter]
-        sort_param = (request.args.get('sort') or '').strip().lower()
-        if sort_param:
-            try:
-                field, direction = (sort_param.split(':', 1) + ['asc'])[:2]
-                direction = 'desc' if direction.strip() == 'desc' else 'asc'
-                key_map = {
-                    'date': lambda o: (o.get('date') or ''),
-                    'title': lambda o: (o.get('title') or ''),
-                    'author': lambda o: (o.get('author') or ''),
-                    'type': lambda o: (o.get('documentType') or ''),
-                    'encounter': lambda o: (o.get('encounterName') or ''),
-                }
-                key_fn = key_map.get(field)
-                if key_fn:
-                    items.sort(key=lambda o: (key_fn(o) or '').lower(), reverse=(direction=='desc'))
-            except Exception:
-                pass
-        else:
-            # Default: date desc
+        def _kick_index():
+            # Proactively build keyword index (optional)
             try:
-                items.sort(key=lambda o: (o.get('date') or ''), reverse=True)
+                _ = get_or_build_index_for_dfn(str(dfn), gateway=svc.gateway, async_build=True)
             except Exception:
                 pass
 
-        # Proactively build keyword index (optional)
+        if keyset:
+            limit = _parse_limit()
+            offset = 0 if cursor is not None else _parse_offset()
+            # Any cached document payload will do (quick/documents fetches with text=0|1)
+            doc_params = next((p for p in _LIST_DOCUMENT_PARAMS if svc.documents_cached(dfn, p)), None)
+            warm = doc_params is not None or svc.documents_cached(dfn)
+            if (
+                DOCUMENTS_LIST_PUSHDOWN
+                and not warm
+                and not offset
+                and not class_filters
+                and not type_filters
+            ):
+                # Cold chart: let VPR cut the window (newest first, up to the cursor's date)
+                stop = T.to_fileman_datetime(cursor[0]) if cursor and cursor[0] else None
+                if stop or not (cursor and cursor[0]):
+                    quick_list, raw_items, truncated = svc.get_documents_window(
+                        dfn, limit + 1 + _CURSOR_TIE_SLACK, stop=stop
+                    )
+                    order = DocumentOrder(quick_list, raw_items)
+                    complete = None
+                    if truncated and len(order):
+                        # VPR may have cut through the oldest date in the window: only
+                        # notes newer than it are known to be all there
+                        boundary = order.keys[0][0]
+                        complete = {pos for key, pos in zip(order.keys, order.positions) if key[0] > boundary}
+                    positions, resume = order.page(limit, cursor=cursor, allowed=complete)
+                    if len(positions) == limit or not truncated:
+                        if resume is None and truncated and positions:
+                            resume = order.keys[order.positions.index(positions[-1])]
+                        _kick_index()
+                        return jsonify({
+                            'items': [
+                                _list_item(quick_list[idx], raw_items[idx] if idx < len(raw_items) else None)
+                                for idx in positions
+                            ],
+                            'next': _encode_cursor(resume) if resume is not None else None,
+                            'total': None,
+                        })
+                    # Too many notes share a date for the window: page over the full list
+
+            quick_list = svc.get_documents_quick(dfn, params=doc_params)
+            if not isinstance(quick_list, list):
+                quick_list = []
+            raw_items = T._get_nested_items(svc.get_vpr_raw(dfn, 'notes', params=doc_params))  # type: ignore
+            allowed = None
+            if class_filters or type_filters:
+                allowed = set(svc.get_document_index(dfn, doc_params).select(class_filters, type_filters) or ())
+            order = svc.get_document_order(dfn, doc_params)
+            positions, resume = order.page(limit, cursor=cursor, offset=offset, allowed=allowed)
+            _kick_index()
+            return jsonify({
+                'items': [
+                    _list_item(quick_list[idx], raw_items[idx] if idx < len(raw_items) else None)
+                    for idx in positions
+                    if idx < len(quick_list)
+                ],
+                'next': _encode_cursor(resume) if resume is not None else None,
+                'total': len(order) if allowed is None else len(allowed),
+            })
+
+        # Reuse the quick + filters logic to get the full filtered list, then paginate and sort
+        vpr = svc.get_vpr_raw(dfn, 'notes')  # alias -> documents
+        quick_list = svc.get_documents_quick(dfn)
+        if not isinstance(quick_list, list):
+            quick_list = []
+
+        # Filter using the same rules as documents_quick (without enrichment)
+        items: list[dict] = []
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        positions = None
+        if class_filters or type_filters:
+            positions = svc.get_document_index(dfn).select(class_filters, type_filters)
+        for idx in (positions if positions is not None else range(len(quick_list))):
+            q = quick_list[idx] if idx < len(quick_list) else None
+            if not isinstance(q, dict):
+                continue
+            items.append(_list_item(q, raw_items[idx] if idx < len(raw_items) else None))
+
+        # Sorting support: sort=field:dir where field in [date,title,author,type,encounter]
         try:
-            _ = get_or_build_index_for_dfn(str(dfn), gateway=svc.gateway, async_build=True)
+            field, direction = (sort_param.split(':', 1) + ['asc'])[:2]
+            direction = 'desc' if direction.strip() == 'desc' else 'asc'
+            key_map = {
+                'date': lambda o: (o.get('date') or ''),
+                'title': lambda o: (o.get('title') or ''),
+                'author': lambda o: (o.get('author') or ''),
+                'type': lambda o: (o.get('documentType') or ''),
+                'encounter': lambda o: (o.get('encounterName') or ''),
+            }
+            key_fn = key_map.get(field)
+            if key_fn:
+                items.sort(key=lambda o: (key_fn(o) or '').lower(), reverse=(direction=='desc'))
         except Exception:
             pass
 
+        _kick_index()
         return jsonify(_envelope_list(items))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1337,7 +790,7 @@ def documents_text_batch_api(dfn: str):
             lines = texts.get(doc_id)
             if lines:
                 notes_out.append({'doc_id': doc_id, 'text': list(lines)})
-        return jsonify({'notes': notes_out})
+        return fast_jsonify({'notes': notes_out})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1356,55 +809,20 @@ def documents_search(dfn: str):
             return jsonify({'items': [], 'next': None, 'total': 0})
         field_set = set([s.strip().lower() for s in fields.split(',') if s.strip()])
         index = get_or_build_index_for_dfn(dfn)
-        results = index.search(q, fields=field_set)
-        total = len(results)
-        start = min(offset, total)
-        end = min(start + limit, total)
-        page = results[start:end]
+        page, total = index.search_page(q, fields=field_set, limit=limit, offset=offset)
+        end = min(offset, total) + len(page)
         next_token = str(end) if end < total else None
         return jsonify({ 'items': page, 'next': next_token, 'total': total })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.get('/<dfn>/quick/radiology')
+@_conditional_get
 def radiology_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'radiology', params=raw_params)
-        quick = svc.get_radiology_quick(dfn, params=raw_params)
-        include_raw = request.args.get('includeRaw','0').lower() in ('1','true','yes','on')
-        include_text = request.args.get('includeText','0').lower() in ('1','true','yes','on')
-        include_enc = request.args.get('includeEncounter','0').lower() in ('1','true','yes','on')
-        if (include_raw or include_text or include_enc) and isinstance(quick, list):
-            raw_items = []
-            try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore
-            except Exception:
-                raw_items = []
-            out = []
-            for idx, q in enumerate(quick):
-                obj = dict(q)
-                if idx < len(raw_items):
-                    r = raw_items[idx]
-                    if include_raw:
-                        obj['_raw'] = r
-                    if include_text:
-                        txt = _extract_full_text(r)
-                        if txt:
-                            obj['text'] = txt
-                    if include_enc:
-                        enc = _extract_encounter_info(r)
-                        if enc:
-                            obj['encounter'] = enc
-                out.append(obj)
-            quick = out
-        return _json_with_optional_raw(quick, vpr, list_label='radiology')
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.radiology)
 
 @bp.get('/<dfn>/list/labs')
+@_conditional_get
 def labs_list_envelope(dfn: str):
     """Paginated list envelope for labs (quick shape), with optional filters converted to FileMan.
     Returns: { items: [], next: string|null, total: number }
@@ -1434,6 +852,7 @@ def labs_list_envelope(dfn: str):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 @bp.get('/<dfn>/list/radiology')
+@_conditional_get
 def radiology_list_envelope(dfn: str):
     """Paginated list envelope for radiology (quick shape), with optional filters converted to FileMan.
     Returns: { items: [], next: string|null, total: number }
@@ -1462,6 +881,7 @@ def radiology_list_envelope(dfn: str):
         return jsonify({'error': str(e)}), 500
 
 @bp.get('/<dfn>/list/meds')
+@_conditional_get
 def meds_list_envelope(dfn: str):
     """Paginated list envelope for medications (quick shape).
     Returns: { items: [], next: string|null, total: number }
@@ -1491,6 +911,7 @@ def meds_list_envelope(dfn: str):
         return jsonify({'error': str(e)}), 500
 
 @bp.get('/<dfn>/list/vitals')
+@_conditional_get
 def vitals_list_envelope(dfn: str):
     """Paginated list envelope for vitals (quick shape).
     Returns: { items: [], next: string|null, total: number }
@@ -1520,67 +941,14 @@ def vitals_list_envelope(dfn: str):
         return jsonify({'error': str(e)}), 500
 
 @bp.get('/<dfn>/quick/procedures')
+@_conditional_get
 def procedures_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'procedures', params=raw_params)
-        quick = svc.get_procedures_quick(dfn, params=raw_params)
-        include_raw = request.args.get('includeRaw','0').lower() in ('1','true','yes','on')
-        include_text = request.args.get('includeText','0').lower() in ('1','true','yes','on')
-        include_enc = request.args.get('includeEncounter','0').lower() in ('1','true','yes','on')
-        if (include_raw or include_text or include_enc) and isinstance(quick, list):
-            raw_items = []
-            try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore
-            except Exception:
-                raw_items = []
-            out = []
-            for idx, q in enumerate(quick):
-                obj = dict(q)
-                if idx < len(raw_items):
-                    r = raw_items[idx]
-                    if include_raw:
-                        obj['_raw'] = r
-                    if include_text:
-                        txt = _extract_full_text(r)
-                        if txt:
-                            obj['text'] = txt
-                    if include_enc:
-                        enc = _extract_encounter_info(r)
-                        if enc:
-                            obj['encounter'] = enc
-                out.append(obj)
-            quick = out
-        return _json_with_optional_raw(quick, vpr, list_label='procedures')
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.procedures)
 
 @bp.get('/<dfn>/quick/encounters')
+@_conditional_get
 def encounters_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'encounters', params=raw_params)
-        quick = svc.get_encounters_quick(dfn, params=raw_params)
-        if (request.args.get('includeRaw','0').lower() in ('1','true','yes','on')) and isinstance(quick, list):
-            raw_items = []
-            try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore
-            except Exception:
-                raw_items = []
-            out = []
-            for idx, q in enumerate(quick):
-                obj = dict(q)
-                if idx < len(raw_items):
-                    obj['_raw'] = raw_items[idx]
-                out.append(obj)
-            quick = out
-        return _json_with_optional_raw(quick, vpr, list_label='encounters')
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.encounters)
 # Raw VPR domain passthrough
 @bp.get('/<dfn>/vpr/<domain>')
 def vpr_raw(dfn: str, domain: str):
@@ -1589,7 +957,10 @@ def vpr_raw(dfn: str, domain: str):
         # Best-effort param collection using a union of commonly safe keys
         params = _collect_params('start','stop','max','id','uid','status','category','text','nowrap','vaType')
         vpr = svc.get_vpr_raw(dfn, domain, params=params)
-        return jsonify(vpr)
+        if _stream_requested():
+            return _ndjson_response(T._get_nested_items(vpr), lambda: _payload_meta(vpr), dfn=dfn)
+        # Pass-through returns every field, so normalize lazy items in one go
+        return jsonify(materialize_payload(vpr))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1607,14 +978,30 @@ def vpr_item(dfn: str, domain: str):
             return jsonify({'error': 'one of uid or id is required'}), 400
         params = _collect_params('id','uid','nowrap','start','stop','max')
         vpr = svc.get_vpr_raw(dfn, domain, params=params)
-        return jsonify(vpr)
+        return jsonify(materialize_payload(vpr))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Full VPR chart without domain filtering (large payload)
 @bp.get('/<dfn>/fullchart')
 def fullchart(dfn: str):
+    """Full VPR chart. With ?stream=1 (or Accept: application/x-ndjson) items are
+    streamed as NDJSON as each domain arrives; the trailer's meta carries per-domain counts.
+    """
     svc = _get_patient_service()
+    if _stream_requested():
+        counts: Dict[str, int] = {}
+
+        def _items():
+            for dom, items in svc.iter_fullchart(dfn):
+                counts[dom or 'fullchart'] = len(items)
+                yield from items
+
+        return _ndjson_response(
+            _items(),
+            lambda: {'domain': 'fullchart', 'dfn': str(dfn), 'domains': dict(counts)},
+            dfn=dfn,
+        )
     try:
         vpr = svc.get_fullchart(dfn)
         return jsonify(vpr)
@@ -1762,81 +1149,255 @@ def documents_default_vpr(dfn: str):
 
 # Quick routes: problems & allergies
 @bp.get('/<dfn>/quick/problems')
+@_conditional_get
 def problems_quick(dfn: str):
-    svc = _get_patient_service()
-    try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'problems', params=raw_params)
-        quick = svc.get_problems_quick(dfn, params=raw_params)
-        include_raw = request.args.get('includeRaw','0').lower() in ('1','true','yes','on')
-        # Accept detail=1 as alias for includeComments=1 (frontend convenience)
-        include_comments = request.args.get('includeComments','0').lower() in ('1','true','yes','on')
-        if not include_comments:
-            include_comments = request.args.get('detail','0').lower() in ('1','true','yes','on')
-        status_filter = (request.args.get('status') or 'all').strip().lower()  # 'active' | 'inactive' | 'all'
-        if (include_raw or include_comments or status_filter != 'all') and isinstance(quick, list):
-            raw_items = []
-            try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore
-            except Exception:
-                raw_items = []
-            out = []
-            for idx, q in enumerate(quick):
-                obj = dict(q)
-                raw = raw_items[idx] if idx < len(raw_items) else None
-                # status filtering
-                if status_filter != 'all':
-                    # Try quick status first
-                    is_active = _is_problem_active(obj.get('status'))
-                    if is_active is None and isinstance(raw, dict):
-                        is_active = _is_problem_active(raw.get('statusName') or raw.get('status'))
-                    # If still None, treat as unknown: only include in 'all'
-                    if is_active is None:
-                        if status_filter in ('active','inactive'):
-                            continue
-                    else:
-                        if status_filter == 'active' and not is_active:
-                            continue
-                        if status_filter == 'inactive' and is_active:
-                            continue
-                # enrich
-                if include_raw and isinstance(raw, dict):
-                    obj['_raw'] = raw
-                if include_comments and isinstance(raw, dict):
-                    comments = _extract_problem_comments(raw)
-                    if comments:
-                        obj['comments'] = comments
-                out.append(obj)
-            quick = out
-        return _json_with_optional_raw(quick, vpr, list_label='problems')
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    return _quick_response(dfn, Q.problems)
 
 @bp.get('/<dfn>/quick/allergies')
+@_conditional_get
 def allergies_quick(dfn: str):
-    svc = _get_patient_service()
+    return _quick_response(dfn, Q.allergies)
+
+
+# ----------------- Multi-domain bundle -----------------
+
+_BUNDLE_DEFAULT_DOMAINS = ('demographics', 'meds', 'labs', 'vitals', 'problems', 'allergies')
+_BUNDLE_MAX_WORKERS = max(1, int(os.getenv('BUNDLE_MAX_WORKERS', '6') or 6))
+_BUNDLE_POOL: ThreadPoolExecutor | None = None
+_BUNDLE_POOL_LOCK = threading.Lock()
+
+
+def _bundle_pool() -> ThreadPoolExecutor:
+    global _BUNDLE_POOL
+    with _BUNDLE_POOL_LOCK:
+        if _BUNDLE_POOL is None:
+            _BUNDLE_POOL = ThreadPoolExecutor(max_workers=_BUNDLE_MAX_WORKERS, thread_name_prefix='omar-bundle')
+        return _BUNDLE_POOL
+
+
+def _bundle_args(domain: str) -> MultiDict:
+    """Query args for one bundled domain: shared args, then ``<domain>.<arg>`` overrides."""
+    shared = MultiDict()
+    scoped = MultiDict()
+    prefix = f'{domain}.'
+    for key, value in request.args.items(multi=True):
+        if key in ('domains', 'stream', 'index', 'model'):
+            continue
+        if key.startswith(prefix):
+            scoped.add(key[len(prefix):], value)
+        elif '.' not in key:
+            shared.add(key, value)
+    for key in scoped.keys():
+        shared.setlist(key, scoped.getlist(key))
+    return shared
+
+
+def _bundle_part(app, gateway: Any, dfn: str, domain: str, args: MultiDict) -> tuple[str, int, Any]:
+    """Build one quick view on a bundle worker; returns (domain, status, body).
+
+    Each part gets its own PatientService over the bundle request's gateway,
+    so the views share the gateway cache and patient snapshot but no
+    per-request state. Only an app context is pushed (config, logging).
+    """
+    svc = PatientService(gateway=gateway)
+    with app.app_context():
+        try:
+            return domain, 200, Q.QUICK_VIEWS[domain](svc, dfn, args)
+        except Exception as exc:
+            return domain, 500, {'error': str(exc)}
+
+
+def _requested_domains() -> list[str]:
+    requested = [d.strip() for d in (request.args.get('domains') or '').split(',') if d.strip()]
+    return list(dict.fromkeys(requested or _BUNDLE_DEFAULT_DOMAINS))
+
+
+def _unknown_quick_domain(requested: list[str]) -> str | None:
+    """The first requested name that is not a quick view, if any."""
+    return next((domain for domain in requested if domain not in Q.QUICK_VIEWS), None)
+
+
+def _submit_quick(gateway: Any, dfn: str, requested: list[str]) -> list:
+    """Start every requested quick view on the bundle pool; futures resolve to (domain, status, body)."""
+    app = current_app._get_current_object()
+    pool = _bundle_pool()
+    return [pool.submit(_bundle_part, app, gateway, dfn, domain, _bundle_args(domain)) for domain in requested]
+
+
+@bp.get('/<dfn>/quick/bundle')
+def quick_bundle(dfn: str):
+    """Several quick domains in one request, fetched concurrently.
+    Query params:
+      - domains: comma-separated quick endpoint names (meds, labs, vitals, problems, allergies,
+                 documents, orders, ...). Defaults to demographics,meds,labs,vitals,problems,allergies.
+      - Any filter the single /quick/<domain> endpoints accept. Plain args apply to every domain;
+        `<domain>.<arg>` (e.g. labs.start=..., documents.class=...) applies to that domain only.
+      - stream=1: return application/x-ndjson, one line per domain in completion order
+                  ({domain, status, data}), then a final {done, domains, errors, elapsedMs} line.
+    Default response: { dfn, domains: {name: data}, status: {name: code}, elapsedMs, context }
+    where each data is what the single endpoint returns (without its context block).
+    """
+    requested = _requested_domains()
+    unknown = _unknown_quick_domain(requested)
+    if unknown:
+        return jsonify({'error': f'unknown quick domain: {unknown}'}), 400
+
+    started = time.perf_counter()
+    futures = _submit_quick(_get_patient_service().gateway, dfn, requested)
+
+    def _elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000.0, 1)
+
+    if request.args.get('stream', '0').lower() in ('1', 'true', 'yes', 'on'):
+        def _lines():
+            errors = 0
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    domain, status, body = fut.result()
+                    errors += status >= 400
+                    yield _json_bytes({'domain': domain, 'status': status, 'data': body}) + b'\n'
+            trailer = {'done': True, 'domains': len(futures), 'errors': errors, 'elapsedMs': _elapsed_ms()}
+            yield _json_bytes(merge_context(trailer, dfn=dfn)) + b'\n'
+
+        return Response(stream_with_context(_lines()), mimetype='application/x-ndjson')
+
+    results = [fut.result() for fut in futures]
+    payload = {
+        'dfn': str(dfn),
+        'domains': {domain: body for domain, _, body in results},
+        'status': {domain: code for domain, code, _ in results},
+        'elapsedMs': _elapsed_ms(),
+        'context': build_context(dfn=dfn),
+    }
+    resp = Response(_json_bytes(payload), mimetype='application/json')
+    resp.context_attached = True
+    return resp
+
+
+# ----------------- Server-Sent Events chart stream -----------------
+
+_SSE_MIMETYPE = 'text/event-stream'
+_SSE_KEEPALIVE_SECONDS = 15.0
+PATIENT_STREAM_READY_TIMEOUT = max(0.0, float(os.getenv('PATIENT_STREAM_READY_TIMEOUT', '30') or 30))
+# An open stream holds a worker thread for up to PATIENT_STREAM_READY_TIMEOUT; cap them per process
+PATIENT_STREAM_MAX_CONCURRENT = max(1, int(os.getenv('PATIENT_STREAM_MAX_CONCURRENT', '4') or 4))
+_STREAM_SLOTS = threading.BoundedSemaphore(PATIENT_STREAM_MAX_CONCURRENT)
+
+
+def _sse(event: str, data: bytes) -> bytes:
+    """One SSE frame; ``data`` is compact JSON, so it never spans lines."""
+    return b'event: ' + event.encode('ascii') + b'\ndata: ' + data + b'\n\n'
+
+
+@bp.get('/<dfn>/stream')
+def patient_stream(dfn: str):
+    """Progressive chart load over one Server-Sent Events connection.
+    Query params:
+      - domains, and per-domain `<domain>.<arg>` filters: as for /quick/bundle.
+      - index=0: end after the domain events (no document index / RAG readiness).
+      - model: RAG model whose index readiness is reported (default 'default').
+    Events, in order:
+      - open:      {dfn, domains, context}
+      - domain:    {domain, status, elapsedMs, data} per domain as soon as its quick payload is ready
+      - doc-index: the document search index manifest whenever it changes, until it is built
+      - rag:       RAG store status for `model` once indexed (or `{indexed: false}` at the timeout)
+      - done:      {domains, errors, elapsedMs, context}
+    Waits for readiness are capped by PATIENT_STREAM_READY_TIMEOUT seconds and block on change
+    notifications from the document index and the RAG store (no polling); idle periods send
+    `: keepalive` comments. At most PATIENT_STREAM_MAX_CONCURRENT streams are open per process;
+    beyond that the request gets 503 with Retry-After.
+    """
+    requested = _requested_domains()
+    unknown = _unknown_quick_domain(requested)
+    if unknown:
+        return jsonify({'error': f'unknown quick domain: {unknown}'}), 400
+    want_index = request.args.get('index', '1').lower() not in ('0', 'false', 'no', 'off')
+    model = (request.args.get('model') or 'default').strip() or 'default'
+
+    if not _STREAM_SLOTS.acquire(blocking=False):
+        busy = jsonify({'error': 'too many open patient streams', 'limit': PATIENT_STREAM_MAX_CONCURRENT})
+        busy.status_code = 503
+        busy.headers['Retry-After'] = '5'
+        return busy
+    released = threading.Lock()
+
+    def _release_slot() -> None:
+        if released.acquire(blocking=False):
+            _STREAM_SLOTS.release()
+
     try:
-        raw_requested = _raw_requested()
-        raw_params = {'raw': '1'} if raw_requested else None
-        vpr = svc.get_vpr_raw(dfn, 'allergies', params=raw_params)
-        quick = svc.get_allergies_quick(dfn, params=raw_params)
-        if (request.args.get('includeRaw','0').lower() in ('1','true','yes','on')) and isinstance(quick, list):
-            raw_items = []
+        svc = _get_patient_service()
+        futures = _submit_quick(svc.gateway, dfn, requested)
+    except BaseException:
+        _release_slot()
+        raise
+    started = time.perf_counter()
+
+    def _elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000.0, 1)
+
+    def _events():
+        yield _sse('open', _json_bytes({'dfn': str(dfn), 'domains': requested, 'context': build_context(dfn=dfn)}))
+        errors = 0
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=_SSE_KEEPALIVE_SECONDS, return_when=FIRST_COMPLETED)
+            if not done:
+                yield b': keepalive\n\n'
+                continue
+            for fut in done:
+                domain, status, body = fut.result()
+                errors += status >= 400
+                yield _sse('domain', _json_bytes({'domain': domain, 'status': status, 'elapsedMs': _elapsed_ms(), 'data': body}))
+
+        if want_index:
+            deadline = time.monotonic() + PATIENT_STREAM_READY_TIMEOUT
+            last_write = time.monotonic()
             try:
-                raw_items = T._get_nested_items(vpr)  # type: ignore
-            except Exception:
-                raw_items = []
-            out = []
-            for idx, q in enumerate(quick):
-                obj = dict(q)
-                if idx < len(raw_items):
-                    obj['_raw'] = raw_items[idx]
-                out.append(obj)
-            quick = out
-        return _json_with_optional_raw(quick, vpr, list_label='allergies')
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+                index = get_or_build_index_for_dfn(str(dfn), gateway=svc.gateway, async_build=True)
+            except Exception as e:
+                index = None
+                yield _sse('doc-index', _json_bytes({'dfn': str(dfn), 'ready': False, 'error': str(e)}))
+            sent = None
+            while index is not None:
+                # Read the counter first: a change made while building the manifest still wakes us
+                seen = index.change_count()
+                manifest = index.manifest()
+                manifest['ready'] = not index.is_building()
+                if manifest != sent:
+                    sent = manifest
+                    last_write = time.monotonic()
+                    yield _sse('doc-index', _json_bytes(manifest))
+                now = time.monotonic()
+                if manifest['ready'] or now >= deadline:
+                    break
+                wait_for = min(deadline - now, last_write + _SSE_KEEPALIVE_SECONDS - now)
+                if index.wait_changed(seen, wait_for) == seen and time.monotonic() - last_write >= _SSE_KEEPALIVE_SECONDS:
+                    last_write = time.monotonic()
+                    yield b': keepalive\n\n'
+            while True:
+                try:
+                    now = time.monotonic()
+                    wait_for = min(deadline - now, last_write + _SSE_KEEPALIVE_SECONDS - now)
+                    rag = rag_store.wait_indexed(str(dfn), wait_for, model=model)
+                except Exception as e:
+                    rag = {'dfn': str(dfn), 'model': model, 'indexed': False, 'error': str(e)}
+                if rag.get('indexed') or 'error' in rag or time.monotonic() >= deadline:
+                    yield _sse('rag', _json_bytes(rag))
+                    break
+                last_write = time.monotonic()
+                yield b': keepalive\n\n'
+
+        trailer = {'domains': len(futures), 'errors': errors, 'elapsedMs': _elapsed_ms(), 'context': build_context(dfn=dfn)}
+        yield _sse('done', _json_bytes(trailer))
+
+    resp = Response(stream_with_context(_events()), mimetype=_SSE_MIMETYPE)
+    resp.headers['X-Accel-Buffering'] = 'no'  # no proxy buffering (nginx)
+    # The server closes the response when the stream ends or the client goes away
+    resp.call_on_close(_release_slot)
+    return resp
 
 
 # ----------------- Additional VPR domains (raw passthrough) -----------------
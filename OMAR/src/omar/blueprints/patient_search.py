@@ -1,35 +1,15 @@
 from __future__ import annotations
-import json
 import os
 import time
 from flask import Blueprint, jsonify, request, current_app
 from ..gateways.factory import get_gateway
-from ..utils.context import merge_context
+from ..utils.context import context_blueprint
 from ..services import user_settings
 
 # Exposes the classic OMAR patient search endpoints at the root path
 # - GET  /vista_default_patient_list
 # - POST /vista_patient_search
-bp = Blueprint('patient_search', __name__)
-
-
-@bp.after_request
-def _attach_context(response):  # type: ignore[override]
-    try:
-        if not response.is_json:
-            return response
-        data = response.get_json(silent=True)
-        if data is None:
-            return response
-        wrapped = merge_context(data)
-        if wrapped is data:
-            return response
-        response.set_data(json.dumps(wrapped, ensure_ascii=False))
-        response.headers['Content-Type'] = 'application/json'
-        response.headers['Content-Length'] = str(len(response.get_data()))
-    except Exception:
-        pass
-    return response
+bp = context_blueprint(Blueprint('patient_search', __name__))
 
 
 def _unwrap_vax_raw(raw_val):
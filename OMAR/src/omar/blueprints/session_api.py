@@ -131,10 +131,8 @@ def purge_state():
 		r.delete(_state_key(uid, pid))
 	try:
 		from ..gateways.factory import get_gateway
-		gw = get_gateway()
-		clear_fn = getattr(gw, 'clear_patient_cache', None)
-		if callable(clear_fn):
-			clear_fn(pid)
+		from ..services.patient_snapshot import invalidate_patient
+		invalidate_patient(get_gateway(), pid)
 	except Exception:
 		pass
 	return jsonify(merge_context({'ok': True}, dfn=pid))
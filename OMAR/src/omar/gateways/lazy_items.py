@@ -0,0 +1,234 @@
+"""Lazy VPR item views.
+
+Quick transforms read a handful of fields from each VPR item, yet normalizing
+an item walks every nested element. ``LazyVprItem`` keeps the parsed (still
+xmltodict-shaped) item and normalizes a top-level field the first time it is
+read. Anything that needs the whole item (iteration, ``items()``, JSON
+serialization, equality, mutation, copying) materializes it once with the
+gateway's full normalizer, so the observable result is identical to eager
+normalization.
+
+The gateway supplies two callables per item:
+    decode_field(raw, spec) -> normalized value of one top-level field
+    materialize(raw)        -> fully normalized item dict
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Iterator, List
+
+
+# Storage placeholder for fields that have not been normalized yet. Keys are
+# present from the start so ordering, ``in``, ``len`` and truthiness behave
+# like the eager dict, and C code that checks the dict size sees the truth.
+_UNDECODED = object()
+_MISSING = object()
+
+
+class LazyVprItem(dict):
+    """A dict whose top-level values are normalized on first access.
+
+    Items live in the shared gateway cache, so several request threads may
+    read one view at once. Decoded values and the materialized dict are
+    computed outside the per-item lock and only published under it; a key
+    never disappears and a value handed out is never replaced.
+    """
+
+    __slots__ = ('_raw', '_fields', '_lazy', '_decode_field', '_materialize', '_lock')
+
+    def __init__(
+        self,
+        raw: Dict[str, Any],
+        fields: Dict[str, Any],
+        decode_field: Callable[[Dict[str, Any], Any], Any],
+        materialize: Callable[[Dict[str, Any]], Dict[str, Any]],
+    ) -> None:
+        super().__init__(dict.fromkeys(fields, _UNDECODED))
+        self._raw = raw
+        # Final key (in normalized order) -> gateway-specific decode spec
+        self._fields = fields
+        self._lazy = True
+        self._decode_field = decode_field
+        self._materialize = materialize
+        self._lock = threading.Lock()
+
+    # -- lazy access ---------------------------------------------------
+    def _decode(self, key: Any) -> Any:
+        value = self._decode_field(self._raw, self._fields[key])
+        with self._lock:
+            # Another thread may have decoded or materialized meanwhile
+            current = dict.get(self, key, _UNDECODED)
+            if current is not _UNDECODED:
+                return current
+            dict.__setitem__(self, key, value)
+        return value
+
+    def __getitem__(self, key: Any) -> Any:
+        value = dict.__getitem__(self, key)
+        if value is _UNDECODED:
+            value = self._decode(key)
+        return value
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = dict.get(self, key, _MISSING)
+        if value is _UNDECODED:
+            value = self._decode(key)
+        elif value is _MISSING:
+            return default
+        return value
+
+    # -- full materialization -----------------------------------------
+    def materialize(self) -> 'LazyVprItem':
+        """Normalize every field now; afterwards this behaves as a plain dict."""
+        if not self._lazy:
+            return self
+        full = self._materialize(self._raw)
+        with self._lock:
+            if not self._lazy:
+                return self
+            # Keep already-decoded values so references handed out stay live
+            for key, value in dict.items(self):
+                if value is not _UNDECODED and key in full:
+                    full[key] = value
+            if list(full) == list(dict.keys(self)):
+                # Same keys in the same order: overwrite placeholders in place
+                # so concurrent readers never see a missing key
+                dict.update(self, full)
+            else:
+                dict.clear(self)
+                dict.update(self, full)
+            self._lazy = False
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.materialize()
+        return dict(dict.items(self))
+
+    def clone(self) -> Any:
+        """Independent copy; untouched views stay lazy and share the parsed item."""
+        if self._lazy:
+            return LazyVprItem(self._raw, self._fields, self._decode_field, self._materialize)
+        return copy_payload(self.to_dict())
+
+    def __iter__(self) -> Iterator[Any]:
+        self.materialize()
+        return dict.__iter__(self)
+
+    def keys(self):  # type: ignore[override]
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):  # type: ignore[override]
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):  # type: ignore[override]
+        self.materialize()
+        return dict.items(self)
+
+    def copy(self) -> Dict[str, Any]:  # type: ignore[override]
+        return self.to_dict()
+
+    def __eq__(self, other: Any) -> bool:
+        self.materialize()
+        if isinstance(other, LazyVprItem):
+            other.materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: Any) -> bool:
+        return not self.__eq__(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        self.materialize()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        # copy/deepcopy/pickle produce plain dicts
+        return (dict, (self.to_dict(),))
+
+    # -- mutation materializes first ------------------------------------
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.materialize()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self.materialize()
+        dict.__delitem__(self, key)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self.materialize()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key: Any, *args: Any) -> Any:
+        self.materialize()
+        return dict.pop(self, key, *args)
+
+    def popitem(self) -> Any:
+        self.materialize()
+        return dict.popitem(self)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self.materialize()
+        dict.update(self, *args, **kwargs)
+
+    def clear(self) -> None:
+        self.materialize()
+        dict.clear(self)
+
+    def __or__(self, other: Any) -> Any:
+        return self.to_dict() | other
+
+    def __ior__(self, other: Any) -> 'LazyVprItem':
+        self.update(other)
+        return self
+
+
+def copy_payload(value: Any) -> Any:
+    """Deep copy a gateway payload (JSON semantics) keeping lazy items lazy."""
+    if isinstance(value, LazyVprItem):
+        return value.clone()
+    if isinstance(value, dict):
+        return {k: copy_payload(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [copy_payload(v) for v in value]
+    return value
+
+
+def materialize_items(items: Any) -> Any:
+    """Return ``items`` with any lazy views replaced by plain dicts."""
+    if not isinstance(items, list):
+        return items
+    if not any(isinstance(it, LazyVprItem) for it in items):
+        return items
+    return [it.to_dict() if isinstance(it, LazyVprItem) else it for it in items]
+
+
+def materialize_payload(payload: Any) -> Any:
+    """Materialize lazy items in a wrapped VPR payload (items / data.items)."""
+    if not isinstance(payload, dict):
+        return materialize_items(payload)
+    out = payload
+    items = payload.get('items')
+    if isinstance(items, list):
+        materialized = materialize_items(items)
+        if materialized is not items:
+            out = dict(payload)
+            out['items'] = materialized
+    data = payload.get('data')
+    if isinstance(data, dict) and isinstance(data.get('items'), list):
+        data_items = data['items']
+        if data_items is items and out is not payload:
+            new_data_items: List[Any] = out['items']
+        else:
+            new_data_items = materialize_items(data_items)
+        if new_data_items is not data_items:
+            if out is payload:
+                out = dict(payload)
+            out['data'] = dict(data)
+            out['data']['items'] = new_data_items
+    return out
+
+
+__all__ = ['LazyVprItem', 'copy_payload', 'materialize_items', 'materialize_payload']
@@ -0,0 +1,102 @@
+"""Single-flight coalescing for identical in-flight gateway calls.
+
+When several request threads ask for the same VPR payload at once (for example
+``/quick/documents``, ``/list/documents`` and the document index build all
+requesting the ``document`` domain during patient load) only the first caller
+(the *leader*) reaches VistA. Callers that arrive while the leader is still
+running wait on the leader's result instead of issuing their own upstream call.
+
+The coalescing window is exactly the lifetime of the upstream call: once the
+leader finishes the key is released, so later callers go through the normal
+cache path of the owning gateway.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _InFlightCall:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one upstream call."""
+
+    def __init__(self, name: str = '') -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _InFlightCall] = {}
+        self._leader_calls = 0
+        self._coalesced_hits = 0
+        self._leader_errors = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``fn`` once per in-flight ``key``.
+
+        Returns ``(result, shared)`` where ``shared`` is True when the result
+        was produced by another thread's call. Exceptions raised by the leader
+        are re-raised in every waiter.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._coalesced_hits += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._leader_calls += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            with self._lock:
+                self._leader_errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            leaders = self._leader_calls
+            coalesced = self._coalesced_hits
+            return {
+                'name': self.name,
+                'leader_calls': leaders,
+                'coalesced_hits': coalesced,
+                'leader_errors': self._leader_errors,
+                'in_flight': len(self._calls),
+                'coalesced_ratio': (coalesced / float(leaders + coalesced)) if (leaders + coalesced) else 0.0,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._leader_calls = 0
+            self._coalesced_hits = 0
+            self._leader_errors = 0
+
+
+__all__ = ['SingleFlight']
@@ -1,9 +1,11 @@
 from __future__ import annotations
+import json
 import os
 import time
 import requests
 from typing import Any, Dict, List, Optional, Tuple
 from .data_gateway import DataGateway, GatewayError
+from .single_flight import SingleFlight
 from ..services.labs_rpc import filter_panels, parse_orwor_result, parse_orwcv_lab
 from ..services.transforms import vpr_to_quick_notes
 
@@ -22,6 +24,19 @@ if not VERIFY_SSL and SUPPRESS_TLS_WARNINGS:
     except Exception:
         pass
 
+# Gateway instances are built per request, so coalescing state lives at module level
+_VPR_INFLIGHT = SingleFlight(name="vista-api-x:vpr")
+
+
+def _params_signature(params: Optional[Dict[str, Any]]) -> str:
+    if not params:
+        return ""
+    try:
+        return json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    except Exception:
+        return str(sorted((str(k), str(v)) for k, v in params.items()))
+
+
 class VistaApiXGateway(DataGateway):
     """HTTP facade to vista-api-x with single refresh and simple backoff."""
     def __init__(self, station: str = "500", duz: str = "983"):
@@ -68,7 +83,19 @@ class VistaApiXGateway(DataGateway):
         """Generic VPR GET PATIENT DATA JSON call for any domain.
         Known domains include: patient, meds, labs, vitals, problems, visits, documents, radiology, allergies, etc.
         Extra key/values can be added via params for server-side filtering when supported.
+        Concurrent identical calls (same station/DUZ, DFN, domain and params) share one upstream request.
         """
+        key = (self.station, self.duz, str(dfn), str(domain), _params_signature(params))
+        payload, shared = _VPR_INFLIGHT.do(key, lambda: self._fetch_vpr_domain(dfn, domain, params))
+        if shared:
+            return json.loads(json.dumps(payload))  # waiters get their own copy
+        return payload
+
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Return process-wide single-flight counters for vista-api-x VPR fetches."""
+        return _VPR_INFLIGHT.stats()
+
+    def _fetch_vpr_domain(self, dfn: str, domain: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         body_params: Dict[str, Any] = {"patientId": str(dfn), "domain": str(domain)}
         if params and isinstance(params, dict):
             body_params.update({k: v for k, v in params.items() if v is not None})
@@ -7,7 +7,8 @@ import threading
 import time
 from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     import xmltodict  # type: ignore
@@ -15,7 +16,9 @@ except Exception:  # pragma: no cover
     xmltodict = None  # type: ignore
 
 from .data_gateway import DataGateway, GatewayError
-from .vpr_xml_parser import parse_vpr_results_xml
+from .lazy_items import LazyVprItem, copy_payload
+from .single_flight import SingleFlight
+from .vpr_xml_parser import parse_vpr_results_xml, looks_like_vpr_results
 from ..services.labs_rpc import filter_panels, parse_orwcv_lab, parse_orwor_result
 from ..services.transforms import vpr_to_quick_notes
 
@@ -35,36 +38,6 @@ def _coerce_boolish(val: Any) -> Any:
     return val
 
 
-def _strip_xml_attrs(obj: Any) -> Any:
-    if isinstance(obj, dict):
-        result: Dict[str, Any] = {}
-        text_value: Any = None
-        for key, value in obj.items():
-            if key == "#text":
-                text_value = _strip_xml_attrs(value)
-                continue
-            cleaned = _strip_xml_attrs(value)
-            if key.startswith("@"):
-                result[key[1:]] = cleaned
-            else:
-                result[key] = cleaned
-        if text_value is not None:
-            if result:
-                result.setdefault("value", text_value)
-            else:
-                return text_value
-        if len(result) == 1 and "value" in result:
-            single = result["value"]
-            return _coerce_boolish(single)
-        return {
-            k: (_coerce_boolish(v) if not isinstance(v, (dict, list)) else v)
-            for k, v in result.items()
-        }
-    if isinstance(obj, list):
-        return [_strip_xml_attrs(v) for v in obj]
-    return _coerce_boolish(obj)
-
-
 _COLLECTION_CHILD_MAP: Dict[str, str] = {
     "addresses": "address",
     "comments": "comment",
@@ -97,37 +70,6 @@ _COLLECTION_RENAME: Dict[str, str] = {
 }
 
 
-def _normalize_collections(obj: Any) -> Any:
-    if isinstance(obj, dict):
-        for key in list(obj.keys()):
-            obj[key] = _normalize_collections(obj[key])
-        for key in list(obj.keys()):
-            child_key = _COLLECTION_CHILD_MAP.get(key)
-            if not child_key:
-                continue
-            rename_to = _COLLECTION_RENAME.get(key, key)
-            value = obj[key]
-            if isinstance(value, dict) and child_key in value:
-                payload = value[child_key]
-            else:
-                payload = value
-            if payload is None:
-                seq: List[Any] = []
-            elif isinstance(payload, list):
-                seq = payload
-            else:
-                seq = [payload]
-            obj[rename_to] = [_normalize_collections(item) for item in seq]
-            if rename_to != key:
-                del obj[key]
-            else:
-                obj[key] = obj[rename_to]
-        return obj
-    if isinstance(obj, list):
-        return [_normalize_collections(v) for v in obj]
-    return obj
-
-
 def _normalize_telecom_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
     out = dict(entry)
     if "value" in out and "telecom" not in out:
@@ -150,20 +92,64 @@ def _normalize_telecom_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
     return out
 
 
-def _normalize_telecoms_recursive(obj: Any) -> Any:
+_TELECOM_KEYS = frozenset({"telecoms", "telecomList"})
+
+
+def _normalize_xml_node(obj: Any, telecoms: bool = True) -> Any:
+    """Normalize one xmltodict-shaped subtree in a single bottom-up walk.
+
+    Per node this performs, in order: XML attribute/text folding ('@attr' ->
+    'attr', '#text' -> 'value', single-'value' dicts collapsed, boolish
+    scalars coerced), collection unwrapping (``_COLLECTION_CHILD_MAP``) and,
+    when ``telecoms`` is set, telecom entry normalization.
+    """
     if isinstance(obj, dict):
-        for key, value in list(obj.items()):
-            if key == "telecoms" and isinstance(value, list):
-                obj[key] = [
+        result: Dict[str, Any] = {}
+        text_value: Any = None
+        for key, value in obj.items():
+            if key == "#text":
+                text_value = _normalize_xml_node(value, telecoms)
+                continue
+            if key.startswith("@"):
+                key = key[1:]
+            # Telecom entries are normalized by their parent and not walked again.
+            nested = telecoms and key not in _TELECOM_KEYS
+            result[key] = _normalize_xml_node(value, nested)
+        if text_value is not None:
+            if result:
+                result.setdefault("value", text_value)
+            else:
+                return text_value
+        if len(result) == 1 and "value" in result:
+            return result["value"]
+        for key in [k for k in result if k in _COLLECTION_CHILD_MAP]:
+            child_key = _COLLECTION_CHILD_MAP[key]
+            rename_to = _COLLECTION_RENAME.get(key, key)
+            value = result[key]
+            if isinstance(value, dict) and child_key in value:
+                payload = value[child_key]
+            else:
+                payload = value
+            if payload is None:
+                seq: List[Any] = []
+            elif isinstance(payload, list):
+                seq = payload
+            else:
+                seq = [payload]
+            result[rename_to] = seq
+            if rename_to != key:
+                del result[key]
+        if telecoms:
+            entries = result.get("telecoms")
+            if isinstance(entries, list):
+                result["telecoms"] = [
                     _normalize_telecom_entry(v) if isinstance(v, dict) else v
-                    for v in value
+                    for v in entries
                 ]
-            else:
-                obj[key] = _normalize_telecoms_recursive(value)
-        return obj
+        return result
     if isinstance(obj, list):
-        return [_normalize_telecoms_recursive(v) for v in obj]
-    return obj
+        return [_normalize_xml_node(v, telecoms) for v in obj]
+    return _coerce_boolish(obj)
 
 
 def _ensure_list(value: Any) -> List[Any]:
@@ -576,36 +562,113 @@ def _normalize_patient_item(item: Dict[str, Any]) -> Dict[str, Any]:
         data["veteran"] = {
             "isVet": 1 if _coerce_boolish(data.pop("veteran")) else 0
         }
-    data = _normalize_telecoms_recursive(data)
     return data
 
 
+# Per-domain item schema: (normalize telecom entries during the walk,
+# domain-specific finisher applied to the walked item when it is a dict).
+_DOMAIN_ITEM_SCHEMA: Dict[str, Tuple[bool, Optional[Callable[[Dict[str, Any]], Dict[str, Any]]]]] = {
+    "patient": (True, _normalize_patient_item),
+    "order": (False, _normalize_order_item),
+}
+_DEFAULT_ITEM_SCHEMA: Tuple[bool, Optional[Callable[[Dict[str, Any]], Dict[str, Any]]]] = (True, None)
+
+# Set on parsed payloads whose items already went through _normalize_domain_item
+# so _wrap_domain_response does not walk them a second time.
+_ITEMS_NORMALIZED_KEY = "_itemsNormalized"
+
+
 def _normalize_domain_item(domain: Optional[str], item: Dict[str, Any]) -> Dict[str, Any]:
-    base = _strip_xml_attrs(item)
-    base = _normalize_collections(base)
-    if domain == "patient" and isinstance(base, dict):
-        return _normalize_patient_item(base)
-    if domain == "order" and isinstance(base, dict):
-        return _normalize_order_item(base)
-    if isinstance(base, dict):
-        if "telecomList" in base and "telecoms" not in base:
-            holder = base.pop("telecomList")
-            if isinstance(holder, dict) and "telecom" in holder:
-                tele = holder["telecom"]
-            else:
-                tele = holder
-            if tele is None:
-                base["telecoms"] = []
-            elif isinstance(tele, list):
-                base["telecoms"] = tele
-            else:
-                base["telecoms"] = [tele]
-        base = _normalize_telecoms_recursive(base)
-    else:
-        base = _normalize_telecoms_recursive(base)
+    telecoms, finish = _DOMAIN_ITEM_SCHEMA.get(domain or "", _DEFAULT_ITEM_SCHEMA)
+    base = _normalize_xml_node(item, telecoms)
+    if finish is not None and isinstance(base, dict):
+        return finish(base)
     return base
 
 
+def _lazy_field_index(item: Dict[str, Any]) -> Optional[Dict[str, Tuple[str, Optional[str]]]]:
+    """Map each normalized top-level key to (raw key, key before renames).
+
+    Mirrors the top-level steps of ``_normalize_xml_node`` without walking
+    values. Returns None when the item would not normalize to a dict with
+    independent fields (e.g. it collapses to a scalar), so callers fall back
+    to eager normalization.
+    """
+    fields: Dict[str, Tuple[str, Optional[str]]] = {}
+    has_text = False
+    for key in item:
+        if key == "#text":
+            has_text = item[key] is not None
+            continue
+        name = key[1:] if key.startswith("@") else key
+        fields[name] = (key, name)
+    if has_text:
+        if not fields:
+            return None
+        fields.setdefault("value", ("#text", None))
+    if not fields or (len(fields) == 1 and "value" in fields):
+        return None
+    if "telecomList" in fields:
+        fields["telecoms"] = fields.pop("telecomList")
+    return fields
+
+
+def _decode_lazy_field(telecoms: bool, raw: Dict[str, Any], spec: Tuple[str, Optional[str]]) -> Any:
+    raw_key, name = spec
+    value = raw[raw_key]
+    child_key = _COLLECTION_CHILD_MAP.get(name) if name is not None else None
+    if child_key is None:
+        if not isinstance(value, (dict, list)):
+            return _coerce_boolish(value)
+        # Most VPR fields are <field value="..."/>
+        if isinstance(value, dict) and len(value) == 1 and "@value" in value:
+            inner = value["@value"]
+            if not isinstance(inner, (dict, list)):
+                return _coerce_boolish(inner)
+    if name is None:
+        return _normalize_xml_node(value, telecoms)
+    value = _normalize_xml_node(value, telecoms and name not in _TELECOM_KEYS)
+    if child_key:
+        if isinstance(value, dict) and child_key in value:
+            value = value[child_key]
+        if value is None:
+            value = []
+        elif not isinstance(value, list):
+            value = [value]
+        if telecoms and _COLLECTION_RENAME.get(name, name) == "telecoms":
+            value = [_normalize_telecom_entry(v) if isinstance(v, dict) else v for v in value]
+    return value
+
+
+def _domain_item_factory(domain: Optional[str]) -> Callable[[Dict[str, Any]], Any]:
+    """Return a per-item normalizer for ``domain``.
+
+    Domains without a whole-item finisher get ``LazyVprItem`` views whose
+    fields are normalized on first access; the rest normalize eagerly.
+    """
+    telecoms, finish = _DOMAIN_ITEM_SCHEMA.get(domain or "", _DEFAULT_ITEM_SCHEMA)
+    eager = partial(_normalize_domain_item, domain)
+    if finish is not None or not _LAZY_VPR_ITEMS:
+        return eager
+    decode = partial(_decode_lazy_field, telecoms)
+    # Items of one domain share a handful of key layouts; index each once.
+    layouts: Dict[Tuple[Any, ...], Optional[Dict[str, Tuple[str, Optional[str]]]]] = {}
+
+    def build(item: Dict[str, Any]) -> Any:
+        layout: Tuple[Any, ...] = tuple(item)
+        if "#text" in item:
+            layout += (item["#text"] is None,)
+        try:
+            fields = layouts[layout]
+        except KeyError:
+            fields = layouts[layout] = _lazy_field_index(item)
+        if fields is None:
+            return eager(item)
+        return LazyVprItem(item, fields, decode, eager)
+
+    return build
+
+
 def _extract_payload_items(payload: Any) -> List[Dict[str, Any]]:
     if isinstance(payload, dict):
         data_block = payload.get("data")
@@ -625,12 +688,10 @@ def _ensure_xml_lib():
 
 
 def _normalize_vpr_xml_to_items(xml_text: str, domain: Optional[str] = None) -> Dict[str, Any]:
-    _ensure_xml_lib()
     text = (xml_text or "").strip()
     if not text:
         return {"items": []}
-    lower = text.lower()
-    if "<results" in lower:
+    if looks_like_vpr_results(text):
         try:
             parsed = parse_vpr_results_xml(text, domain=domain)
             items = parsed.get("items") if isinstance(parsed, dict) else []
@@ -641,12 +702,13 @@ def _normalize_vpr_xml_to_items(xml_text: str, domain: Optional[str] = None) ->
                         normalized_items.append(_normalize_domain_item(domain, entry))
                     else:
                         normalized_items.append({"value": entry})
-            result: Dict[str, Any] = {"items": normalized_items}
+            result: Dict[str, Any] = {"items": normalized_items, _ITEMS_NORMALIZED_KEY: True}
             if isinstance(parsed, dict) and parsed.get("meta"):
                 result["meta"] = parsed["meta"]
             return result
         except Exception:
             pass
+    _ensure_xml_lib()
     try:
         parsed = xmltodict.parse(text)  # type: ignore[attr-defined]
     except Exception as exc:
@@ -677,7 +739,7 @@ def _normalize_vpr_xml_to_items(xml_text: str, domain: Optional[str] = None) ->
             normalized_items.append(_normalize_domain_item(domain, entry))
         else:
             normalized_items.append({"value": entry})
-    return {"items": normalized_items}
+    return {"items": normalized_items, _ITEMS_NORMALIZED_KEY: True}
 
 
 # ---------------------------------------------------------------------------
@@ -1124,6 +1186,7 @@ def _normalize_doc_id(value: Any) -> str:
 _SOCKET_IDLE_MAX_SECONDS = max(30, int(os.getenv("VISTA_SOCKET_IDLE_SECONDS", "300") or 300))
 _DOMAIN_CACHE_TTL = max(5, int(os.getenv("VISTA_VPR_CACHE_TTL", "120") or 120))
 _DOMAIN_CACHE_SIZE = max(4, int(os.getenv("VISTA_VPR_CACHE_SIZE", "12") or 12))
+_LAZY_VPR_ITEMS = str(os.getenv("VISTA_LAZY_VPR_ITEMS", "1")).strip().lower() not in ("0", "false", "no", "off")
 _DEFAULT_VPR_CONTEXT = os.getenv("VISTA_VPR_CONTEXT", "JLV WEB SERVICES")
 _HEARTBEAT_INTERVAL = int(os.getenv("VISTA_HEARTBEAT_INTERVAL", "60") or 60)
 
@@ -1131,6 +1194,20 @@ _HEARTBEAT_INTERVAL = int(os.getenv("VISTA_HEARTBEAT_INTERVAL", "60") or 60)
 class VistaDualSocketGateway(DataGateway):
     """Dual-socket gateway using CPRS context for RPCs and JLV context for VPR XML."""
 
+    # Domains assembled (one VPR call each, in this order) into the full chart
+    fullchart_domains: Tuple[str, ...] = (
+        "patient",
+        "med",
+        "lab",
+        "vital",
+        "document",
+        "image",
+        "procedure",
+        "visit",
+        "problem",
+        "allergy",
+    )
+
     def __init__(
         self,
         *,
@@ -1157,8 +1234,12 @@ class VistaDualSocketGateway(DataGateway):
         self._connected = False
         self._workspace_lock = threading.RLock()
         self._site_key = f"{self.host}:{self.port}"
-        self._domain_cache: "OrderedDict[Tuple[str, str, str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._domain_cache: "OrderedDict[Tuple[str, str, str, str], Tuple[float, Dict[str, Any], int]]" = OrderedDict()
         self._cache_lock = threading.RLock()
+        # Bumped on every domain cache store; entries carry the value current
+        # when they were fetched so derived views can key on it.
+        self._domain_generation_seq = 0
+        self._inflight = SingleFlight(name=f"vpr:{self._site_key}")
         self._cacheable_domains = {
             "patient",
             "med",
@@ -1203,6 +1284,26 @@ class VistaDualSocketGateway(DataGateway):
             for key in remove:
                 self._domain_cache.pop(key, None)
 
+    def domain_generation(
+        self,
+        dfn: str,
+        domain: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Optional[int]:
+        """Generation of the cached payload for (dfn, domain, params).
+
+        Returns None when there is no live cache entry, i.e. the next
+        get_vpr_domain call would fetch from VistA. A refetch or a cleared
+        cache always yields a different value, so anything derived from a
+        payload can be reused while the generation is unchanged.
+        """
+        key = self._domain_cache_key(dfn, domain.lower(), params)
+        with self._cache_lock:
+            entry = self._domain_cache.get(key)
+            if not entry or (time.monotonic() - entry[0]) > _DOMAIN_CACHE_TTL:
+                return None
+            return entry[2]
+
     def _domain_cache_key(self, dfn: str, domain: str, params: Optional[Dict[str, Any]]) -> Tuple[str, str, str, str]:
         signature = ""
         if params:
@@ -1221,16 +1322,17 @@ class VistaDualSocketGateway(DataGateway):
             entry = self._domain_cache.get(key)
             if not entry:
                 return None
-            ts, payload = entry
+            ts, payload, _generation = entry
             if (now - ts) > _DOMAIN_CACHE_TTL:
                 self._domain_cache.pop(key, None)
                 return None
             self._domain_cache.move_to_end(key)
-            return json.loads(json.dumps(payload))  # deep copy via json
+            return copy_payload(payload)  # deep copy; lazy items stay lazy
 
     def _domain_cache_store(self, key: Tuple[str, str, str, str], payload: Dict[str, Any]) -> None:
         with self._cache_lock:
-            self._domain_cache[key] = (time.monotonic(), payload)
+            self._domain_generation_seq += 1
+            self._domain_cache[key] = (time.monotonic(), payload, self._domain_generation_seq)
             self._domain_cache.move_to_end(key)
             while len(self._domain_cache) > _DOMAIN_CACHE_SIZE:
                 self._domain_cache.popitem(last=False)
@@ -1313,11 +1415,12 @@ class VistaDualSocketGateway(DataGateway):
                 items = parsed.get("items") or []
                 if not isinstance(items, list):
                     items = []
-                else:
+                elif not parsed.get(_ITEMS_NORMALIZED_KEY):
+                    normalize_item = _domain_item_factory(domain)
                     normalized_items: List[Any] = []
                     for it in items:
                         if isinstance(it, dict):
-                            normalized_items.append(_normalize_domain_item(domain, it))
+                            normalized_items.append(normalize_item(it))
                         else:
                             normalized_items.append(it)
                     items = normalized_items
@@ -1488,36 +1591,37 @@ class VistaDualSocketGateway(DataGateway):
     ) -> Dict[str, Any]:  # type: ignore[override]
         self.connect()
         domain = domain.lower()
+        flight_key = self._domain_cache_key(dfn, domain, params)
         cache_key: Optional[Tuple[str, str, str, str]] = None
         if domain in self._cacheable_domains:
-            cache_key = self._domain_cache_key(dfn, domain, params)
+            cache_key = flight_key
             cached = self._domain_cache_get(cache_key)
             if cached is not None:
                 return cached
-        payload = self._call_vpr(dfn, domain, params=params)
-        if cache_key is not None:
-            self._domain_cache_store(cache_key, payload)
+
+        def _fetch() -> Dict[str, Any]:
+            fetched = self._call_vpr(dfn, domain, params=params)
+            # Store before the in-flight slot is released so late arrivals hit the cache
+            if cache_key is not None:
+                self._domain_cache_store(cache_key, fetched)
+            return fetched
+
+        payload, shared = self._inflight.do(flight_key, _fetch)
+        if shared:
+            return copy_payload(payload)  # waiters get their own copy
         return payload
 
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Return single-flight counters for VPR domain fetches on this gateway."""
+        return self._inflight.stats()
+
     def get_vpr_fullchart(
         self,
         dfn: str,
         params: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        domains = [
-            "patient",
-            "med",
-            "lab",
-            "vital",
-            "document",
-            "image",
-            "procedure",
-            "visit",
-            "problem",
-            "allergy",
-        ]
         items: List[Dict[str, Any]] = []
-        for dom in domains:
+        for dom in self.fullchart_domains:
             try:
                 part = self.get_vpr_domain(dfn, dom, params=params)
                 arr = part.get("items") if isinstance(part, dict) else []
@@ -27,18 +27,21 @@ concatenated 'items' list (useful for rough full-chart operations):
     }
 
 This module purposefully does NOT attempt to normalize field names beyond the
-basic xmltodict conversion; downstream transform layers handle any field
-harmonization needed to reach quick/full endpoint schema parity.
+basic xmltodict-style conversion ('@attr' keys, '#text' for mixed content,
+repeated children collapsed into lists); downstream transform layers handle
+any field harmonization needed to reach quick/full endpoint schema parity.
+
+Parsing is streamed with ``xml.etree.ElementTree.XMLPullParser``: each domain
+item is converted to a dict as soon as its closing tag is seen and the element
+is then cleared, so multi-MB payloads are never held as a full tree plus a
+full dict copy at the same time.
 """
 from __future__ import annotations
 
+import re
+import xml.etree.ElementTree as ET
 from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    import xmltodict  # type: ignore
-except Exception:  # pragma: no cover - import error surfaced at call time
-    xmltodict = None  # type: ignore
-
 DOMAIN_TAGS: Dict[str, Tuple[str, str]] = {
     # domain -> (section tag, item tag)
     'patient': ('demographics', 'patient'),
@@ -54,30 +57,162 @@ DOMAIN_TAGS: Dict[str, Tuple[str, str]] = {
     'order': ('orders', 'order'),
 }
 
+# section tag -> (domain, item tag)
+_SECTION_TAGS: Dict[str, Tuple[str, str]] = {sec: (dom, item) for dom, (sec, item) in DOMAIN_TAGS.items()}
+
+# Case-insensitive probe for a <results> root without copying the payload.
+_RESULTS_TAG_RE = re.compile(r'<results', re.IGNORECASE)
+
+# Characters fed to the pull parser per step.
+_FEED_CHUNK = 1 << 16
+
 
 class VPRXMLParseError(RuntimeError):
     """Raised when VPR XML cannot be parsed into the expected shape."""
 
 
-def _ensure_lib():  # pragma: no cover - trivial
-    if xmltodict is None:
-        raise VPRXMLParseError("xmltodict is required for VPR XML parsing. Ensure 'xmltodict' is in requirements.")
+def looks_like_vpr_results(text: str) -> bool:
+    """Cheap check for a ``<results`` element (no lowercased copy of ``text``)."""
+    return bool(text) and _RESULTS_TAG_RE.search(text) is not None
+
 
+def _element_to_obj(elem: ET.Element) -> Any:
+    """Convert an element subtree using xmltodict's default conventions.
 
-def _coerce_list(obj: Any) -> List[Any]:
-    if obj is None:
-        return []
-    if isinstance(obj, list):
+    Leaf elements without attributes become their stripped text (or None);
+    everything else becomes a dict of '@attr' keys, child tags (lists when
+    repeated) and '#text' for any remaining non-whitespace character data.
+    """
+    attrs = elem.attrib
+    if not len(elem):
+        # Leaf fast path: the bulk of VPR fields are <name value="..."/>.
+        text = elem.text
+        text = (text.strip() or None) if text else None
+        if not attrs:
+            return text
+        obj: Dict[str, Any] = {'@' + k: v for k, v in attrs.items()}
+        if text:
+            obj['#text'] = text
         return obj
-    return [obj]
+    children = list(elem)
+    parts = [elem.text or '']
+    parts.extend(child.tail or '' for child in children)
+    text = ''.join(parts).strip() or None
+    obj = {'@' + k: v for k, v in attrs.items()}
+    for child in children:
+        key = child.tag
+        value = _element_to_obj(child)
+        if key in obj:
+            existing = obj[key]
+            if isinstance(existing, list):
+                existing.append(value)
+            else:
+                obj[key] = [existing, value]
+        else:
+            obj[key] = value
+    if text:
+        obj['#text'] = text
+    return obj
+
+
+def _leaf_text(elem: ET.Element) -> Optional[str]:
+    if elem.attrib or len(elem):
+        return None
+    return (elem.text or '').strip() or None
+
+
+def _stream_results(
+    text: str,
+    wanted: Optional[Dict[str, Tuple[str, str]]],
+) -> Optional[Dict[str, Any]]:
+    """Stream a <results> document collecting items for ``wanted`` sections.
+
+    Returns None when the root is not a populated <results> element (mirrors
+    the empty-result fallbacks of the previous xmltodict implementation).
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    depth = 0
+    root_tag: Optional[str] = None
+    root_attrs: Dict[str, str] = {}
+    root_has_children = False
+    root_leaf_meta: Dict[str, Optional[str]] = {}
+    root: Optional[ET.Element] = None
+    section: Optional[ET.Element] = None
+    section_tag: Optional[str] = None
+    item_tag: Optional[str] = None
+    section_counts: Dict[str, int] = {}
+    section_attrs: Dict[str, Dict[str, str]] = {}
+    section_total_child: Dict[str, Optional[str]] = {}
+    items_by_section: Dict[str, List[Dict[str, Any]]] = {}
+
+    try:
+        for offset in range(0, len(text), _FEED_CHUNK):
+            parser.feed(text[offset:offset + _FEED_CHUNK])
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    depth += 1
+                    if depth == 1:
+                        root = elem
+                        root_tag = elem.tag
+                        root_attrs = dict(elem.attrib)
+                        if root_tag != 'results':
+                            return None
+                    elif depth == 2:
+                        root_has_children = True
+                        section = elem
+                        section_tag = elem.tag
+                        mapping = _SECTION_TAGS.get(section_tag)
+                        if mapping is not None and (wanted is None or section_tag in wanted):
+                            item_tag = mapping[1]
+                            section_counts[section_tag] = section_counts.get(section_tag, 0) + 1
+                            section_attrs[section_tag] = dict(elem.attrib)
+                            items_by_section.setdefault(section_tag, [])
+                        else:
+                            item_tag = None
+                    continue
+                # end event
+                depth -= 1
+                if depth == 2 and section is not None:
+                    if item_tag is not None and section_tag is not None:
+                        if elem.tag == item_tag:
+                            obj = _element_to_obj(elem)
+                            if isinstance(obj, dict):
+                                items_by_section[section_tag].append(obj)
+                        elif elem.tag == 'total':
+                            section_total_child[section_tag] = _leaf_text(elem)
+                    # Everything before this point in the section is done.
+                    section.clear()
+                elif depth == 1 and root is not None:
+                    if elem.tag in ('version', 'timeZone'):
+                        root_leaf_meta.setdefault(elem.tag, _leaf_text(elem))
+                    section = None
+                    section_tag = None
+                    item_tag = None
+                    root.clear()
+        parser.close()
+        for _event, _elem in parser.read_events():
+            pass
+    except ET.ParseError as e:
+        raise VPRXMLParseError(f"Failed to parse VPR <results> XML: {e}")
 
+    if root_tag != 'results' or (not root_attrs and not root_has_children):
+        return None
+
+    version = root_attrs.get('version') or root_leaf_meta.get('version')
+    timezone = root_attrs.get('timeZone') or root_leaf_meta.get('timeZone')
+    meta_base: Dict[str, Any] = {k: v for k, v in (('version', version), ('timeZone', timezone)) if v}
 
-def _to_plain(x: Any):
-    if isinstance(x, dict):
-        return {k: _to_plain(v) for k, v in x.items()}
-    if isinstance(x, list):
-        return [_to_plain(v) for v in x]
-    return x
+    sections: Dict[str, Dict[str, Any]] = {}
+    for sec_tag, items in items_by_section.items():
+        # A repeated section tag collapsed into a list under xmltodict, which
+        # the previous implementation treated as "no items"; keep that.
+        if section_counts.get(sec_tag, 0) != 1:
+            sections[sec_tag] = {'items': [], 'total': None}
+            continue
+        attrs = section_attrs.get(sec_tag) or {}
+        total = attrs.get('total') or section_total_child.get(sec_tag)
+        sections[sec_tag] = {'items': items, 'total': total}
+    return {'meta': meta_base, 'sections': sections}
 
 
 def parse_vpr_results_xml(xml_text: str, domain: Optional[str] = None) -> Dict[str, Any]:
@@ -90,54 +225,31 @@ def parse_vpr_results_xml(xml_text: str, domain: Optional[str] = None) -> Dict[s
     Returns: dict as described in module docstring. If the shape does not match
     <results> root, an empty items list is returned (allowing caller fallbacks).
     """
-    _ensure_lib()
     text = (xml_text or '').strip()
     if not text:
         return {'items': [], 'meta': {}}
     # Fast path: look for '<results' to avoid unnecessary parser cost when not applicable
-    if '<results' not in text.lower():  # basic heuristic
-        return {'items': [], 'meta': {}}
-    try:
-        parsed = xmltodict.parse(text)  # type: ignore[attr-defined]
-    except Exception as e:  # pragma: no cover - xmltodict internal details
-        raise VPRXMLParseError(f"Failed to parse VPR <results> XML: {e}")
-    if not isinstance(parsed, dict) or 'results' not in parsed:
+    if not looks_like_vpr_results(text):
         return {'items': [], 'meta': {}}
-    results = parsed['results']
-    if not isinstance(results, dict):
-        return {'items': [], 'meta': {}}
-
-    version = results.get('@version') or results.get('version')
-    timezone = results.get('@timeZone') or results.get('timeZone')
-
-    def extract(sec_tag: str, item_tag: str) -> List[Dict[str, Any]]:
-        sec = results.get(sec_tag)
-        if not isinstance(sec, dict):
-            return []
-        items = sec.get(item_tag)
-        lst = _coerce_list(items)
-        plain = [_to_plain(it) for it in lst if isinstance(it, (dict, list))]
-        # Ensure every element is a dict
-        out: List[Dict[str, Any]] = []
-        for it in plain:
-            if isinstance(it, dict):
-                out.append(it)
-            else:  # list or scalar fallback
-                out.append({'value': it})
-        return out
-
-    meta_base: Dict[str, Any] = {k: v for k, v in (('version', version), ('timeZone', timezone)) if v}
 
     if domain:
         mapping = DOMAIN_TAGS.get(domain)
+        wanted = {mapping[0]: mapping} if mapping else {}
+    else:
+        mapping = None
+        wanted = None
+    streamed = _stream_results(text, wanted)
+    if streamed is None:
+        return {'items': [], 'meta': {}}
+    meta_base = streamed['meta']
+    sections = streamed['sections']
+
+    if domain:
         if not mapping:
             return {'items': [], 'meta': meta_base}
-        sec_tag, item_tag = mapping
-        items = extract(sec_tag, item_tag)
-        sec = results.get(sec_tag)
-        total_attr = None
-        if isinstance(sec, dict):
-            total_attr = sec.get('@total') or sec.get('total')
+        sec = sections.get(mapping[0]) or {}
+        items = sec.get('items') or []
+        total_attr = sec.get('total')
         meta = dict(meta_base)
         meta.update({'domain': domain})
         if total_attr is not None:
@@ -151,8 +263,8 @@ def parse_vpr_results_xml(xml_text: str, domain: Optional[str] = None) -> Dict[s
     # No domain filter: collect all recognized
     domain_items: Dict[str, List[Dict[str, Any]]] = {}
     concat: List[Dict[str, Any]] = []
-    for d, (sec_tag, item_tag) in DOMAIN_TAGS.items():
-        items = extract(sec_tag, item_tag)
+    for d, (sec_tag, _item_tag) in DOMAIN_TAGS.items():
+        items = (sections.get(sec_tag) or {}).get('items') or []
         if items:
             domain_items[d] = items
             concat.extend(items)
@@ -163,4 +275,5 @@ __all__ = [
     'parse_vpr_results_xml',
     'VPRXMLParseError',
     'DOMAIN_TAGS',
+    'looks_like_vpr_results',
 ]
@@ -1,20 +1,17 @@
 from __future__ import annotations
 import os
-import threading
-import time
 from typing import Any, Mapping
 from flask import Blueprint, request, jsonify, session as flask_session
 from ...services.patient_service import PatientService
-from ...services.document_search_service import get_or_build_index_for_dfn
+from ...services.document_search_service import get_index_for_dfn, get_or_build_index_for_dfn
+from ...services.hydration_scheduler import HYDRATION
+from ...services.index_builds import INDEX_BUILDS
 from ...gateways.factory import get_gateway
 from ..query_models.default.services.rag_store import store
 
 bp = Blueprint('documents_api', __name__)
 
 
-_STORE_SYNC_IN_FLIGHT: set[tuple[str, str]] = set()
-
-
 def _get_patient_service() -> PatientService:
     station = str(flask_session.get('station') or os.getenv('DEFAULT_STATION', '500'))
     duz = str(flask_session.get('duz') or os.getenv('DEFAULT_DUZ', '983'))
@@ -23,28 +20,19 @@ def _get_patient_service() -> PatientService:
 
 
 def _start_priority_hydration(doc_index) -> None:
-    if doc_index is None:
-        return
-
-    def _hydrate() -> None:
-        try:
-            doc_index.ensure_priority_texts()
-        except Exception:
-            pass
-
-    threading.Thread(target=_hydrate, name='DocIndexHydrate', daemon=True).start()
+    # Background fetches are ordered and rate-limited per site by the hydration scheduler
+    HYDRATION.enqueue(doc_index)
 
 
 def _schedule_store_sync(dfn: str, model: str, doc_index, *, force: bool = False) -> None:
-    key = (str(dfn), str(model))
-    if key in _STORE_SYNC_IN_FLIGHT or doc_index is None:
+    if doc_index is None:
+        return
+    key = ('store-sync', str(dfn), str(model))
+    if INDEX_BUILDS.pending(key) is not None:
         return
-    _STORE_SYNC_IN_FLIGHT.add(key)
 
     def _runner() -> None:
         try:
-            while doc_index.is_building():
-                time.sleep(0.25)
             manifest = store.ensure_index(dfn, doc_index, force=force, model=model)
             manifest['document_manifest'] = doc_index.manifest()
             doc_manifest = doc_index.manifest()
@@ -57,14 +45,9 @@ def _schedule_store_sync(dfn: str, model: str, doc_index, *, force: bool = False
                 pass
         except Exception:
             pass
-        finally:
-            _STORE_SYNC_IN_FLIGHT.discard(key)
 
-    threading.Thread(
-        target=_runner,
-        name=f'DocIndexStoreSync-{dfn}-{model}',
-        daemon=True,
-    ).start()
+    # Runs once the pending index build finishes, without holding a pool thread while it waits
+    INDEX_BUILDS.after(doc_index.build_future(), key, _runner)
 
 
 def _extract_model(data: Mapping[str, Any] | None) -> str:
@@ -110,6 +93,8 @@ def start_index():
             async_build=True,
             status=build_status,
         )
+        # The user opened this patient: its notes hydrate first, their other patients' wait
+        HYDRATION.focus(doc_index)
         doc_manifest = doc_index.manifest()
         needs_rebuild = bool(build_status.get('needs_rebuild'))
         building = doc_index.is_building()
@@ -117,8 +102,6 @@ def start_index():
         if not needs_rebuild and not building:
             manifest = store.ensure_index(dfn, doc_index, force=force_rebuild, model=model)
             manifest['document_manifest'] = doc_manifest
-            if doc_manifest.get('missing_text', 0):
-                _start_priority_hydration(doc_index)
             try:
                 if manifest.get('lexical_only', True):
                     store.embed_docs_policy(dfn, doc_index, model=model)
@@ -218,6 +201,10 @@ def index_status():
             return jsonify({'error': 'dfn is required'}), 400
         model = _extract_model(request.args)
         st = store.status(dfn, model=model)
+        doc_index = get_index_for_dfn(dfn, gateway=_get_patient_service().gateway, create=False)
+        if doc_index is not None:
+            # includes 'hydration': background text fetch progress for this patient
+            st['document_manifest'] = doc_index.manifest()
         return jsonify(st)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -52,6 +52,8 @@ class RagStore:
     def __init__(self, ttl_seconds: int = 3*60*60, capacity: int = 10):
         self._store: Dict[Tuple[str, str], _PatientIndex] = {}
         self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        # Signalled when a patient index is created or rebuilt (see wait_indexed)
+        self._indexed = threading.Condition()
         self._ttl = max(0, int(ttl_seconds))
         self._capacity = max(1, int(capacity))
 
@@ -183,7 +185,9 @@ class RagStore:
                 idx.updated_at = time.time()
                 idx.source_generation = source_generation
                 idx.document_manifest = doc_index.manifest()
-            return idx.manifest()
+            manifest = idx.manifest()
+        self._notify_indexed()
+        return manifest
 
     def embed_now(self, dfn: str, *, model: str = 'default') -> Dict[str, Any]:
         """Embed existing chunks if Azure OpenAI is configured; no-op otherwise."""
@@ -326,6 +330,17 @@ class RagStore:
         m['indexed'] = True
         return m
 
+    def _notify_indexed(self) -> None:
+        with self._indexed:
+            self._indexed.notify_all()
+
+    def wait_indexed(self, dfn: str, timeout: float, *, model: str = 'default') -> Dict[str, Any]:
+        """``status`` once the patient is indexed for ``model``, or after ``timeout`` seconds."""
+        key = self._key(dfn, model)
+        with self._indexed:
+            self._indexed.wait_for(lambda: key in self._store, max(0.0, timeout))
+        return self.status(dfn, model=model)
+
     # --- Ingestion of raw note texts (fallback path) ---
     def ingest_texts(self, dfn: str, items: List[Dict[str, Any]], *, model: str = 'default') -> Dict[str, Any]:
         """Ingest a list of note texts into the patient index.
@@ -367,7 +382,9 @@ class RagStore:
                 idx.lexical_only = True
                 idx.generation += 1
                 idx.updated_at = time.time()
-            return idx.manifest()
+            manifest = idx.manifest()
+        self._notify_indexed()
+        return manifest
 
     def clear(self, dfn: str, *, model: str | None = None) -> None:
         """Remove cached RAG indexes for a patient (optionally scoped to a model)."""
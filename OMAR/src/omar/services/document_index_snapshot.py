@@ -0,0 +1,541 @@
+"""Immutable document index snapshots shared between worker processes.
+
+``DocumentSearchIndex`` lives in a per-process registry, so with several
+gunicorn workers every worker that serves a patient would rebuild the index
+and re-hydrate note texts from VistA. A snapshot is the built index frozen
+into one file:
+
+  * a JSON section: document ids, order, metadata, RPC ids, missing-text ids,
+    per-document lengths and token counts, and the sorted term dictionary,
+  * array-backed postings: per term a row range into (doc number, tf) arrays,
+    per row a range into one token-position array,
+  * a UTF-8 text blob with per-document offsets.
+
+One worker builds and publishes (``write_snapshot``), holding a per-patient
+``flock`` so concurrent builders wait for it (``build_lock``). The others
+``mmap`` the file read-only (``load_snapshot``); ``IndexSnapshot.postings``,
+``.positions`` and ``.text`` are read-only mappings that decode one term or
+note at a time, so ``DocumentSearchIndex.search`` runs on them unchanged.
+
+Files are replaced atomically (``os.replace``); a reader keeps its mapping of
+the previous file until it adopts the next one. Each publish bumps the
+snapshot generation. Files are named by a hash of (station, DUZ, DFN), are
+mode 0600, and expire after the index TTL; expired files are swept by the
+workers themselves. With ``EPHEMERAL_SERVER_STATE`` on (the default) the TTL
+is capped at ``EPHEMERAL_STATE_TTL`` and snapshots are only written to a RAM
+filesystem (tmpfs), never to disk.
+
+Knobs (environment):
+
+  * ``DOCUMENT_INDEX_SHARED``   - 1 enables snapshots (gunicorn.conf.py turns
+    this on when it starts more than one worker; default 0)
+  * ``DOCUMENT_INDEX_SHM_DIR``  - directory (default ``/dev/shm/omar-docindex``)
+  * ``DOCUMENT_INDEX_SHM_WAIT`` - seconds to wait for another worker's build
+    before building locally (default 60)
+"""
+from __future__ import annotations
+
+import errno
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:  # POSIX only (the Windows launcher runs a single process)
+    import fcntl
+except ImportError:  # pragma: no cover - platform dependent
+    fcntl = None  # type: ignore
+
+_MAGIC = b'OMARIDX1'
+_VERSION = 1
+# magic, version, generation, updated_at, expires_at, json offset, json length
+_HEADER = struct.Struct('<8sIQddQQ')
+_SWEEP_INTERVAL = 60.0
+_ORPHAN_AGE = 3600.0  # temp and lock files idle this long are left over from dead workers
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+
+def _truthy(name: str, default: str) -> bool:
+    return (os.getenv(name, default) or default).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def shared_enabled() -> bool:
+    return fcntl is not None and _truthy('DOCUMENT_INDEX_SHARED', '0')
+
+
+def _ephemeral() -> bool:
+    return _truthy('EPHEMERAL_SERVER_STATE', '1')
+
+
+def snapshot_ttl(index_ttl: float) -> float:
+    """Lifetime of a snapshot built from an index with TTL ``index_ttl``."""
+    ttl = float(index_ttl)
+    if _ephemeral():
+        try:
+            ttl = min(ttl, float(os.getenv('EPHEMERAL_STATE_TTL', '1800') or 1800))
+        except ValueError:
+            ttl = min(ttl, 1800.0)
+    return max(60.0, ttl)
+
+
+def _build_wait() -> float:
+    try:
+        return max(0.0, float(os.getenv('DOCUMENT_INDEX_SHM_WAIT', '60') or 60))
+    except ValueError:
+        return 60.0
+
+
+def _on_tmpfs(path: Path) -> bool:
+    best = ''
+    fstype = ''
+    try:
+        with open('/proc/mounts', 'r', encoding='utf-8') as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount = parts[1]
+                prefix = mount.rstrip('/') + '/'
+                if (str(path) == mount or str(path).startswith(prefix)) and len(mount) > len(best):
+                    best, fstype = mount, parts[2]
+    except OSError:
+        return False
+    return fstype in ('tmpfs', 'ramfs')
+
+
+_dir_checked: Dict[str, bool] = {}
+
+
+def snapshot_dir() -> Optional[Path]:
+    """The snapshot directory, or None when sharing is off or the directory is unusable."""
+    if not shared_enabled():
+        return None
+    path = Path(os.getenv('DOCUMENT_INDEX_SHM_DIR', '/dev/shm/omar-docindex') or '/dev/shm/omar-docindex')
+    key = f"{path}|{_ephemeral()}"
+    usable = _dir_checked.get(key)
+    if usable is None:
+        try:
+            path.mkdir(mode=0o700, parents=True, exist_ok=True)
+            usable = os.access(path, os.W_OK) and (not _ephemeral() or _on_tmpfs(path.resolve()))
+        except OSError:
+            usable = False
+        _dir_checked[key] = usable
+    return path if usable else None
+
+
+def snapshot_key(dfn: str, station: Optional[str], duz: Optional[str]) -> str:
+    raw = f"{station or ''}|{duz or ''}|{dfn}".encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+def _read_header(path: Path) -> Optional[tuple]:
+    try:
+        with open(path, 'rb') as fh:
+            head = fh.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(head) < _HEADER.size:
+        return None
+    fields = _HEADER.unpack(head)
+    if fields[0] != _MAGIC or fields[1] != _VERSION:
+        return None
+    return fields
+
+
+# --------------------- Read-only views ---------------------
+
+class _DecodedTerms(Mapping):
+    """Base for term-keyed views: keeps the last few decoded terms (callers must not mutate them)."""
+
+    _KEEP = 64
+
+    def __init__(self, snap: 'IndexSnapshot') -> None:
+        self._snap = snap
+        self._decoded: Dict[str, Any] = {}
+
+    def __getitem__(self, term: str) -> Any:
+        value = self._decoded.get(term)
+        if value is None:
+            value = self._decode(term)
+            if len(self._decoded) >= self._KEEP:
+                self._decoded.clear()
+            self._decoded[term] = value
+        return value
+
+    def _decode(self, term: str) -> Any:
+        raise NotImplementedError
+
+
+class _PostingsView(_DecodedTerms):
+    """term -> {doc_id: tf}, decoded on access."""
+
+    def _decode(self, term: str) -> Dict[str, int]:
+        snap = self._snap
+        i = snap.term_numbers[term]
+        lo, hi = snap.term_start[i], snap.term_start[i + 1]
+        return dict(zip(map(snap.doc_ids.__getitem__, snap.post_docs[lo:hi].tolist()), snap.post_tf[lo:hi].tolist()))
+
+    def __contains__(self, term: object) -> bool:
+        return term in self._snap.term_numbers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snap.terms)
+
+    def __len__(self) -> int:
+        return len(self._snap.terms)
+
+
+class _PositionsView(_DecodedTerms):
+    """term -> {doc_id: [token positions]} over full text, decoded on access."""
+
+    def _decode(self, term: str) -> Dict[str, List[int]]:
+        snap = self._snap
+        i = snap.term_numbers[term]
+        lo, hi = snap.term_start[i], snap.term_start[i + 1]
+        bounds = snap.pos_start[lo:hi + 1].tolist()
+        out: Dict[str, List[int]] = {}
+        for row, doc_no in enumerate(snap.post_docs[lo:hi].tolist()):
+            a, b = bounds[row], bounds[row + 1]
+            if b > a:
+                out[snap.doc_ids[doc_no]] = snap.position_values[a:b].tolist()
+        if not out:
+            raise KeyError(term)
+        return out
+
+    def __iter__(self) -> Iterator[str]:
+        snap = self._snap
+        for i, term in enumerate(snap.terms):
+            lo, hi = snap.term_start[i], snap.term_start[i + 1]
+            if snap.pos_start[hi] > snap.pos_start[lo]:
+                yield term
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class _TextView(Mapping):
+    """doc_id -> full note text, decoded from the blob on access."""
+
+    def __init__(self, snap: 'IndexSnapshot') -> None:
+        self._snap = snap
+
+    def __getitem__(self, doc_id: str) -> str:
+        snap = self._snap
+        i = snap.doc_numbers[doc_id]
+        lo, hi = snap.text_start[i], snap.text_start[i + 1]
+        return str(snap.blob[lo:hi], 'utf-8')
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._snap.doc_numbers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snap.doc_ids)
+
+    def __len__(self) -> int:
+        return len(self._snap.doc_ids)
+
+
+class IndexSnapshot:
+    """A published index file mapped read-only."""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, 'rb') as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, generation, updated_at, expires_at, json_off, json_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'not a document index snapshot: {path}')
+        self.path = path
+        self.generation = int(generation)
+        self.updated_at = float(updated_at)
+        self.expires_at = float(expires_at)
+        info = json.loads(self._mm[json_off:json_off + json_len])
+        self.info: Dict[str, Any] = info
+        self.doc_ids: List[str] = info['docs']
+        self.doc_numbers: Dict[str, int] = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+        self.terms: List[str] = info['terms']
+        self.term_numbers: Dict[str, int] = {term: i for i, term in enumerate(self.terms)}
+        buf = memoryview(self._mm)
+        sections = {}
+        for name, (offset, count, typecode) in info['arrays'].items():
+            size = array(typecode).itemsize
+            sections[name] = buf[offset:offset + count * size].cast(typecode)
+        self.term_start = sections['term_start']
+        self.post_docs = sections['post_docs']
+        self.post_tf = sections['post_tf']
+        self.pos_start = sections['pos_start']
+        self.position_values = sections['positions']
+        self.text_start = sections['text_start']
+        self.blob = sections['blob']
+        self.postings = _PostingsView(self)
+        self.positions = _PositionsView(self)
+        self.text = _TextView(self)
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.expires_at
+
+    @property
+    def size(self) -> int:
+        return len(self._mm)
+
+
+# --------------------- Publish / load ---------------------
+
+def _paths(directory: Path, key: str) -> tuple:
+    return directory / f'{key}.idx', directory / f'{key}.lock'
+
+
+def write_snapshot(index: Any) -> Optional[int]:
+    """Freeze ``index`` (a DocumentSearchIndex) into its shared file; returns the new generation."""
+    directory = snapshot_dir()
+    if directory is None:
+        return None
+    key = snapshot_key(index.dfn, index.station, index.duz)
+    path, _ = _paths(directory, key)
+
+    docs = list(dict.fromkeys(list(index.order) + list(index.doc_len)))
+    doc_no = {doc_id: i for i, doc_id in enumerate(docs)}
+    terms = sorted(index.postings)
+    term_start = array('I', [0])
+    post_docs = array('I')
+    post_tf = array('I')
+    pos_start = array('I', [0])
+    positions = array('I')
+    for term in terms:
+        docs_tf = index.postings[term]
+        post_docs.extend(map(doc_no.__getitem__, docs_tf))
+        post_tf.extend(docs_tf.values())
+        located = index.positions.get(term)
+        if located:
+            for doc_id in docs_tf:
+                plist = located.get(doc_id)
+                if plist:
+                    positions.extend(plist)
+                pos_start.append(len(positions))
+        else:
+            pos_start.extend([len(positions)] * len(docs_tf))
+        term_start.append(len(post_docs))
+    blob = bytearray()
+    text_start = array('Q', [0])
+    for doc_id in docs:
+        blob += (index.text.get(doc_id) or '').encode('utf-8')
+        text_start.append(len(blob))
+
+    sections = (
+        ('term_start', term_start), ('post_docs', post_docs), ('post_tf', post_tf),
+        ('pos_start', pos_start), ('positions', positions), ('text_start', text_start),
+        ('blob', array('B', bytes(blob))),
+    )
+    layout: Dict[str, List[Any]] = {}
+    offset = _HEADER.size
+    for name, values in sections:
+        offset = (offset + 7) & ~7
+        layout[name] = [offset, len(values), values.typecode]
+        offset += len(values) * values.itemsize
+    json_off = (offset + 7) & ~7
+    info = json.dumps({
+        'dfn': index.dfn,
+        'station': index.station,
+        'duz': index.duz,
+        'index_generation': index.generation,
+        'docs': docs,
+        'order': list(index.order),
+        'meta': {doc_id: index.meta.get(doc_id) or {} for doc_id in docs},
+        'rpc_ids': dict(index.rpc_ids),
+        'missing_text_ids': sorted(index.missing_text_ids),
+        'doc_len': [index.doc_len.get(doc_id, 0) for doc_id in docs],
+        'token_count': [index.token_count.get(doc_id, 0) for doc_id in docs],
+        'terms': terms,
+        'arrays': layout,
+    }, default=str, separators=(',', ':')).encode('utf-8')
+
+    current = _read_header(path)
+    generation = max(int(current[2]) if current else 0, int(getattr(index, 'snapshot_generation', 0) or 0)) + 1
+    updated_at = float(index.updated_at or time.time())
+    expires_at = updated_at + snapshot_ttl(index.ttl_seconds)
+    tmp = directory / f'.{key}.{os.getpid()}.{threading.get_ident()}.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(_HEADER.pack(_MAGIC, _VERSION, generation, updated_at, expires_at, json_off, len(info)))
+            for name, values in sections:
+                fh.seek(layout[name][0])
+                values.tofile(fh)
+            fh.seek(json_off)
+            fh.write(info)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    sweep_snapshots()
+    return generation
+
+
+def load_snapshot(
+    dfn: str,
+    station: Optional[str],
+    duz: Optional[str],
+    *,
+    newer_than: int = 0,
+    updated_after: float = 0.0,
+) -> Optional[IndexSnapshot]:
+    """Map the patient's current snapshot if it is unexpired, newer than
+    generation ``newer_than`` and was built at or after ``updated_after``."""
+    directory = snapshot_dir()
+    if directory is None:
+        return None
+    sweep_snapshots()
+    path, _ = _paths(directory, snapshot_key(dfn, station, duz))
+    header = _read_header(path)
+    if header is None:
+        return None
+    _, _, generation, updated_at, expires_at, _, _ = header
+    if generation <= newer_than or updated_at < updated_after or time.time() >= expires_at:
+        return None
+    try:
+        snap = IndexSnapshot(path)
+    except (OSError, ValueError):
+        return None
+    info = snap.info
+    if str(info.get('dfn')) != str(dfn) or info.get('station') != station or info.get('duz') != duz:
+        return None  # hash collision or a different session's file
+    return snap
+
+
+def remove_snapshot(dfn: str, station: Optional[str], duz: Optional[str]) -> None:
+    directory = snapshot_dir()
+    if directory is None:
+        return
+    path, _ = _paths(directory, snapshot_key(dfn, station, duz))
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+class build_lock:
+    """Cross-process build lock for one patient's index (``flock`` on a lock file).
+
+    ``acquired`` is False when sharing is off or the wait timed out; the caller
+    then builds without coordination.
+    """
+
+    def __init__(self, dfn: str, station: Optional[str], duz: Optional[str], wait: Optional[float] = None) -> None:
+        self.acquired = False
+        self.waited = False
+        self._fd: Optional[int] = None
+        directory = snapshot_dir()
+        if directory is None:
+            return
+        _, lock_path = _paths(directory, snapshot_key(dfn, station, duz))
+        deadline = time.monotonic() + (_build_wait() if wait is None else wait)
+        try:
+            self._fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            return
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self.acquired = True
+                return
+            except OSError as exc:
+                if exc.errno not in (errno.EAGAIN, errno.EACCES):
+                    break
+            if time.monotonic() >= deadline:
+                break
+            self.waited = True
+            time.sleep(0.1)
+        self.release()
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if self.acquired:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self.acquired = False
+
+    def __enter__(self) -> 'build_lock':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+def sweep_snapshots(force: bool = False) -> int:
+    """Delete expired snapshots and stale temp/lock files (at most once a minute unless ``force``)."""
+    global _last_sweep
+    directory = snapshot_dir()
+    if directory is None:
+        return 0
+    now = time.time()
+    with _sweep_lock:
+        if not force and now - _last_sweep < _SWEEP_INTERVAL:
+            return 0
+        _last_sweep = now
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.name.endswith('.idx'):
+                header = _read_header(Path(entry.path))
+                if header is not None and now < header[4]:
+                    continue
+            elif entry.name.endswith(('.tmp', '.lock')):
+                if now - entry.stat().st_mtime < _ORPHAN_AGE:
+                    continue
+            else:
+                continue
+            os.unlink(entry.path)
+            removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def snapshot_stats() -> Dict[str, Any]:
+    """Files and bytes currently in the snapshot directory."""
+    directory = snapshot_dir()
+    if directory is None:
+        return {'enabled': False}
+    files = 0
+    size = 0
+    try:
+        for entry in os.scandir(directory):
+            if entry.name.endswith('.idx'):
+                files += 1
+                size += entry.stat().st_size
+    except OSError:
+        pass
+    return {'enabled': True, 'dir': str(directory), 'files': files, 'bytes': size}
+
+
+__all__ = [
+    'IndexSnapshot',
+    'build_lock',
+    'load_snapshot',
+    'remove_snapshot',
+    'shared_enabled',
+    'snapshot_key',
+    'snapshot_stats',
+    'snapshot_ttl',
+    'sweep_snapshots',
+    'write_snapshot',
+]
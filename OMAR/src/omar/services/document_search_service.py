@@ -1,28 +1,58 @@
 from __future__ import annotations
+from array import array
+from bisect import bisect_left, bisect_right
 from typing import Any, Dict, List, Optional, Set, Tuple
+import heapq
+import math
 import os
 import re
+import sys
 import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from itertools import chain
 from ..gateways.data_gateway import DataGateway
 from ..gateways.vista_api_x_gateway import VistaApiXGateway
+from .document_index_snapshot import IndexSnapshot, build_lock, load_snapshot, remove_snapshot, write_snapshot
+from .hydration_scheduler import HYDRATE_RECENT, HYDRATION
+from .index_builds import INDEX_BUILDS
+from .term_trigrams import TermTrigramIndex, max_edits
 
 try:
     from ..gateways.factory import get_gateway as _get_active_gateway
 except Exception:
     _get_active_gateway = None
 
-# In-memory per-DFN index registry
-_REGISTRY: Dict[str, 'DocumentSearchIndex'] = {}
+# In-memory per-DFN index registry: LRU within a byte budget, idle entries swept after the TTL
+_REGISTRY: 'OrderedDict[str, DocumentSearchIndex]' = OrderedDict()
+_REGISTRY_LOCK = threading.RLock()
+_LAST_USED: Dict[str, float] = {}
+_EVICTIONS: Dict[str, int] = {'lru': 0, 'ttl': 0}
+_SWEEPER: Optional[threading.Thread] = None
 
 INDEX_TTL_SECONDS = 3 * 60 * 60  # 3 hours per DFN cache lifecycle
+INDEX_CACHE_BYTES = max(1, int(os.getenv('DOCUMENT_INDEX_CACHE_MB', '512') or 512)) * 1024 * 1024
+INDEX_SWEEP_SECONDS = max(5, int(os.getenv('DOCUMENT_INDEX_SWEEP_SECONDS', '300') or 300))
+
+# Rough per-item costs for estimated_size() (CPython, 64-bit)
+_POSTING_BYTES = 180   # inner dict entry + forward-index set entry
+_POSITION_BYTES = 36   # list slot + int object
+_DOC_BYTES = 1500      # metadata dict and per-document bookkeeping
 
 SYNC_HYDRATION_LIMIT = max(0, int(os.getenv('DOCUMENT_SYNC_HYDRATE_LIMIT', '0') or 0))
 RAG_PRIORITY_HYDRATE_LIMIT = max(20, int(os.getenv('DOCUMENT_RAG_PRIORITY_HYDRATE', '200') or 200))
 
 _term_split_re = re.compile(r'\w+|"[^"]+"')
+# Proximity clause: <term|"phrase"> NEAR/k <term|"phrase">
+_near_re = re.compile(r'("[^"]+"|[A-Za-z0-9\']+)\s+NEAR/(\d+)\s+("[^"]+"|[A-Za-z0-9\']+)')
+_MAX_HIT_OFFSETS = 10
+# score weight of terms reached only through substring / edit-distance expansion
+_SUBSTRING_WEIGHT = 0.8
+_FUZZY_WEIGHT = 0.6
 _word_re = re.compile(r"[A-Za-z0-9']+")
+# discharge summaries and consults hydrate right after a patient's most recent notes
+_summary_re = re.compile(r'discharge|consult', re.IGNORECASE)
 _stop = set([ 'the','and','of','to','in','a','for','on','with','as','at','by','is','it','or','an','be','are','from','this','that','was','were','but' ])
 
 
@@ -37,6 +67,120 @@ def _resolve_gateway(gateway: Optional[DataGateway]) -> Optional[DataGateway]:
     return None
 
 
+def _registry_get(key: str) -> Optional['DocumentSearchIndex']:
+    with _REGISTRY_LOCK:
+        idx = _REGISTRY.get(key)
+        if idx is not None:
+            _REGISTRY.move_to_end(key)
+            _LAST_USED[key] = time.monotonic()
+        return idx
+
+
+def _registry_put(key: str, idx: 'DocumentSearchIndex') -> None:
+    with _REGISTRY_LOCK:
+        previous = _REGISTRY.get(key)
+        if previous is not None and previous is not idx:
+            HYDRATION.cancel(previous)
+        _REGISTRY[key] = idx
+        _REGISTRY.move_to_end(key)
+        _LAST_USED[key] = time.monotonic()
+    _start_sweeper()
+
+
+def _registry_drop(key: str, reason: str) -> None:
+    idx = _REGISTRY.pop(key, None)
+    if idx is not None:
+        HYDRATION.cancel(idx)
+    _LAST_USED.pop(key, None)
+    _EVICTIONS[reason] = _EVICTIONS.get(reason, 0) + 1
+
+
+def _enforce_budget(keep: Optional[str] = None) -> None:
+    """Evict least recently used indexes until the estimated total fits INDEX_CACHE_BYTES.
+
+    ``keep`` (the index being served) and indexes that are building stay.
+    """
+    with _REGISTRY_LOCK:
+        sizes = {key: idx.estimated_size() for key, idx in _REGISTRY.items()}
+        total = sum(sizes.values())
+        for key in list(_REGISTRY):
+            if total <= INDEX_CACHE_BYTES:
+                break
+            idx = _REGISTRY[key]
+            if key == keep or idx.is_building():
+                continue
+            total -= sizes[key]
+            _registry_drop(key, 'lru')
+
+
+def sweep_document_indexes() -> int:
+    """Drop indexes idle longer than their TTL and re-apply the byte budget; returns the TTL evictions."""
+    now = time.monotonic()
+    removed = 0
+    with _REGISTRY_LOCK:
+        for key, idx in list(_REGISTRY.items()):
+            if idx.is_building():
+                continue
+            if now - _LAST_USED.get(key, now) > max(60, idx.ttl_seconds):
+                _registry_drop(key, 'ttl')
+                removed += 1
+    _enforce_budget()
+    return removed
+
+
+def _start_sweeper() -> None:
+    global _SWEEPER
+    if _SWEEPER is not None and _SWEEPER.is_alive():
+        return
+    with _REGISTRY_LOCK:
+        if _SWEEPER is not None and _SWEEPER.is_alive():
+            return
+
+        def _run() -> None:
+            while True:
+                time.sleep(INDEX_SWEEP_SECONDS)
+                try:
+                    sweep_document_indexes()
+                except Exception:
+                    pass
+
+        _SWEEPER = threading.Thread(target=_run, name='DocIndexSweeper', daemon=True)
+        _SWEEPER.start()
+
+
+def document_index_stats() -> Dict[str, Any]:
+    """Totals over the resident indexes (sizes, documents, idle time), plus budget and evictions.
+
+    The registry holds every session's indexes, so no DFN is reported.
+    """
+    now = time.monotonic()
+    with _REGISTRY_LOCK:
+        entries = list(_REGISTRY.items())
+        last_used = dict(_LAST_USED)
+        evictions = dict(_EVICTIONS)
+    resident = {'indexes': 0, 'bytes': 0, 'sharedBytes': 0, 'documents': 0, 'hydrated': 0,
+                'building': 0, 'maxIdleSeconds': 0.0}
+    for key, idx in entries:
+        documents = len(idx.order)
+        resident['indexes'] += 1
+        resident['bytes'] += idx.estimated_size()
+        resident['sharedBytes'] += idx.shared_size()
+        resident['documents'] += documents
+        resident['hydrated'] += documents - len(idx.missing_text_ids)
+        resident['building'] += 1 if idx.is_building() else 0
+        resident['maxIdleSeconds'] = max(resident['maxIdleSeconds'], round(now - last_used.get(key, now), 1))
+    return {
+        'budgetBytes': INDEX_CACHE_BYTES,
+        'residentBytes': resident['bytes'],
+        'ttlSeconds': INDEX_TTL_SECONDS,
+        'sweepSeconds': INDEX_SWEEP_SECONDS,
+        'evictions': evictions,
+        'builds': INDEX_BUILDS.stats(),
+        'hydration': HYDRATION.stats(),
+        'resident': resident,
+    }
+
+
 def get_index_for_dfn(
     dfn: str,
     *,
@@ -45,19 +189,20 @@ def get_index_for_dfn(
 ) -> Optional['DocumentSearchIndex']:
     key = str(dfn)
     gw = _resolve_gateway(gateway)
-    idx = _REGISTRY.get(key)
-    if idx is None:
-        if not create:
-            return None
-        idx = DocumentSearchIndex(dfn=key, gateway=gw)
-        _REGISTRY[key] = idx
-        return idx
-    if gw is not None and not idx.matches_gateway(gw):
-        # Station/DUZ changed; start fresh index to avoid cross-site leakage
-        idx = DocumentSearchIndex(dfn=key, gateway=gw)
-        _REGISTRY[key] = idx
-    elif gw is not None:
-        idx.set_gateway(gw)
+    with _REGISTRY_LOCK:
+        idx = _registry_get(key)
+        if idx is None:
+            if not create:
+                return None
+            idx = DocumentSearchIndex(dfn=key, gateway=gw)
+            _registry_put(key, idx)
+            return idx
+        if gw is not None and not idx.matches_gateway(gw):
+            # Station/DUZ changed; start fresh index to avoid cross-site leakage
+            idx = DocumentSearchIndex(dfn=key, gateway=gw)
+            _registry_put(key, idx)
+        elif gw is not None:
+            idx.set_gateway(gw)
     return idx
 
 
@@ -71,21 +216,27 @@ def get_or_build_index_for_dfn(
 ) -> 'DocumentSearchIndex':
     key = str(dfn)
     gw = _resolve_gateway(gateway)
-    idx = _REGISTRY.get(key)
-    created = False
-    if idx is None:
-        idx = DocumentSearchIndex(dfn=key, gateway=gw)
-        _REGISTRY[key] = idx
-        created = True
-    elif gw is not None and not idx.matches_gateway(gw):
-        idx = DocumentSearchIndex(dfn=key, gateway=gw)
-        _REGISTRY[key] = idx
-        created = True
-    else:
-        if gw is not None:
-            idx.set_gateway(gw)
+    # Look up or create atomically so concurrent first requests share one index (and one build)
+    with _REGISTRY_LOCK:
+        idx = _registry_get(key)
+        created = False
+        if idx is None:
+            idx = DocumentSearchIndex(dfn=key, gateway=gw)
+            _registry_put(key, idx)
+            created = True
+        elif gw is not None and not idx.matches_gateway(gw):
+            idx = DocumentSearchIndex(dfn=key, gateway=gw)
+            _registry_put(key, idx)
+            created = True
+        else:
+            if gw is not None:
+                idx.set_gateway(gw)
 
     needs_rebuild = bool(force or created or idx.needs_build())
+    if not force and (needs_rebuild or idx.is_shared()):
+        # Another worker may have built (or hydrated further) and published this patient's index
+        if idx.adopt_shared():
+            needs_rebuild = False
     started_async = False
 
     if async_build:
@@ -99,13 +250,19 @@ def get_or_build_index_for_dfn(
         status['needs_rebuild'] = needs_rebuild
         status['started_build'] = started_async
 
+    _enforce_budget(keep=key)
     return idx
 
 
 def clear_index_for_dfn(dfn: str) -> None:
     """Remove a cached document index for the supplied DFN."""
     key = str(dfn)
-    _REGISTRY.pop(key, None)
+    with _REGISTRY_LOCK:
+        idx = _REGISTRY.pop(key, None)
+        _LAST_USED.pop(key, None)
+    if idx is not None:
+        HYDRATION.cancel(idx)
+        remove_snapshot(idx.dfn, idx.station, idx.duz)
 
 
 class DocumentSearchIndex:
@@ -119,6 +276,25 @@ class DocumentSearchIndex:
         self.generation: int = 0
         # postings: term -> list[(doc_id, tf)]
         self.postings: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # positional postings over full text: term -> doc_id -> ascending token positions
+        # (positions count stop words, so phrases with stop words keep their gaps)
+        self.positions: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+        # doc_id -> number of token positions in the full text
+        self.token_count: Dict[str, int] = {}
+        # doc_id -> offset of its positions in one index-wide position space, so a
+        # phrase is matched with a few set intersections instead of a loop per doc
+        self.doc_base: Dict[str, int] = {}
+        self._next_base = 0
+        # term -> sorted index-wide positions (and as a set), filled on first query; reset when dirty
+        self._global_positions: Dict[str, List[int]] = {}
+        self._global_position_sets: Dict[str, Set[int]] = {}
+        self._bases: List[int] = []
+        self._base_docs: List[str] = []
+        self._positions_dirty = False
+        # doc_id -> (starts, ends) character offsets per token position, filled on first use
+        self.token_spans: Dict[str, Tuple[array, array]] = {}
+        # lower-cased titles for phrase matching
+        self.title_lower: Dict[str, str] = {}
         # doc lengths for normalization
         self.doc_len: Dict[str, int] = defaultdict(int)
         # metadata fields: title/author/type/class per doc
@@ -129,15 +305,29 @@ class DocumentSearchIndex:
         self.text: Dict[str, str] = {}
         # document order (for viewer prev/next)
         self.order: List[str] = []
-        # sorted vocabulary for fast prefix expansion
+        # forward index: doc_id -> terms it has postings under (O(doc) removal)
+        self.doc_terms: Dict[str, Set[str]] = {}
+        # sorted vocabulary for fast prefix expansion; rebuilt lazily when dirty
         self.vocab_sorted: List[str] = []
+        self._vocab_dirty = False
         # minimum prefix length to trigger expansion
         self.min_prefix_len: int = 3
+        # trigram index over vocab_sorted for substring/typo expansion; built on first use
+        self._trigram_index: Optional[TermTrigramIndex] = None
+        self._trigram_bytes = 0
         # track doc ids whose full text could not be hydrated
         self.missing_text_ids: Set[str] = set()
         self._sync_hydration_limit = SYNC_HYDRATION_LIMIT
         self._is_building = False
         self._last_build_error: Optional[str] = None
+        # bumped and signalled whenever manifest() may have changed (see wait_changed)
+        self._changes = threading.Condition()
+        self._change_count = 0
+        # shared snapshot backing postings/positions/text (read-only) until the first local write
+        self._snapshot: Optional[IndexSnapshot] = None
+        self.snapshot_generation: int = 0
+        # estimated bytes of text/postings/positions/metadata, measured after each batch
+        self._resident_bytes = 0
         self.set_gateway(gateway)
 
     def set_gateway(self, gateway: Optional[DataGateway]) -> None:
@@ -196,6 +386,8 @@ class DocumentSearchIndex:
             'text_complete': len(self.missing_text_ids) == 0,
             'building': self._is_building,
             'build_error': self._last_build_error,
+            'shared_generation': self.snapshot_generation or None,
+            'hydration': HYDRATION.progress(self),
         }
 
     def iter_documents(self) -> List[Tuple[str, Dict[str, str], str]]:
@@ -205,7 +397,26 @@ class DocumentSearchIndex:
         return docs
 
     def is_building(self) -> bool:
-        return bool(self._is_building)
+        return bool(self._is_building) or INDEX_BUILDS.pending(('build', self)) is not None
+
+    def build_future(self) -> Optional[Future]:
+        """The queued or running build of this index, if any."""
+        return INDEX_BUILDS.pending(('build', self))
+
+    def change_count(self) -> int:
+        """Counter bumped by every build, adoption and hydration batch."""
+        return self._change_count
+
+    def wait_changed(self, seen: int, timeout: float) -> int:
+        """Block until ``change_count()`` moves past ``seen`` or ``timeout`` seconds pass."""
+        with self._changes:
+            self._changes.wait_for(lambda: self._change_count != seen, max(0.0, timeout))
+            return self._change_count
+
+    def _notify_changed(self, *_args: Any) -> None:
+        with self._changes:
+            self._change_count += 1
+            self._changes.notify_all()
 
     def needs_build(self) -> bool:
         if not self.order:
@@ -213,17 +424,12 @@ class DocumentSearchIndex:
         return self.is_stale()
 
     def build_async(self) -> bool:
-        if self._is_building:
-            return False
-
-        def _runner() -> None:
-            try:
-                self.build()
-            except Exception as exc:
-                self._last_build_error = str(exc)
-
-        threading.Thread(target=_runner, name=f'DocIndexBuild-{self.dfn}', daemon=True).start()
-        return True
+        """Queue a build on the shared pool; False when one is already queued or running."""
+        future, joined = INDEX_BUILDS.submit(('build', self), self._build)
+        if not joined:
+            # Done callbacks run once the pool has dropped the future, so is_building() is False
+            future.add_done_callback(self._notify_changed)
+        return not joined
 
     @staticmethod
     def _normalize_text_value(payload: Any) -> str:
@@ -233,23 +439,42 @@ class DocumentSearchIndex:
         return str(payload or '')
 
     def _reindex_document(self, doc_id: str) -> None:
-        # Remove existing postings for this document
-        for token in list(self.postings.keys()):
-            bucket = self.postings[token]
-            if doc_id in bucket:
-                try:
-                    del bucket[doc_id]
-                except Exception:
-                    bucket.pop(doc_id, None)
+        self._thaw()
+        # Remove existing postings for this document (only the terms it had)
+        for token in self.doc_terms.pop(doc_id, ()):
+            bucket = self.postings.get(token)
+            if bucket is not None:
+                bucket.pop(doc_id, None)
                 if not bucket:
                     self.postings.pop(token, None)
-        text_value = self.text.get(doc_id, '')
-        tokens = self._tokenize(text_value)
-        self.doc_len[doc_id] = len(tokens)
-        for token in tokens:
-            self.postings[token][doc_id] += 1
+            located = self.positions.get(token)
+            if located is not None:
+                located.pop(doc_id, None)
+                if not located:
+                    self.positions.pop(token, None)
+        # Lower-case and tokenize the full text once; character spans are derived lazily
+        tokens = _word_re.findall(self.text.get(doc_id, '').lower())
+        doc_positions: Dict[str, List[int]] = {}
+        for pos, w in enumerate(tokens):
+            if w not in _stop:
+                plist = doc_positions.get(w)
+                if plist is None:
+                    doc_positions[w] = [pos]
+                else:
+                    plist.append(pos)
+        self.token_count[doc_id] = len(tokens)
+        self.token_spans.pop(doc_id, None)
+        # A fresh base (one past the previous document's last position) keeps phrases from crossing documents
+        self.doc_base[doc_id] = self._next_base
+        self._next_base += len(tokens) + 1
+        self.doc_len[doc_id] = sum(len(plist) for plist in doc_positions.values())
+        terms: Set[str] = set(doc_positions)
+        for token, plist in doc_positions.items():
+            self.postings[token][doc_id] += len(plist)
+            self.positions[token][doc_id] = plist
         meta_entry = self.meta.get(doc_id, {}) or {}
         title = str(meta_entry.get('title') or '')
+        self.title_lower[doc_id] = title.lower()
         author = str(meta_entry.get('author') or '')
         dtype = str(meta_entry.get('type') or '')
         dclass = str(meta_entry.get('class') or '')
@@ -258,10 +483,137 @@ class DocumentSearchIndex:
                 continue
             for token in self._tokenize(field_val):
                 self.postings[token][doc_id] += boost
+                terms.add(token)
+        self.doc_terms[doc_id] = terms
+        # Callers reindexing a batch refresh the vocabulary once at the end
+        self._vocab_dirty = True
+        self._positions_dirty = True
+
+    def _refresh_vocab(self) -> None:
+        """Re-sort the vocabulary if any document was (re)indexed since the last sort."""
+        if not self._vocab_dirty:
+            return
+        self._vocab_dirty = False
+        self.vocab_sorted = sorted(self.postings.keys())
+
+    def _refresh_positions(self) -> None:
+        """Drop cached index-wide position lists if any document was (re)indexed."""
+        if not self._positions_dirty:
+            return
+        self._positions_dirty = False
+        self._global_positions = {}
+        self._global_position_sets = {}
+        ordered = sorted(self.doc_base.items(), key=lambda kv: kv[1])
+        self._bases = [base for _, base in ordered]
+        self._base_docs = [doc_id for doc_id, _ in ordered]
+
+    # --------------------- Memory estimate ---------------------
+
+    def _measure(self) -> None:
+        """Re-estimate resident bytes (called once per batch: build, hydrate, adopt, thaw)."""
+        size = len(self.meta) * _DOC_BYTES
+        if self._snapshot is None:
+            # Note text and postings live in this process; in a snapshot they are shared pages
+            size += sum(map(sys.getsizeof, self.text.values()))
+            size += sum(map(len, self.postings.values())) * _POSTING_BYTES
+            size += sum(map(len, chain.from_iterable(d.values() for d in self.positions.values()))) * _POSITION_BYTES
+        self._resident_bytes = size
+
+    def estimated_size(self) -> int:
+        """Estimated resident bytes, including query-time position and span caches."""
+        size = self._resident_bytes
+        # list() snapshots the caches; searches may add to them while the sweeper reads
+        size += sum(map(len, list(self._global_positions.values()))) * _POSITION_BYTES
+        size += sum(map(len, list(self._global_position_sets.values()))) * 2 * _POSITION_BYTES
+        size += sum(len(starts) for starts, _ in list(self.token_spans.values())) * 8
+        size += self._trigram_bytes
+        return size
+
+    def shared_size(self) -> int:
+        """Bytes of the mapped snapshot backing this index (0 when built locally)."""
+        return self._snapshot.size if self._snapshot is not None else 0
+
+    # --------------------- Shared snapshots ---------------------
+
+    def is_shared(self) -> bool:
+        """True while postings, positions and text are read from a mapped snapshot."""
+        return self._snapshot is not None
+
+    def adopt_shared(self, updated_after: float = 0.0) -> bool:
+        """Switch to this patient's published snapshot when it is newer than what we hold.
+
+        Only an empty index or one already backed by a snapshot is replaced;
+        a locally built index publishes its own state instead.
+        """
+        if self._is_building or (self.order and self._snapshot is None):
+            return False
+        snap = load_snapshot(
+            self.dfn, self.station, self.duz,
+            newer_than=self.snapshot_generation, updated_after=updated_after,
+        )
+        if snap is None:
+            return False
+        self._adopt(snap)
+        return True
+
+    def _adopt(self, snap: IndexSnapshot) -> None:
+        info = snap.info
+        docs = snap.doc_ids
+        self.postings = snap.postings  # type: ignore[assignment]
+        self.positions = snap.positions  # type: ignore[assignment]
+        self.text = snap.text  # type: ignore[assignment]
+        self.meta = {doc_id: dict(m or {}) for doc_id, m in (info.get('meta') or {}).items()}
+        self.order = list(info.get('order') or [])
+        self.rpc_ids = dict(info.get('rpc_ids') or {})
+        self.missing_text_ids = set(info.get('missing_text_ids') or [])
+        self.doc_len = defaultdict(int, zip(docs, info.get('doc_len') or []))
+        self.token_count = dict(zip(docs, info.get('token_count') or []))
+        self.title_lower = {doc_id: str(m.get('title') or '').lower() for doc_id, m in self.meta.items()}
+        self.token_spans = {}
+        self.doc_base = {}
+        self._next_base = 0
+        for doc_id in docs:
+            self.doc_base[doc_id] = self._next_base
+            self._next_base += self.token_count.get(doc_id, 0) + 1
+        self._positions_dirty = True
+        self.doc_terms = {}
+        self.vocab_sorted = list(snap.terms)
+        self._vocab_dirty = False
+        self.updated_at = snap.updated_at
+        self.generation = max(self.generation + 1, int(info.get('index_generation') or 0))
+        self.snapshot_generation = snap.generation
+        self._snapshot = snap
+        self._measure()
+        self._notify_changed()
+
+    def _thaw(self) -> None:
+        """Copy a snapshot-backed index into mutable structures before a local write."""
+        snap = self._snapshot
+        if snap is None:
+            return
+        postings: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        doc_terms: Dict[str, Set[str]] = {}
+        for term, docs in snap.postings.items():
+            postings[term] = defaultdict(int, docs)
+            for doc_id in docs:
+                doc_terms.setdefault(doc_id, set()).add(term)
+        self.postings = postings
+        self.positions = defaultdict(dict, snap.positions.items())
+        self.text = dict(snap.text.items())
+        self.doc_terms = doc_terms
+        self._snapshot = None
+        self._measure()
+
+    def publish_shared(self) -> None:
+        """Write the current state as this patient's shared snapshot (no-op when sharing is off)."""
+        if self._snapshot is not None:
+            return
         try:
-            self.vocab_sorted = sorted(self.postings.keys())
+            generation = write_snapshot(self)
         except Exception:
-            self.vocab_sorted = list(self.postings.keys())
+            return  # a concurrent hydrate changed the index mid-write; the next publish catches up
+        if generation:
+            self.snapshot_generation = generation
 
     def hydrate_texts(self, doc_ids: List[str]) -> int:
         if not doc_ids:
@@ -282,7 +634,8 @@ class DocumentSearchIndex:
         if not rpc_tokens:
             return 0
         try:
-            fetched = gateway.get_document_texts(self.dfn, rpc_tokens)
+            with HYDRATION.site_slot(self.station, len(rpc_tokens)):
+                fetched = gateway.get_document_texts(self.dfn, rpc_tokens)
         except Exception:
             fetched = {}
         if not fetched:
@@ -295,20 +648,38 @@ class DocumentSearchIndex:
             text_value = self._normalize_text_value(payload)
             if not text_value.strip():
                 continue
+            self._thaw()
             self.text[doc_id] = text_value
             self.missing_text_ids.discard(doc_id)
             self._reindex_document(doc_id)
             updated += 1
+        self._refresh_vocab()
+        if updated:
+            self._measure()
+            self.publish_shared()
+            self._notify_changed()
         return updated
 
+    def hydration_plan(self) -> List[Tuple[int, str]]:
+        """Missing notes as (tier, doc_id) in fetch order: the HYDRATE_RECENT most recent
+        notes (tier 0), then discharge summaries and consults (1), then older notes (2)."""
+        missing = [doc_id for doc_id in self.order if doc_id in self.missing_text_ids and self.rpc_ids.get(doc_id)]
+        missing.sort(key=lambda doc_id: str((self.meta.get(doc_id) or {}).get('date') or ''), reverse=True)
+        plan: List[Tuple[int, str]] = []
+        for rank, doc_id in enumerate(missing):
+            if rank < HYDRATE_RECENT:
+                tier = 0
+            else:
+                meta_entry = self.meta.get(doc_id) or {}
+                label = ' '.join(str(meta_entry.get(field) or '') for field in ('title', 'type', 'class'))
+                tier = 1 if _summary_re.search(label) else 2
+            plan.append((tier, doc_id))
+        plan.sort(key=lambda entry: entry[0])
+        return plan
+
     def ensure_priority_texts(self, limit: Optional[int] = None) -> int:
-        target_limit = limit or RAG_PRIORITY_HYDRATE_LIMIT
-        targets: List[str] = []
-        for doc_id in self.order:
-            if doc_id in self.missing_text_ids and self.rpc_ids.get(doc_id):
-                targets.append(doc_id)
-            if target_limit and len(targets) >= target_limit:
-                break
+        """Hydrate up to ``limit`` of the highest-priority missing notes on this thread."""
+        targets = HYDRATION.claim(self, limit or RAG_PRIORITY_HYDRATE_LIMIT)
         if not targets:
             return 0
         return self.hydrate_texts(targets)
@@ -339,24 +710,43 @@ class DocumentSearchIndex:
         return phrases, terms
 
     def build(self):
-        waited = False
-        while self._is_building:
-            waited = True
-            time.sleep(0.05)
-        if waited and self.order and not self.is_stale():
-            return
+        """Build the index, or wait for the build already queued or running."""
+        try:
+            INDEX_BUILDS.run(('build', self), self._build)
+        finally:
+            self._notify_changed()
 
+    def _build(self) -> None:
         self._is_building = True
         self._last_build_error = None
+        self._notify_changed()
+        requested_at = time.time()
+        # Across workers: one builds and publishes, the rest wait here and map its snapshot
+        shared_lock = build_lock(self.dfn, self.station, self.duz)
         try:
+            if shared_lock.waited:
+                snap = load_snapshot(self.dfn, self.station, self.duz, updated_after=requested_at)
+                if snap is not None:
+                    self._adopt(snap)
+                    return
             # Reset state before rebuild to avoid carrying stale structures
+            self._snapshot = None
             self.postings = defaultdict(lambda: defaultdict(int))
+            self.positions = defaultdict(dict)
+            self.token_count = {}
+            self.token_spans = {}
+            self.doc_base = {}
+            self._next_base = 0
+            self._positions_dirty = True
+            self.title_lower = {}
             self.doc_len = defaultdict(int)
             self.meta = {}
             self.rpc_ids = {}
             self.text = {}
             self.order = []
+            self.doc_terms = {}
             self.vocab_sorted = []
+            self._vocab_dirty = False
             self.missing_text_ids = set()
 
             gateway = self.gateway or VistaApiXGateway()
@@ -615,7 +1005,8 @@ class DocumentSearchIndex:
                         break
                 if tokens:
                     try:
-                        fallback_map = gateway.get_document_texts(self.dfn, tokens)
+                        with HYDRATION.site_slot(self.station, len(tokens)):
+                            fallback_map = gateway.get_document_texts(self.dfn, tokens)
                     except Exception:
                         fallback_map = {}
                     for requested_id, lines in (fallback_map or {}).items():
@@ -644,15 +1035,19 @@ class DocumentSearchIndex:
                     self.missing_text_ids.add(doc_id)
 
                 self._reindex_document(doc_id)
+            self._refresh_vocab()
 
             # Recompute missing text set to ensure consistency with latest text assignments
             self.missing_text_ids = {doc_id for doc_id in self.order if not (self.text.get(doc_id) or '').strip()}
             self.updated_at = time.time()
             self.generation += 1
+            self._measure()
+            self.publish_shared()
         except Exception as exc:
             self._last_build_error = str(exc)
             raise
         finally:
+            shared_lock.release()
             self._is_building = False
 
     def _extract_full_text(self, raw_item: Dict[str, Any]) -> str | None:
@@ -687,16 +1082,156 @@ class DocumentSearchIndex:
             pass
         return None
 
+    def _phrase_words(self, phrase: str) -> List[str]:
+        return [m.group(0).lower() for m in _word_re.finditer(phrase)]
+
+    def _term_positions(self, term: str) -> List[int]:
+        """Sorted index-wide positions of ``term`` in full text."""
+        cached = self._global_positions.get(term)
+        if cached is None:
+            cached = []
+            base_of = self.doc_base
+            for doc_id, plist in (self.positions.get(term) or {}).items():
+                cached.extend(map(base_of[doc_id].__add__, plist))
+            cached.sort()
+            self._global_positions[term] = cached
+        return cached
+
+    def _term_position_set(self, term: str) -> Set[int]:
+        cached = self._global_position_sets.get(term)
+        if cached is None:
+            cached = self._global_position_sets[term] = set(self._term_positions(term))
+        return cached
+
+    def _operand_starts(self, words: List[str]) -> List[int]:
+        """Sorted index-wide positions where ``words`` occur in sequence.
+
+        Stop words are not indexed; they match any single token in their slot.
+        A match may run past the end of its document; ``_locate`` filters those.
+        """
+        self._refresh_positions()
+        anchors: List[Tuple[int, str]] = []
+        for rel, w in enumerate(words):
+            if w in _stop:
+                continue
+            if not self._term_positions(w):
+                return []
+            anchors.append((rel, w))
+        if not anchors:
+            return []
+        if len(anchors) == 1 and anchors[0][0] == 0:
+            return self._term_positions(anchors[0][1])
+        anchors.sort(key=lambda a: len(self._term_positions(a[1])))  # rarest word first
+        # Candidate starts from the rarest word, shifted onto each other word's
+        # position set and back (set ops stay in C and scale with the rarest word)
+        rel, w = anchors[0]
+        starts = set(map((-rel).__add__, self._term_positions(w)))
+        for rel, w in anchors[1:]:
+            found = self._term_position_set(w).intersection(map(rel.__add__, starts))
+            starts = set(map((-rel).__add__, found))
+            if not starts:
+                return []
+        return sorted(starts)
+
+    def _locate(self, first: int, last: int) -> Optional[Tuple[str, int]]:
+        """(doc_id, local first position) when index-wide span ``first..last`` lies in one document."""
+        i = bisect_right(self._bases, first) - 1
+        if i < 0:
+            return None
+        doc_id = self._base_docs[i]
+        base = self._bases[i]
+        if first < base or last - base >= self.token_count.get(doc_id, 0):
+            return None
+        return doc_id, first - base
+
+    @staticmethod
+    def _near_spans(a: List[int], la: int, b: List[int], lb: int, k: int) -> List[Tuple[int, int]]:
+        """(first, last) token spans where an ``a`` match and a ``b`` match are at most ``k`` tokens apart."""
+        out: List[Tuple[int, int]] = []
+        for pa in a:
+            a_end = pa + la - 1
+            i = bisect_left(b, pa - k - (lb - 1))
+            while i < len(b) and b[i] <= a_end + k:
+                pb = b[i]
+                out.append((min(pa, pb), max(a_end, pb + lb - 1)))
+                i += 1
+        return out
+
+    def _spans(self, doc_id: str) -> Tuple[array, array]:
+        """Character offsets into the original text of every token position
+        (only documents with hits pay for this)."""
+        spans = self.token_spans.get(doc_id)
+        if spans is None:
+            text = self.text.get(doc_id, '')
+            low = text.lower()
+            found = list(_word_re.finditer(low))
+            starts = array('I', map(re.Match.start, found))
+            ends = array('I', map(re.Match.end, found))
+            if len(low) != len(text):
+                # Lower-casing changed the length ('\u0130' -> 'i\u0307'): map offsets back to ``text``
+                origin = [i for i, ch in enumerate(text) for _ in ch.lower()]
+                starts = array('I', [origin[a] for a in starts])
+                ends = array('I', [origin[b - 1] + 1 for b in ends])
+            spans = self.token_spans[doc_id] = (starts, ends)
+        return spans
+
+    def _char_span(self, doc_id: str, first: int, last: int) -> Optional[List[int]]:
+        spans = self._spans(doc_id)
+        if last >= len(spans[0]):
+            return None
+        return [spans[0][first], spans[1][last]]
+
+    def _parse_query(self, q: str) -> Tuple[List[str], List[str], List[Tuple[str, List[str], List[str], int]]]:
+        """(phrases, terms, near clauses); NEAR clauses are removed before the rest is parsed."""
+        near: List[Tuple[str, List[str], List[str], int]] = []
+
+        def _take(m: 're.Match[str]') -> str:
+            left = self._phrase_words(m.group(1).strip('"'))
+            right = self._phrase_words(m.group(3).strip('"'))
+            if left and right:
+                near.append((m.group(0), left, right, int(m.group(2))))
+            return ' '
+        rest = _near_re.sub(_take, q)
+        phrases, terms = self._iter_terms(rest)
+        return phrases, terms, near
+
     def search(self, q: str, fields: Set[str] | None = None) -> List[Dict[str, Any]]:
+        """Every result for ``q``, best first (see ``search_page``)."""
+        return self.search_page(q, fields=fields, limit=None)[0]
+
+    def search_page(
+        self,
+        q: str,
+        fields: Set[str] | None = None,
+        limit: Optional[int] = 50,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Rank documents for ``q`` and return ``(page, total)``.
+
+        Scoring is BM25-lite over terms (prefix-expanded; a term with no exact or
+        prefix match falls back to substring, then edit-distance expansion at a
+        reduced weight), plus boosts for quoted
+        phrases and ``a NEAR/k b`` proximity clauses (terms or quoted phrases
+        within k words of each other, either order). Phrase and proximity
+        matches come from the positional postings; each result lists them under
+        ``hits`` with character ``offsets`` into the full text.
+
+        Only the top ``offset + limit`` scores are selected (heap), and result
+        rows, offsets and snippets are built for the returned page alone;
+        ``total`` counts every matching document. ``limit=None`` returns all.
+        """
         fields = fields or set(['full','title','author','type'])
-        phrases, terms = self._iter_terms(q)
+        phrases, terms, near = self._parse_query(q)
         # Collect candidate docs from terms
         candidate_scores: Dict[str, float] = defaultdict(float)
+        # doc_id -> [(query label, [(first, last) local token spans])]; offsets are resolved per page
+        doc_matches: Dict[str, List[Tuple[str, List[Tuple[int, int]]]]] = defaultdict(list)
         df: Dict[str, int] = {}
         N = max(1, len(self.doc_len))
         avg_len = max(1.0, self._avg_len())
-        for t in terms:
-            expanded_terms = self._expand_prefix(t)
+        expansions = [self._expand_term(t) for t in terms]
+        expanded: List[List[str]] = [found for found, _ in expansions]
+        for expanded_terms, weight in expansions:
             # Use a set to avoid duplicate terms
             seen_terms: Set[str] = set(expanded_terms)
             for et in seen_terms:
@@ -704,41 +1239,77 @@ class DocumentSearchIndex:
                 df[et] = len(postings)
                 if not df[et]:
                     continue
-                idf = max(0.0, __import__('math').log((N - df[et] + 0.5) / (df[et] + 0.5) + 1.0))
+                idf = max(0.0, math.log((N - df[et] + 0.5) / (df[et] + 0.5) + 1.0))
                 for doc_id, tf in postings.items():
                     # Normalize by doc length (BM25-lite style). Treat prefix-expanded terms the same
-                    score_inc = (tf / (0.5 + 1.5 * (self.doc_len.get(doc_id, 0) / avg_len))) * idf
+                    score_inc = (tf / (0.5 + 1.5 * (self.doc_len.get(doc_id, 0) / avg_len))) * idf * weight
                     candidate_scores[doc_id] += score_inc
         # Phrase boosts
         for phr in phrases:
-            # Simple contains for now; can be improved with positional index later
-            phr_l = phr.lower()
-            for doc_id, full in self.text.items():
-                if 'full' in fields and full and phr_l in full.lower():
+            words = self._phrase_words(phr)
+            if 'full' in fields and words:
+                width = len(words) - 1
+                matches: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+                for p in self._operand_starts(words):
+                    located = self._locate(p, p + width)
+                    if located:
+                        local = located[1]
+                        matches[located[0]].append((local, local + width))
+                for doc_id, found in matches.items():
                     candidate_scores[doc_id] += 3.0
+                    doc_matches[doc_id].append((phr, found))
             if 'title' in fields:
-                for doc_id, m in self.meta.items():
-                    if (m.get('title') or '').lower().find(phr_l) != -1:
+                for doc_id, title in self.title_lower.items():
+                    if phr in title:
                         candidate_scores[doc_id] += 2.0
-        # Build results
-        ordered = sorted(candidate_scores.items(), key=lambda kv: kv[1], reverse=True)
+        # Proximity boosts
+        if 'full' in fields:
+            for label, left, right, k in near:
+                spans: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+                for first, last in self._near_spans(
+                    self._operand_starts(left), len(left),
+                    self._operand_starts(right), len(right),
+                    k,
+                ):
+                    located = self._locate(first, last)
+                    if located:
+                        local = located[1]
+                        spans[located[0]].append((local, local + last - first))
+                for doc_id, found in spans.items():
+                    candidate_scores[doc_id] += 3.0
+                    doc_matches[doc_id].append((label, found))
+        # Select the page: nlargest keeps sorted()'s order for equal scores
+        total = len(candidate_scores)
+        offset = max(0, int(offset or 0))
+        by_score = lambda kv: kv[1]  # noqa: E731
+        if limit is None:
+            ordered = sorted(candidate_scores.items(), key=by_score, reverse=True)[offset:]
+        else:
+            top = max(0, int(limit)) + offset
+            ordered = heapq.nlargest(top, candidate_scores.items(), key=by_score)[offset:] if top else []
+        # Build results for the page only
         items: List[Dict[str, Any]] = []
         for doc_id, score in ordered:
             meta = self.meta.get(doc_id, {})
-            snip = self._snippet(self.text.get(doc_id, ''), phrases or terms)
+            hits: List[Dict[str, Any]] = []
+            for label, found in doc_matches.get(doc_id) or ():
+                offsets = [self._char_span(doc_id, a, b) for a, b in found[:_MAX_HIT_OFFSETS]]
+                hits.append({'query': label, 'count': len(found), 'offsets': [o for o in offsets if o]})
+            snip = self._snippet(doc_id, hits, expanded)
             # include light metadata so UI can render meaningful rows without extra calls
             items.append({
                 'doc_id': doc_id,
                 'score': float(score),
                 'snippet': snip,
                 'fields_hits': None,
+                'hits': hits,
                 'title': meta.get('title') or None,
                 'author': meta.get('author') or None,
                 'type': meta.get('type') or None,
                 'class': meta.get('class') or None,
                 'date': meta.get('date') or None,
             })
-        return items
+        return items, total
 
     def _expand_prefix(self, token: str) -> List[str]:
         """Return a list of vocabulary terms to consider for a query token.
@@ -753,6 +1324,7 @@ class DocumentSearchIndex:
             out: List[str] = []
             if s in self.postings:
                 out.append(s)
+            self._refresh_vocab()
             if len(s) < self.min_prefix_len or not self.vocab_sorted:
                 return out or [s]
             # binary search for prefix range in sorted vocab
@@ -779,24 +1351,72 @@ class DocumentSearchIndex:
         except Exception:
             return [token]
 
+    def _term_trigrams(self) -> TermTrigramIndex:
+        """Trigram index of the current vocabulary (rebuilt when the vocabulary is re-sorted)."""
+        self._refresh_vocab()
+        trigrams = self._trigram_index
+        if trigrams is None or trigrams.vocab is not self.vocab_sorted:
+            trigrams = TermTrigramIndex(self.vocab_sorted)
+            self._trigram_index = trigrams
+            self._trigram_bytes = trigrams.size()
+        return trigrams
+
+    def _expand_term(self, token: str) -> Tuple[List[str], float]:
+        """Vocabulary terms for a query token and their score weight.
+
+        Exact and prefix matches come first; only when neither exists does the
+        token expand to terms containing it ("hctz" -> "lisinoprilhctz"), and
+        failing that to terms within ``max_edits`` edits ("metfromin" -> "metformin").
+        """
+        found = self._expand_prefix(token)
+        if any(term in self.postings for term in found):
+            return found, 1.0
+        s = (token or '').strip().lower()
+        if len(s) < self.min_prefix_len:
+            return found, 1.0
+        trigrams = self._term_trigrams()
+        contained = trigrams.substring(s)
+        if contained:
+            return contained, _SUBSTRING_WEIGHT
+        close = trigrams.fuzzy(s, max_edits(s))
+        if close:
+            return [term for term, _ in close], _FUZZY_WEIGHT
+        return found, 1.0
+
     def _avg_len(self) -> float:
         if not self.doc_len:
             return 1.0
         return sum(self.doc_len.values()) / max(1, len(self.doc_len))
 
-    def _snippet(self, text: str, cues: List[str], width: int = 180) -> str:
-        if not text or not cues:
+    def _snippet(self, doc_id: str, hits: List[Dict[str, Any]], expanded: List[List[str]], width: int = 180) -> str:
+        """Text around the earliest phrase/proximity hit, else the first query term that occurs.
+
+        ``expanded`` holds each query term's expansions. Positions and
+        character spans come from the index, so the text is never lower-cased
+        or scanned here.
+        """
+        text = self.text.get(doc_id, '')
+        if not text:
             return ''
-        low = text.lower()
-        for c in cues:
-            c = c.strip().lower()
-            if not c:
-                continue
-            i = low.find(c)
-            if i != -1:
-                start = max(0, i - width//2)
-                end = min(len(text), i + len(c) + width//2)
-                prefix = '...' if start > 0 else ''
-                suffix = '...' if end < len(text) else ''
-                return prefix + text[start:end].replace('\n',' ') + suffix
-        return text[:width] + ('...' if len(text) > width else '')
+        start = end = None
+        for hit in hits:
+            for offset in hit.get('offsets') or ():
+                if start is None or offset[0] < start:
+                    start, end = offset
+        if start is None:
+            for expanded_terms in expanded:
+                first = None
+                for et in expanded_terms:
+                    plist = (self.positions.get(et) or {}).get(doc_id)
+                    if plist and (first is None or plist[0] < first):
+                        first = plist[0]
+                if first is not None:
+                    start, end = self._char_span(doc_id, first, first) or (None, None)
+                    break
+        if start is None:
+            return text[:width] + ('...' if len(text) > width else '')
+        lo = max(0, start - width//2)
+        hi = min(len(text), end + width//2)
+        prefix = '...' if lo > 0 else ''
+        suffix = '...' if hi < len(text) else ''
+        return prefix + text[lo:hi].replace('\n',' ') + suffix
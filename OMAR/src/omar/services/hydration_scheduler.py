@@ -0,0 +1,445 @@
+"""Site-aware background hydration of note texts for document indexes.
+
+A document index is built from note metadata; full note texts come later,
+in batches, from ``get_document_texts`` (TIU RPCs against the patient's
+VistA site). ``HydrationScheduler`` is the one place that decides which
+texts to fetch next and how hard each site is pushed:
+
+  * one job per index holds its missing notes in priority tiers - the most
+    recent notes first, then discharge summaries and consults, then older
+    notes (``DocumentSearchIndex.hydration_plan``),
+  * jobs wait in a heap ordered by (focused patient first, head tier, age);
+    the dispatcher thread pops the best job whose site has a free slot and
+    runs one batch of it on the shared index pool (``INDEX_BUILDS``),
+  * every text fetch, background or synchronous, goes through
+    ``site_slot(site, docs)``: at most ``DOCUMENT_HYDRATE_SITE_CONCURRENCY``
+    fetches per site at once and a token bucket of
+    ``DOCUMENT_HYDRATE_SITE_RATE`` notes per second,
+  * ``focus(index)`` marks the patient a user just opened; that user's other
+    jobs pause until the new patient's build and recent-note tier are done
+    (at most ``DOCUMENT_HYDRATE_SWITCH_PAUSE`` seconds), then resume behind it.
+
+``progress(index)`` feeds the ``hydration`` block of the index manifest
+(``/api/documents/index/status``); ``stats()`` reports per-site load.
+
+Knobs (environment):
+
+  * ``DOCUMENT_HYDRATE_SITE_CONCURRENCY`` - text fetches in flight per site (default 2)
+  * ``DOCUMENT_HYDRATE_SITE_RATE``  - notes per second per site, 0 = unlimited (default 40)
+  * ``DOCUMENT_HYDRATE_BATCH``      - notes per background batch (default 25)
+  * ``DOCUMENT_HYDRATE_RECENT``     - notes in the "recent" tier (default 50)
+  * ``DOCUMENT_HYDRATE_SWITCH_PAUSE`` - longest pause after a patient switch, seconds (default 20)
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .index_builds import INDEX_BUILDS
+
+TIERS = ('recent', 'summaries', 'older')
+
+
+def _env_int(name: str, default: int, low: int) -> int:
+    try:
+        value = int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        value = default
+    return max(low, value)
+
+
+SITE_CONCURRENCY = _env_int('DOCUMENT_HYDRATE_SITE_CONCURRENCY', 2, 1)
+SITE_RATE = _env_int('DOCUMENT_HYDRATE_SITE_RATE', 40, 0)
+HYDRATE_BATCH = _env_int('DOCUMENT_HYDRATE_BATCH', 25, 1)
+HYDRATE_RECENT = _env_int('DOCUMENT_HYDRATE_RECENT', 50, 0)
+SWITCH_PAUSE_SECONDS = _env_int('DOCUMENT_HYDRATE_SWITCH_PAUSE', 20, 0)
+
+_held = threading.local()
+
+
+class _Site:
+    """Concurrency slots and a token bucket (notes/second) for one VistA site."""
+
+    def __init__(self, rate: int, limit: int) -> None:
+        self.rate = rate
+        self.limit = limit
+        self.running = 0
+        self.tokens = float(max(rate, HYDRATE_BATCH))
+        self.stamp = time.monotonic()
+        self.batches = 0
+        self.docs = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(float(max(self.rate, HYDRATE_BATCH)), self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a fetch may start (0 when one may start now)."""
+        if self.running >= self.limit:
+            return -1.0  # wait for a release
+        self._refill(now)
+        if not self.rate or self.tokens > 0:
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def take(self, docs: int) -> None:
+        # A batch larger than the bucket may start on a full bucket and leave it in debt
+        self.running += 1
+        self.batches += 1
+        self.docs += docs
+        if self.rate:
+            self.tokens -= docs
+
+
+class _Job:
+    """Missing notes of one index, queued in tier order."""
+
+    def __init__(self, index: Any, owner: Tuple[str, str], site: str) -> None:
+        self.index = index
+        self.owner = owner
+        self.site = site
+        self.queue: List[Tuple[int, str]] = []
+        self.inflight: Set[str] = set()
+        self.running = False
+        self.waiting_build = False
+        self.version = 0
+        self.seq = 0
+        self.hydrated = 0
+        self.failed = 0
+        self.batches = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def take(self, size: int) -> List[str]:
+        # One tier per batch so a batch never mixes recent notes with older ones
+        if not self.queue:
+            return []
+        tier = self.queue[0][0]
+        end = 0
+        while end < len(self.queue) and end < size and self.queue[end][0] == tier:
+            end += 1
+        batch = [doc_id for _, doc_id in self.queue[:end]]
+        del self.queue[:end]
+        return batch
+
+
+class HydrationScheduler:
+    """Priority queue of hydration jobs with per-site limits and switch pauses."""
+
+    def __init__(self, concurrency: int, rate: int, batch: int) -> None:
+        self.concurrency = concurrency
+        self.rate = rate
+        self.batch = batch
+        self._cond = threading.Condition()
+        self._jobs: Dict[Any, _Job] = {}
+        self._heap: List[Tuple[Tuple[int, int, int], int, int, _Job]] = []
+        self._sites: Dict[str, _Site] = {}
+        self._focus: Dict[Tuple[str, str], str] = {}
+        self._paused_until: Dict[Tuple[str, str], float] = {}
+        self._seq = itertools.count()
+        self._switches = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # ----- per-site limits -----
+
+    def _site(self, site: str) -> _Site:
+        state = self._sites.get(site)
+        if state is None:
+            state = self._sites[site] = _Site(self.rate, self.concurrency)
+        return state
+
+    @contextmanager
+    def site_slot(self, site: Optional[str], docs: int) -> Iterator[None]:
+        """Hold one of ``site``'s fetch slots (and ``docs`` rate tokens) for the block.
+
+        Re-entrant per thread: a batch dispatched by the scheduler already holds its slot.
+        """
+        key = str(site or 'default')
+        if getattr(_held, 'site', None) == key:
+            yield
+            return
+        started = time.monotonic()
+        with self._cond:
+            state = self._site(key)
+            waited = False
+            while True:
+                delay = state.delay(time.monotonic())
+                if delay == 0.0:
+                    break
+                waited = True
+                self._cond.wait(None if delay < 0 else delay)
+            state.take(max(1, docs))
+            if waited:
+                state.waits += 1
+                state.wait_seconds += time.monotonic() - started
+        _held.site = key
+        try:
+            yield
+        finally:
+            _held.site = None
+            self._release(key)
+
+    def _release(self, site: str) -> None:
+        with self._cond:
+            self._site(site).running -= 1
+            self._cond.notify_all()
+
+    # ----- jobs -----
+
+    @staticmethod
+    def _owner(index: Any) -> Tuple[str, str]:
+        return (str(index.station or ''), str(index.duz or ''))
+
+    def _focused(self, job: _Job) -> bool:
+        return self._focus.get(job.owner) == job.index.dfn
+
+    def _push(self, job: _Job) -> None:
+        # Lazy heap: re-pushing bumps the version and strands the old entry
+        if job.running or not job.queue:
+            return
+        job.version += 1
+        rank = (0 if self._focused(job) else 1, job.queue[0][0], job.seq)
+        heapq.heappush(self._heap, (rank, next(self._seq), job.version, job))
+        self._cond.notify_all()
+
+    def _job(self, index: Any) -> _Job:
+        job = self._jobs.get(index)
+        if job is None:
+            job = self._jobs[index] = _Job(index, self._owner(index), str(index.station or 'default'))
+            job.seq = next(self._seq)
+        return job
+
+    def enqueue(self, index: Any) -> None:
+        """Queue ``index``'s missing notes (after its pending build, if one is running)."""
+        if index is None:
+            return
+        future = index.build_future() if index.is_building() else None
+        with self._cond:
+            job = self._job(index)
+            if future is not None:
+                if not job.waiting_build:
+                    job.waiting_build = True
+                    future.add_done_callback(lambda _f: self._built(index))
+                return
+            job.queue = [(tier, doc_id) for tier, doc_id in index.hydration_plan() if doc_id not in job.inflight]
+            if job.queue:
+                job.started_at = job.started_at or time.time()
+                job.finished_at = None
+            elif not job.running:
+                job.finished_at = job.finished_at or time.time()
+            self._push(job)
+        self._start()
+
+    def _built(self, index: Any) -> None:
+        with self._cond:
+            job = self._jobs.get(index)
+            if job is None:
+                return  # cancelled while building
+            job.waiting_build = False
+        self.enqueue(index)
+
+    def focus(self, index: Any) -> None:
+        """``index``'s patient was opened: serve it first and pause the user's other jobs."""
+        if index is None:
+            return
+        owner = self._owner(index)
+        with self._cond:
+            if self._focus.get(owner) != index.dfn:
+                self._focus[owner] = index.dfn
+                self._switches += 1
+                if SWITCH_PAUSE_SECONDS:
+                    self._paused_until[owner] = time.monotonic() + SWITCH_PAUSE_SECONDS
+                for job in self._jobs.values():
+                    if job.owner == owner:
+                        self._push(job)
+        self.enqueue(index)
+
+    def claim(self, index: Any, limit: int) -> List[str]:
+        """Take up to ``limit`` of ``index``'s highest-priority missing notes for a caller
+        that fetches them itself, so the background job does not fetch them again."""
+        with self._cond:
+            job = self._jobs.get(index)
+            inflight = job.inflight if job is not None else set()
+            plan = [doc_id for _, doc_id in index.hydration_plan() if doc_id not in inflight]
+            claimed = plan[:limit] if limit else plan
+            if job is not None and claimed:
+                taken = set(claimed)
+                job.queue = [entry for entry in job.queue if entry[1] not in taken]
+            return claimed
+
+    def cancel(self, index: Any) -> None:
+        """Forget ``index`` (evicted or replaced); a batch already running finishes."""
+        with self._cond:
+            job = self._jobs.pop(index, None)
+            if job is not None:
+                job.queue = []
+
+    # ----- dispatch -----
+
+    def _paused(self, job: _Job, now: float) -> bool:
+        until = self._paused_until.get(job.owner)
+        if until is None or self._focused(job):
+            return False
+        if now < until:
+            focus = next((j for j in self._jobs.values()
+                          if j.owner == job.owner and j.index.dfn == self._focus.get(job.owner)), None)
+            if focus is None or focus.waiting_build or focus.running or (focus.queue and focus.queue[0][0] == 0):
+                return True
+        self._paused_until.pop(job.owner, None)
+        return False
+
+    def _next(self, now: float) -> Tuple[Optional[_Job], Optional[float]]:
+        """Pop the best runnable job; otherwise (None, seconds until one might be)."""
+        skipped = []
+        chosen: Optional[_Job] = None
+        wake: Optional[float] = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            job = entry[3]
+            if entry[2] != job.version or job.running or not job.queue or self._jobs.get(job.index) is not job:
+                continue
+            if self._paused(job, now):
+                skipped.append(entry)
+                pause_left = self._paused_until[job.owner] - now
+                wake = pause_left if wake is None else min(wake, pause_left)
+                continue
+            delay = self._site(job.site).delay(now)
+            if delay != 0.0:
+                skipped.append(entry)
+                if delay > 0:
+                    wake = delay if wake is None else min(wake, delay)
+                continue
+            chosen = job
+            break
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return chosen, wake
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._cond:
+                job, wake = self._next(time.monotonic())
+                if job is None:
+                    self._cond.wait(wake)
+                    continue
+                batch = job.take(self.batch)
+                job.running = True
+                job.inflight = set(batch)
+                self._site(job.site).take(len(batch))
+                # One key per batch: the previous batch's future stays registered
+                # until its task returns, and joining it would drop this batch
+                key = ('hydrate', job.index, next(self._seq))
+            try:
+                _, joined = INDEX_BUILDS.submit(key, lambda job=job, batch=batch: self._run(job, batch))
+            except Exception:
+                joined = True  # pool shut down
+            if joined:
+                self._finish(job, batch, 0)
+
+    def _finish(self, job: _Job, batch: List[str], hydrated: int) -> None:
+        """Release ``job``'s site slot after a batch and queue its next one."""
+        with self._cond:
+            self._site(job.site).running -= 1
+            job.running = False
+            job.inflight = set()
+            job.batches += 1
+            job.hydrated += hydrated
+            job.failed += len(batch) - hydrated
+            if job.queue:
+                self._push(job)
+            else:
+                job.finished_at = time.time()
+            self._cond.notify_all()
+
+    def _run(self, job: _Job, batch: List[str]) -> None:
+        _held.site = job.site
+        hydrated = 0
+        try:
+            hydrated = job.index.hydrate_texts(batch)
+        except Exception:
+            hydrated = 0
+        finally:
+            _held.site = None
+            self._finish(job, batch, hydrated)
+
+    def _start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._dispatch, name='DocHydration', daemon=True)
+            self._thread.start()
+
+    # ----- reporting -----
+
+    def progress(self, index: Any) -> Dict[str, Any]:
+        """Hydration state of ``index`` for its manifest."""
+        with self._cond:
+            job = self._jobs.get(index)
+            if job is None:
+                return {'state': 'idle'}
+            by_tier = {name: 0 for name in TIERS}
+            for tier, _ in job.queue:
+                by_tier[TIERS[tier]] += 1
+            if job.waiting_build:
+                state = 'waiting_build'
+            elif job.running:
+                state = 'running'
+            elif not job.queue:
+                state = 'done'
+            elif self._paused(job, time.monotonic()):
+                state = 'paused'
+            else:
+                state = 'queued'
+            return {
+                'state': state,
+                'focused': self._focused(job),
+                'site': job.site,
+                'queued': len(job.queue),
+                'queued_by_tier': by_tier,
+                'in_flight': len(job.inflight),
+                'hydrated': job.hydrated,
+                'failed': job.failed,
+                'batches': job.batches,
+                'started_at': job.started_at,
+                'finished_at': job.finished_at,
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            sites = {}
+            for name, state in self._sites.items():
+                jobs = [j for j in self._jobs.values() if j.site == name]
+                sites[name] = {
+                    'running': state.running,
+                    'concurrency': state.limit,
+                    'ratePerSecond': state.rate or None,
+                    'queuedDocs': sum(len(j.queue) for j in jobs),
+                    'jobs': len(jobs),
+                    'batches': state.batches,
+                    'docs': state.docs,
+                    'waits': state.waits,
+                    'waitSeconds': round(state.wait_seconds, 4),
+                }
+            return {
+                'batchSize': self.batch,
+                'switches': self._switches,
+                'pausedUsers': sum(1 for until in self._paused_until.values() if until > now),
+                'sites': sites,
+            }
+
+
+HYDRATION = HydrationScheduler(SITE_CONCURRENCY, SITE_RATE, HYDRATE_BATCH)
+
+
+__all__ = ['HYDRATE_RECENT', 'HYDRATION', 'HydrationScheduler', 'TIERS']
@@ -0,0 +1,176 @@
+"""Single-flight background work for document indexes on a bounded pool.
+
+Index builds, priority text hydration and RAG store syncs used to start a
+daemon thread per request; a burst of requests for a newly opened patient
+raced several builds of the same index and grew threads without bound.
+``BuildCoordinator`` keeps one future per key (for example
+``('build', index)``) on a shared ``ThreadPoolExecutor``:
+
+  * ``submit(key, fn)`` queues ``fn`` unless a future for ``key`` is still
+    pending, in which case the caller joins that future,
+  * ``run(key, fn)`` does the same and waits for the result (synchronous
+    callers of ``DocumentSearchIndex.build``); on a pool thread with nothing
+    in flight it runs ``fn`` inline so pool tasks never wait on queued work,
+  * ``after(future, key, fn)`` submits ``fn`` once ``future`` completes
+    (store sync after a build) without holding a pool thread while waiting;
+    a key already deferred or pending is not scheduled twice.
+
+``stats()`` reports queue depth, running and in-flight counts, joins and,
+per kind (the first element of the key), completed/failed counts with queue
+wait and run durations.
+
+Knob: ``DOCUMENT_INDEX_BUILD_WORKERS`` - pool size (default 4).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+_pool_thread = threading.local()
+
+
+class BuildCoordinator:
+    """One in-flight future per key on a bounded thread pool."""
+
+    def __init__(self, name: str, max_workers: int) -> None:
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[Hashable, Future] = {}
+        self._deferred: Set[Hashable] = set()
+        self._queued = 0
+        self._running = 0
+        self._submitted = 0
+        self._joined = 0
+        self._kinds: Dict[str, Dict[str, Any]] = {}
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    @staticmethod
+    def _kind(key: Hashable) -> str:
+        return str(key[0]) if isinstance(key, tuple) and key else str(key)
+
+    def _record(self, key: Hashable, ok: bool, waited: float, ran: float) -> None:
+        row = self._kinds.setdefault(self._kind(key), {
+            'completed': 0, 'failed': 0, 'runSeconds': 0.0, 'maxRunSeconds': 0.0,
+            'lastRunSeconds': None, 'queueSeconds': 0.0, 'maxQueueSeconds': 0.0,
+        })
+        row['completed' if ok else 'failed'] += 1
+        row['runSeconds'] += ran
+        row['maxRunSeconds'] = max(row['maxRunSeconds'], ran)
+        row['lastRunSeconds'] = round(ran, 4)
+        row['queueSeconds'] += waited
+        row['maxQueueSeconds'] = max(row['maxQueueSeconds'], waited)
+
+    def pending(self, key: Hashable) -> Optional[Future]:
+        """The queued or running future for ``key``, if any."""
+        with self._lock:
+            future = self._futures.get(key)
+            return future if future is not None and not future.done() else None
+
+    def submit(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Future, bool]:
+        """Queue ``fn`` for ``key``; returns ``(future, joined)`` where ``joined``
+        means an already pending future for ``key`` was returned instead."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not future.done():
+                self._joined += 1
+                return future, True
+            queued_at = time.monotonic()
+            self._queued += 1
+            self._submitted += 1
+
+            def _task() -> Any:
+                started = time.monotonic()
+                with self._lock:
+                    self._queued -= 1
+                    self._running += 1
+                _pool_thread.active = True
+                ok = False
+                try:
+                    result = fn()
+                    ok = True
+                    return result
+                finally:
+                    _pool_thread.active = False
+                    with self._lock:
+                        self._running -= 1
+                        if self._futures.get(key) is future:
+                            self._futures.pop(key, None)
+                        self._record(key, ok, started - queued_at, time.monotonic() - started)
+
+            future = self._executor().submit(_task)
+            self._futures[key] = future
+            return future, False
+
+    def run(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run ``fn`` for ``key`` (or join the pending run) and return its result."""
+        if getattr(_pool_thread, 'active', False):
+            future = self.pending(key)
+            if future is None:
+                return fn()
+            return future.result(timeout)
+        future, _ = self.submit(key, fn)
+        return future.result(timeout)
+
+    def after(self, future: Optional[Future], key: Hashable, fn: Callable[[], Any]) -> None:
+        """Submit ``fn`` for ``key`` when ``future`` is done (now if it is None or done)."""
+        with self._lock:
+            if key in self._deferred:
+                return
+            if future is not None and not future.done():
+                self._deferred.add(key)
+            else:
+                future = None
+        if future is None:
+            self.submit(key, fn)
+            return
+
+        def _release(_done: Future) -> None:
+            with self._lock:
+                self._deferred.discard(key)
+            self.submit(key, fn)
+
+        future.add_done_callback(_release)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds = {}
+            for kind, row in self._kinds.items():
+                done = row['completed'] + row['failed']
+                kinds[kind] = dict(
+                    row,
+                    avgRunSeconds=round(row['runSeconds'] / done, 4) if done else None,
+                    avgQueueSeconds=round(row['queueSeconds'] / done, 4) if done else None,
+                    runSeconds=round(row['runSeconds'], 4),
+                    maxRunSeconds=round(row['maxRunSeconds'], 4),
+                    queueSeconds=round(row['queueSeconds'], 4),
+                    maxQueueSeconds=round(row['maxQueueSeconds'], 4),
+                )
+            return {
+                'name': self.name,
+                'workers': self.max_workers,
+                'queueDepth': self._queued,
+                'running': self._running,
+                'inFlight': sum(1 for f in self._futures.values() if not f.done()),
+                'deferred': len(self._deferred),
+                'submitted': self._submitted,
+                'joined': self._joined,
+                'kinds': kinds,
+            }
+
+
+INDEX_BUILDS = BuildCoordinator(
+    'omar-docindex',
+    int(os.getenv('DOCUMENT_INDEX_BUILD_WORKERS', '4') or 4),
+)
+
+
+__all__ = ['BuildCoordinator', 'INDEX_BUILDS']
@@ -0,0 +1,277 @@
+"""Columnar per-patient lab store for trend queries.
+
+Lab quick rows (VPR plus ORWCV/ORWOR RPC rows from
+``PatientService.get_labs_quick``) are packed once into NumPy columns:
+
+    epoch    float64  observation time (UTC seconds, NaN when undated)
+    value    float64  numeric result (NaN when the result is not numeric)
+    flag     int8     FLAG_NONE / FLAG_LOW / FLAG_HIGH / FLAG_ABNORMAL
+    test_id  int32    index into ``tests`` (one group per normalized name)
+
+Rows are sorted by (test_id, epoch), so each test is a contiguous slice and a
+date range inside it is two ``searchsorted`` calls. min/max/last come from
+slices of the value column; nothing is re-parsed per request.
+
+Stores are kept as a view of the patient's snapshot and are rebuilt only
+when the gateway's lab domain generation changes. Gateways without
+generations (vista-api-x) build per request.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .patient_snapshot import domain_generation
+from .transforms import item_epochs
+
+FLAG_NONE = 0
+FLAG_LOW = 1
+FLAG_HIGH = 2
+FLAG_ABNORMAL = 3
+_FLAG_TEXT = (None, 'L', 'H', 'A')
+
+_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)')
+_RANGE_RE = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+))\s*-\s*([-+]?(?:\d+\.?\d*|\.\d+))\s*$')
+_DATE_FIELDS = ('observedDate', 'resulted', 'collected', 'date')
+
+
+def _name_key(name: str) -> str:
+    return ' '.join(''.join(ch.lower() if ch.isalnum() else ' ' for ch in name).split())
+
+
+def _numeric(result: Any) -> float:
+    if isinstance(result, (int, float)) and not isinstance(result, bool):
+        return float(result)
+    if result is None:
+        return np.nan
+    match = _NUMBER_RE.search(str(result))
+    return float(match.group(0)) if match else np.nan
+
+
+def _row_flag(row: Dict[str, Any], value: float) -> int:
+    flag = str(row.get('flag') or '').strip().upper()
+    if flag:
+        if flag.startswith('L'):
+            return FLAG_LOW
+        if flag.startswith('H'):
+            return FLAG_HIGH
+        return FLAG_ABNORMAL
+    if row.get('abnormal') is not True:
+        return FLAG_NONE
+    match = _RANGE_RE.match(str(row.get('referenceRange') or row.get('refRange') or ''))
+    if match and not np.isnan(value):
+        if value < float(match.group(1)):
+            return FLAG_LOW
+        if value > float(match.group(2)):
+            return FLAG_HIGH
+    return FLAG_ABNORMAL
+
+
+def _epoch_to_iso(epoch: float) -> str:
+    return dt.datetime.fromtimestamp(epoch, tz=dt.timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _none_if_nan(x: float) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
+
+
+class LabStore:
+    """Immutable columnar view of one patient's lab results."""
+
+    def __init__(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        generation: Optional[int] = None,
+        epochs: Optional[Sequence[Optional[float]]] = None,
+    ) -> None:
+        self.generation = generation
+        if not isinstance(rows, list):
+            rows = list(rows)
+        if epochs is None or len(epochs) != len(rows):
+            epochs = item_epochs(rows, _DATE_FIELDS)
+        test_index: Dict[str, int] = {}
+        by_label: Dict[str, int] = {}
+        names: List[str] = []
+        keys: List[str] = []
+        units: List[Optional[str]] = []
+        loincs: List[Set[str]] = []
+        epoch_col: List[float] = []
+        values: List[float] = []
+        flags: List[int] = []
+        test_ids: List[int] = []
+        results: List[Any] = []
+        for row, epoch in zip(rows, epochs):
+            if not isinstance(row, dict):
+                continue
+            label = row.get('test') or row.get('name') or row.get('display') or ''
+            tid = by_label.get(label)
+            if tid is None:
+                name = str(label).strip()
+                key = _name_key(name)
+                if not key:
+                    continue
+                tid = test_index.get(key)
+                if tid is None:
+                    tid = test_index[key] = len(names)
+                    names.append(name)
+                    keys.append(key)
+                    units.append(None)
+                    loincs.append(set())
+                by_label[label] = tid
+            unit = row.get('units') or row.get('unit')
+            if unit and not units[tid]:
+                units[tid] = str(unit)
+            code = str(row.get('loinc') or '').strip().lower()
+            if code:
+                loincs[tid].add(code)
+            value = _numeric(row.get('result'))
+            epoch_col.append(np.nan if epoch is None else epoch)
+            values.append(value)
+            flags.append(_row_flag(row, value))
+            test_ids.append(tid)
+            results.append(row.get('result'))
+
+        epoch_arr = np.asarray(epoch_col, dtype=np.float64)
+        tid_arr = np.asarray(test_ids, dtype=np.int32)
+        # lexsort: last key is primary; NaN epochs sort to the end of each test
+        order = np.lexsort((epoch_arr, tid_arr))
+        self.epoch = epoch_arr[order]
+        self.value = np.asarray(values, dtype=np.float64)[order]
+        self.flag = np.asarray(flags, dtype=np.int8)[order]
+        self.test_id = tid_arr[order]
+        self._results = [results[i] for i in order.tolist()]
+
+        self.tests = names
+        self._keys = keys
+        self._units = units
+        self._loincs = [sorted(c) for c in loincs]
+        n_tests = len(names)
+        self._offsets = np.searchsorted(self.test_id, np.arange(n_tests + 1, dtype=np.int32))
+        # End of the dated part of each slice (undated rows trail it)
+        dated = np.isfinite(self.epoch)
+        dated_counts = np.bincount(self.test_id[dated], minlength=n_tests) if n_tests else np.zeros(0, dtype=np.int64)
+        self._dated_end = self._offsets[:-1] + dated_counts
+        self._by_loinc: Dict[str, List[int]] = {}
+        for tid, codes in enumerate(self._loincs):
+            for code in codes:
+                self._by_loinc.setdefault(code, []).append(tid)
+
+    def __len__(self) -> int:
+        return int(self.epoch.shape[0])
+
+    def select_tests(
+        self,
+        loinc_codes: Optional[Sequence[str]] = None,
+        name_substrings: Optional[Iterable[str]] = None,
+    ) -> List[int]:
+        """Test ids matching any LOINC code or name substring; all when neither is given."""
+        codes = [str(c).strip().lower() for c in (loinc_codes or []) if str(c).strip()]
+        subs = [s for s in (name_substrings or []) if s]
+        if not codes and not subs:
+            return list(range(len(self.tests)))
+        picked: Set[int] = set()
+        for code in codes:
+            picked.update(self._by_loinc.get(code, ()))
+        if subs:
+            for tid, key in enumerate(self._keys):
+                if tid not in picked and any(s in key for s in subs):
+                    picked.add(tid)
+        return sorted(picked)
+
+    def _range(self, tid: int, start: Optional[float], end: Optional[float]) -> slice:
+        lo = int(self._offsets[tid])
+        hi = int(self._dated_end[tid])
+        if start is not None:
+            lo = lo + int(np.searchsorted(self.epoch[lo:hi], start, side='left'))
+        if end is not None:
+            hi = lo + int(np.searchsorted(self.epoch[lo:hi], end, side='right'))
+        return slice(lo, hi)
+
+    def trend(
+        self,
+        tid: int,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        *,
+        include_series: bool = True,
+    ) -> Dict[str, Any]:
+        """Aggregates (and optionally the numeric series) for one test in [start, end]."""
+        window = self._range(tid, start, end)
+        values = self.value[window]
+        numeric = ~np.isnan(values)
+        n_numeric = int(numeric.sum())
+        out: Dict[str, Any] = {
+            'test': self.tests[tid],
+            'loinc': self._loincs[tid],
+            'units': self._units[tid],
+            'count': int(values.shape[0]),
+            'numericCount': n_numeric,
+            'min': float(values[numeric].min()) if n_numeric else None,
+            'max': float(values[numeric].max()) if n_numeric else None,
+            'last': None,
+        }
+        if window.stop > window.start:
+            i = window.stop - 1
+            out['last'] = {
+                'date': _epoch_to_iso(float(self.epoch[i])),
+                'value': _none_if_nan(self.value[i]),
+                'result': self._results[i],
+                'flag': _FLAG_TEXT[int(self.flag[i])],
+            }
+        if include_series:
+            idx = np.flatnonzero(numeric) + window.start
+            out['series'] = {
+                't': self.epoch[idx].tolist(),
+                'v': self.value[idx].tolist(),
+                'flag': [_FLAG_TEXT[f] for f in self.flag[idx].tolist()],
+            }
+        return out
+
+    def query(
+        self,
+        *,
+        loinc_codes: Optional[Sequence[str]] = None,
+        name_substrings: Optional[Iterable[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        include_series: bool = True,
+    ) -> List[Dict[str, Any]]:
+        tests = [
+            self.trend(tid, start, end, include_series=include_series)
+            for tid in self.select_tests(loinc_codes, name_substrings)
+        ]
+        return [t for t in tests if t['count']]
+
+
+# --------------------- Snapshot view ---------------------
+
+def get_lab_store(svc: Any, dfn: str) -> LabStore:
+    """Return the lab store for ``dfn``, rebuilding it only on a new lab generation."""
+    from .loinc_index import LoincIndex
+
+    gateway = svc.gateway
+    dfn = str(dfn)
+
+    def _build() -> LabStore:
+        quick = svc.get_labs_quick(dfn)
+        quick = quick if isinstance(quick, list) else []
+        # annotate_labs copies rows in order, so the quick list's epochs still line up
+        epochs = item_epochs(quick, _DATE_FIELDS)
+        rows = LoincIndex.load().annotate_labs(quick)
+        # Read after the fetch: it refreshes the cache entry when it had expired
+        return LabStore(rows, generation=domain_generation(gateway, dfn, 'lab'), epochs=epochs)
+
+    return svc.snapshot_view(dfn, 'lab', 'lab-store', _build)
+
+
+__all__ = [
+    'FLAG_NONE',
+    'FLAG_LOW',
+    'FLAG_HIGH',
+    'FLAG_ABNORMAL',
+    'LabStore',
+    'get_lab_store',
+]
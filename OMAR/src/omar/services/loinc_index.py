@@ -6,9 +6,10 @@ from pathlib import Path
 
 try:
     # Optional: available when called in request context
-    from flask import current_app
+    from flask import current_app, has_app_context
 except Exception:  # pragma: no cover
     current_app = None  # type: ignore
+    has_app_context = None  # type: ignore
 
 
 class LoincIndex:
@@ -55,7 +56,8 @@ class LoincIndex:
     @classmethod
     def _default_csv_path(cls) -> str:
         # Prefer Flask static folder if available: <root>/static/lib/LOINC_table.csv
-        if current_app is not None:
+        # The proxy is never None; outside an app context it raises
+        if has_app_context is not None and has_app_context():
             folder = getattr(current_app, 'static_folder', None)
             if isinstance(folder, str) and folder:
                 return os.path.join(folder, 'lib', 'LOINC_table.csv')
@@ -1,7 +1,10 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from ..gateways.data_gateway import DataGateway, GatewayError
+from .patient_snapshot import DocumentIndex, DocumentOrder, PatientSnapshot, freeze_params, get_patient_snapshot
 from .transforms import (
+    _get_nested_items,
+    freeze_quick,
     map_vpr_patient_to_quick_demographics,
     vpr_to_quick_medications,
     vpr_to_quick_labs,
@@ -16,10 +19,16 @@ from .transforms import (
 )
 from .labs_rpc import rpc_panel_to_quick_tests
 
+
 class PatientService:
     def __init__(self, gateway: DataGateway):
         self.gateway = gateway
         self._vpr_cache: Dict[Tuple[str, str, Tuple[Tuple[str, str], ...]], Any] = {}
+        self._snapshots: Dict[str, PatientSnapshot] = {}
+        # Snapshot-backed reads made by this service (for ETags); any other
+        # gateway call makes the response unverifiable
+        self._reads: Dict[Tuple[str, str, Tuple[Tuple[str, str], ...]], Tuple[str, str, Optional[dict]]] = {}
+        self._untracked = False
         # Route-friendly to VPR domain mapping when names differ
         # Map friendly route names to VPR JSON domain tokens (singular per VPR 1.0 Guide)
         # Keep common plural aliases to avoid breaking callers.
@@ -79,39 +88,89 @@ class PatientService:
 
     def get_demographics(self, dfn: str) -> Dict[str, Any]:
         # In future: normalize to quick/ shape
+        self._untracked = True
         return self.gateway.get_demographics(dfn)
 
     # New: quick flattened demographics (direct VPR mapping)
     def _freeze_params(self, params: Optional[dict]) -> Tuple[Tuple[str, str], ...]:
-        if not params:
-            return ()
-        frozen: List[Tuple[str, str]] = []
-        for key, value in params.items():
-            if isinstance(value, (list, tuple, set)):
-                joined = ','.join(str(v) for v in value)
-                frozen.append((str(key), joined))
-            else:
-                frozen.append((str(key), str(value)))
-        frozen.sort(key=lambda kv: kv[0])
-        return tuple(frozen)
+        return freeze_params(params)
+
+    def snapshot(self, dfn: str) -> PatientSnapshot:
+        """The patient's chart snapshot (shared across requests on the socket gateway)."""
+        dfn = str(dfn)
+        snap = self._snapshots.get(dfn)
+        if snap is None:
+            snap = self._snapshots[dfn] = get_patient_snapshot(self.gateway, dfn)
+        return snap
+
+    def _track(self, dfn: str, dom: str, params: dict | None) -> None:
+        key = (str(dfn), str(dom), self._freeze_params(params))
+        if key not in self._reads:
+            self._reads[key] = (str(dfn), str(dom), dict(params) if params else None)
+
+    def tracked_reads(self) -> Optional[List[Tuple[str, str, Optional[dict]]]]:
+        """(dfn, domain, params) of every snapshot read so far, or None if the
+        service also called the gateway outside the snapshot (RPC lab panels,
+        document texts, ...), i.e. the result cannot be validated by generations.
+        """
+        if self._untracked:
+            return None
+        return list(self._reads.values())
+
+    def snapshot_view(
+        self,
+        dfn: str,
+        domain: str,
+        name: str,
+        build: Callable[[], Any],
+        params: dict | None = None,
+    ) -> Any:
+        """A derived index from the patient's snapshot (see ``PatientSnapshot.view``)."""
+        dom = self.domain_alias.get(domain, domain)
+        self._track(dfn, dom, params)
+        return self.snapshot(dfn).view(dom, name, build, params=params)
 
     def _get_vpr_cached(self, dfn: str, domain: str, params: dict | None = None):
         dom = self.domain_alias.get(domain, domain)
+        self._track(dfn, dom, params)
         cache_key = (str(dfn), str(dom), self._freeze_params(params))
         if cache_key in self._vpr_cache:
             return self._vpr_cache[cache_key]
-        payload = self.gateway.get_vpr_domain(dfn, domain=dom, params=params)
+        payload = self.snapshot(dfn).payload(
+            dom,
+            params,
+            lambda: self.gateway.get_vpr_domain(dfn, domain=dom, params=params),
+        )
         self._vpr_cache[cache_key] = payload
         return payload
 
+    def _quick(
+        self,
+        dfn: str,
+        domain: str,
+        transform: Callable[[Any], Any],
+        params: dict | None = None,
+    ) -> Any:
+        """Run ``transform`` over the domain payload, kept in the snapshot per payload generation.
+
+        The result is shared with every request for the patient, so it is
+        frozen (see ``freeze_quick``); views copy an item with ``dict(item)``
+        before editing it.
+        """
+        dom = self.domain_alias.get(domain, domain)
+        self._track(dfn, dom, params)
+
+        def _build() -> Any:
+            return freeze_quick(transform(self._get_vpr_cached(dfn, domain=dom, params=params)))
+
+        return self.snapshot(dfn).quick(dom, params, transform, _build)
+
     def get_demographics_quick(self, dfn: str) -> Dict[str, Any]:
-        vpr = self._get_vpr_cached(dfn, domain='patient')
-        return map_vpr_patient_to_quick_demographics(vpr)
+        return self._quick(dfn, 'patient', map_vpr_patient_to_quick_demographics)
 
     # --- Medications ---
     def get_medications_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['meds'], params=params)
-        return vpr_to_quick_medications(vpr)
+        return self._quick(dfn, 'meds', vpr_to_quick_medications, params)
 
     # --- Labs ---
     def get_labs_quick(
@@ -121,8 +180,7 @@ class PatientService:
         *,
         filters: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['labs'], params=params)
-        quick_vpr = vpr_to_quick_labs(vpr)
+        quick_vpr = self._quick(dfn, 'labs', vpr_to_quick_labs, params)
 
         start_iso = None
         end_iso = None
@@ -146,6 +204,7 @@ class PatientService:
         panels: List[Dict[str, Any]] = []
         rpc_rows: List[Dict[str, Any]] = []
         panel_ids_with_detail: set[str] = set()
+        self._untracked = True
         try:
             panels = self.gateway.get_lab_panels(dfn, start=start_iso, end=end_iso, max_panels=max_panels)
         except GatewayError:
@@ -199,55 +258,90 @@ class PatientService:
 
     # --- Vitals ---
     def get_vitals_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['vitals'], params=params)
-        return vpr_to_quick_vitals(vpr)
+        return self._quick(dfn, 'vitals', vpr_to_quick_vitals, params)
 
     # --- Notes ---
     def get_notes_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['notes'], params=params)
-        return vpr_to_quick_notes(vpr)
+        return self._quick(dfn, 'notes', vpr_to_quick_notes, params)
 
     # --- Documents (unified) ---
     def get_documents_quick(self, dfn: str, params: dict | None = None):
         """Unified documents quick list from VPR 'documents' domain.
         Uses the document-centric notes transform.
         """
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['document'], params=params)
-        return vpr_to_quick_notes(vpr)
+        return self._quick(dfn, 'document', vpr_to_quick_notes, params)
+
+    def get_document_index(self, dfn: str, params: dict | None = None) -> DocumentIndex:
+        """Class/type index over ``get_documents_quick(dfn, params)`` positions."""
+        def _build() -> DocumentIndex:
+            quick = self.get_documents_quick(dfn, params=params)
+            vpr = self._get_vpr_cached(dfn, 'document', params=params)
+            return DocumentIndex(quick if isinstance(quick, list) else [], _get_nested_items(vpr))
+
+        return self.snapshot_view(dfn, 'document', 'document-index', _build, params=params)
+
+    def get_document_order(self, dfn: str, params: dict | None = None) -> DocumentOrder:
+        """Keyset (date, uid) order over ``get_documents_quick(dfn, params)`` positions."""
+        def _build() -> DocumentOrder:
+            quick = self.get_documents_quick(dfn, params=params)
+            vpr = self._get_vpr_cached(dfn, 'document', params=params)
+            return DocumentOrder(quick if isinstance(quick, list) else [], _get_nested_items(vpr))
+
+        return self.snapshot_view(dfn, 'document', 'document-order', _build, params=params)
+
+    def documents_cached(self, dfn: str, params: dict | None = None) -> bool:
+        """True when the gateway holds a live document payload for ``params``."""
+        return self.snapshot(dfn).generation('document', params) is not None
+
+    def get_documents_window(
+        self,
+        dfn: str,
+        max_items: int,
+        stop: str | None = None,
+    ) -> Tuple[List[Any], List[Any], bool]:
+        """The newest ``max_items`` documents up to ``stop`` (FileMan, inclusive).
+
+        VPR applies ``stop``/``max`` itself, so a first page (or a cursor into
+        a cold chart) costs one small fetch instead of the whole domain.
+        Returns the quick list, the matching raw items and whether VPR may
+        have cut the window short (it returned ``max_items`` documents).
+        """
+        params: Dict[str, Any] = {'max': str(int(max_items))}
+        if stop:
+            params['stop'] = stop
+        quick = self.get_documents_quick(dfn, params=params)
+        raw = _get_nested_items(self._get_vpr_cached(dfn, 'document', params=params))
+        quick = quick if isinstance(quick, list) else []
+        return quick, raw, len(raw) >= max_items
 
     def get_document_texts(self, dfn: str, doc_ids: list[str]) -> Dict[str, list[str]]:
         """Fetch full text for the requested TIU document identifiers."""
+        self._untracked = True
         return self.gateway.get_document_texts(dfn, doc_ids)
 
     # --- Radiology ---
     def get_radiology_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['radiology'], params=params)
-        return vpr_to_quick_radiology(vpr)
+        return self._quick(dfn, 'radiology', vpr_to_quick_radiology, params)
 
     # --- Procedures ---
     def get_procedures_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['procedures'], params=params)
-        return vpr_to_quick_procedures(vpr)
+        return self._quick(dfn, 'procedures', vpr_to_quick_procedures, params)
 
     # --- Encounters ---
     def get_encounters_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['encounters'], params=params)
-        return vpr_to_quick_encounters(vpr)
+        return self._quick(dfn, 'encounters', vpr_to_quick_encounters, params)
 
     # --- Problems ---
     def get_problems_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['problems'], params=params)
-        return vpr_to_quick_problems(vpr)
+        return self._quick(dfn, 'problems', vpr_to_quick_problems, params)
 
     # --- Allergies ---
     def get_allergies_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['allergies'], params=params)
-        return vpr_to_quick_allergies(vpr)
+        return self._quick(dfn, 'allergies', vpr_to_quick_allergies, params)
 
     # --- Orders ---
     def get_orders_quick(self, dfn: str, params: dict | None = None):
-        vpr = self._get_vpr_cached(dfn, domain=self.domain_alias['orders'], params=params)
-        return vpr_to_quick_orders(vpr)
+        return self._quick(dfn, 'orders', vpr_to_quick_orders, params)
 
     # Raw VPR passthrough
     def get_vpr_raw(self, dfn: str, domain: str, params: dict | None = None):
@@ -256,4 +350,24 @@ class PatientService:
 
     # Full chart (no domain filter)
     def get_fullchart(self, dfn: str):
+        self._untracked = True
         return self.gateway.get_vpr_fullchart(dfn)
+
+    def iter_fullchart(self, dfn: str) -> Iterator[Tuple[Optional[str], List[Any]]]:
+        """Full chart items as (domain, items) chunks, for streaming.
+
+        Gateways that assemble the chart per domain (``fullchart_domains``)
+        are read one domain at a time through the snapshot, so the first
+        chunk is ready after one fetch. Others yield a single chunk from
+        ``get_fullchart`` with domain None.
+        """
+        domains = getattr(self.gateway, 'fullchart_domains', None)
+        if not domains:
+            yield None, _get_nested_items(self.get_fullchart(dfn))
+            return
+        for dom in domains:
+            try:
+                part = self._get_vpr_cached(dfn, dom)
+            except Exception:
+                continue
+            yield dom, _get_nested_items(part)
@@ -0,0 +1,358 @@
+"""Per-patient materialized chart state shared across requests.
+
+A ``PatientSnapshot`` holds, for one gateway session and DFN:
+
+  * fetched VPR domain payloads, per (domain, params),
+  * the quick view of each payload, per transform,
+  * derived indexes (document class/type index, columnar lab store,
+    vitals series, ...), per name.
+
+Each entry carries the gateway generation of the payload it came from
+(``domain_generation(dfn, domain, params)`` on the socket gateway) and is
+reused while that generation is unchanged. A refetch, cache expiry or
+``clear_patient_cache`` changes or drops the generation, so the entry is
+rebuilt on next access; ``invalidate_patient`` does both at once.
+
+Gateways without generations (vista-api-x, created per request) get an
+unregistered snapshot that lives as long as the ``PatientService`` using it,
+i.e. one request. On the socket gateway, snapshots are kept per gateway in a
+WeakKeyDictionary (they go away with the session) with an LRU over patients.
+
+Stored payloads and quick views are shared; readers get copies.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+import weakref
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Callable, Collection, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..gateways.lazy_items import copy_payload
+from ..gateways.single_flight import SingleFlight
+
+_MAX_PATIENTS = max(1, int(os.getenv('PATIENT_SNAPSHOT_MAX_PATIENTS', '4') or 4))
+_MAX_VALIDATORS = 256
+
+
+def domain_generation(
+    gateway: Any,
+    dfn: str,
+    domain: str,
+    params: Optional[Dict[str, Any]] = None,
+) -> Optional[int]:
+    """Current generation of the gateway's cached payload, or None."""
+    fn = getattr(gateway, 'domain_generation', None)
+    if not callable(fn):
+        return None
+    try:
+        return fn(dfn, domain, params)
+    except Exception:
+        return None
+
+
+def freeze_params(params: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, str], ...]:
+    """Hashable, order-independent form of a VPR params dict."""
+    if not params:
+        return ()
+    frozen: List[Tuple[str, str]] = []
+    for key, value in params.items():
+        if isinstance(value, (list, tuple, set)):
+            frozen.append((str(key), ','.join(str(v) for v in value)))
+        else:
+            frozen.append((str(key), str(value)))
+    frozen.sort(key=lambda kv: kv[0])
+    return tuple(frozen)
+
+
+class DocumentIndex:
+    """Positions of quick documents by lower-cased class and type.
+
+    Built once per document payload; ``select`` replaces the per-request scan
+    the documents endpoints used to do for ``class``/``type`` filters. A
+    document matches a type by its quick ``documentType`` or the raw
+    ``documentTypeName``/``documentTypeCode``.
+    """
+
+    __slots__ = ('count', 'by_class', 'by_type')
+
+    def __init__(self, quick_items: List[Any], raw_items: List[Any]) -> None:
+        self.count = len(quick_items)
+        self.by_class: Dict[str, List[int]] = {}
+        self.by_type: Dict[str, List[int]] = {}
+        for idx, q in enumerate(quick_items):
+            if not isinstance(q, dict):
+                continue
+            r = raw_items[idx] if idx < len(raw_items) else None
+            r = r if isinstance(r, dict) else {}
+            cls = str(q.get('documentClass') or r.get('documentClass') or '').strip().lower()
+            self.by_class.setdefault(cls, []).append(idx)
+            keys = {
+                str(v).lower()
+                for v in (q.get('documentType'), r.get('documentTypeName'), r.get('documentTypeCode'))
+                if v
+            }
+            for key in keys:
+                self.by_type.setdefault(key, []).append(idx)
+
+    def select(self, classes: Iterable[str] = (), types: Iterable[str] = ()) -> Optional[List[int]]:
+        """Ascending positions matching every given filter; None when there are no filters."""
+        picked: Optional[set] = None
+        for table, wanted in ((self.by_class, classes), (self.by_type, types)):
+            wanted = [w for w in wanted if w]
+            if not wanted:
+                continue
+            hits = set()
+            for key in wanted:
+                hits.update(table.get(key, ()))
+            picked = hits if picked is None else (picked & hits)
+        return None if picked is None else sorted(picked)
+
+
+class DocumentOrder:
+    """Quick document positions in keyset order: (date, uid) ascending.
+
+    Newest-first pages walk it backwards; a ``(date, uid)`` cursor resumes
+    with one bisect instead of re-sorting and slicing the whole list. The
+    uid comes from the raw item (quick documents may not carry one) and
+    breaks ties between notes with the same date.
+    """
+
+    __slots__ = ('keys', 'positions')
+
+    def __init__(self, quick_items: List[Any], raw_items: List[Any]) -> None:
+        rows: List[Tuple[Tuple[str, str], int]] = []
+        for idx, q in enumerate(quick_items):
+            if not isinstance(q, dict):
+                continue
+            r = raw_items[idx] if idx < len(raw_items) else None
+            uid = (r.get('uid') if isinstance(r, dict) else None) or q.get('uid') or ''
+            rows.append(((str(q.get('date') or ''), str(uid)), idx))
+        rows.sort()
+        self.keys: List[Tuple[str, str]] = [key for key, _ in rows]
+        self.positions: List[int] = [idx for _, idx in rows]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def page(
+        self,
+        limit: int,
+        cursor: Optional[Tuple[str, str]] = None,
+        offset: int = 0,
+        allowed: Optional[Collection[int]] = None,
+    ) -> Tuple[List[int], Optional[Tuple[str, str]]]:
+        """Up to ``limit`` positions newest-first, after ``cursor`` and ``offset`` matches.
+
+        Only positions in ``allowed`` count when it is given. Returns the
+        positions and the key to resume from, or None when nothing is left.
+        """
+        i = (len(self.keys) if cursor is None else bisect_left(self.keys, tuple(cursor))) - 1
+        out: List[int] = []
+        last = -1
+        while i >= 0:
+            pos = self.positions[i]
+            if allowed is None or pos in allowed:
+                if offset > 0:
+                    offset -= 1
+                elif len(out) < limit:
+                    out.append(pos)
+                    last = i
+                else:
+                    return out, self.keys[last]
+            i -= 1
+        return out, None
+
+
+class PatientSnapshot:
+    """Generation-validated payloads, quick views and derived indexes for one DFN."""
+
+    def __init__(self, gateway: Any, dfn: str) -> None:
+        self.gateway = gateway
+        self.dfn = str(dfn)
+        # Without generations an entry cannot be validated; it is kept only
+        # because such a snapshot is never shared beyond one PatientService.
+        self.tracks_generations = callable(getattr(gateway, 'domain_generation', None))
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[str, Optional[int], Any]] = {}
+        self._flight = SingleFlight(name=f'snapshot:{self.dfn}')
+        # Distinguishes this snapshot's generations from any earlier one (ETags)
+        self.token = uuid.uuid4().hex
+        self._validators: 'OrderedDict[Hashable, Tuple[str, List[Tuple[str, str, Optional[Dict[str, Any]]]]]]' = OrderedDict()
+        self._hits = 0
+        self._builds = 0
+
+    def generation(self, domain: str, params: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        return domain_generation(self.gateway, self.dfn, domain, params)
+
+    def _valid(self, generation: Optional[int]) -> bool:
+        return generation is not None or not self.tracks_generations
+
+    def _get(
+        self,
+        key: Hashable,
+        domain: str,
+        params: Optional[Dict[str, Any]],
+        build: Callable[[], Any],
+    ) -> Any:
+        generation = self.generation(domain, params)
+        if self._valid(generation):
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] == generation:
+                    self._hits += 1
+                    return entry[2]
+
+        def _build() -> Any:
+            value = build()
+            # Read after the build: it normally fetched (or refreshed) the payload
+            built = self.generation(domain, params)
+            with self._lock:
+                self._builds += 1
+                if self._valid(built):
+                    self._entries[key] = (domain, built, value)
+                else:
+                    self._entries.pop(key, None)
+            return value
+
+        value, _shared = self._flight.do(key, _build)
+        return value
+
+    def payload(self, domain: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+        """A private copy of the domain payload, fetched only when the held one is stale."""
+        held = self._get(('payload', domain, freeze_params(params)), domain, params, fetch)
+        return copy_payload(held)
+
+    def quick(
+        self,
+        domain: str,
+        params: Optional[Dict[str, Any]],
+        transform: Callable[[Any], Any],
+        build: Callable[[], Any],
+    ) -> Any:
+        """The shared quick view of the payload under ``transform``; callers must not mutate it."""
+        key = ('quick', domain, freeze_params(params), transform.__name__)
+        return self._get(key, domain, params, build)
+
+    def view(
+        self,
+        domain: str,
+        name: str,
+        build: Callable[[], Any],
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """A shared derived index over the ``domain`` payload, rebuilt on a new generation."""
+        return self._get(('view', name, domain, freeze_params(params)), domain, params, build)
+
+    def remember_validator(self, key: Hashable, etag: str, reads: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+        """Keep the ETag of a response and the (dfn, domain, params) reads it was built from."""
+        with self._lock:
+            self._validators[key] = (etag, list(reads))
+            self._validators.move_to_end(key)
+            while len(self._validators) > _MAX_VALIDATORS:
+                self._validators.popitem(last=False)
+
+    def validator(self, key: Hashable) -> Optional[Tuple[str, List[Tuple[str, str, Optional[Dict[str, Any]]]]]]:
+        with self._lock:
+            return self._validators.get(key)
+
+    def generations(self) -> Dict[str, Optional[int]]:
+        """Generation of every domain currently held (None when unknown)."""
+        with self._lock:
+            return {domain: generation for domain, generation, _ in self._entries.values()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._validators.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds: Dict[str, int] = {}
+            for key in self._entries:
+                kinds[key[0]] = kinds.get(key[0], 0) + 1
+            return {'entries': kinds, 'hits': self._hits, 'builds': self._builds}
+
+
+# --------------------- Per-gateway registry ---------------------
+
+_REGISTRY_LOCK = threading.Lock()
+_SNAPSHOTS: 'weakref.WeakKeyDictionary[Any, OrderedDict[str, PatientSnapshot]]' = weakref.WeakKeyDictionary()
+
+
+def get_patient_snapshot(gateway: Any, dfn: str) -> PatientSnapshot:
+    """Shared snapshot for (gateway, dfn); a private one when the gateway has no generations."""
+    dfn = str(dfn)
+    if not callable(getattr(gateway, 'domain_generation', None)):
+        return PatientSnapshot(gateway, dfn)
+    with _REGISTRY_LOCK:
+        try:
+            patients = _SNAPSHOTS.setdefault(gateway, OrderedDict())
+        except TypeError:
+            return PatientSnapshot(gateway, dfn)
+        snap = patients.get(dfn)
+        if snap is None:
+            snap = patients[dfn] = PatientSnapshot(gateway, dfn)
+        patients.move_to_end(dfn)
+        while len(patients) > _MAX_PATIENTS:
+            patients.popitem(last=False)
+        return snap
+
+
+def clear_patient_snapshots(gateway: Any = None, dfn: Optional[str] = None) -> None:
+    """Drop snapshots for one gateway (optionally one DFN), or all of them."""
+    with _REGISTRY_LOCK:
+        if gateway is None:
+            _SNAPSHOTS.clear()
+            return
+        try:
+            patients = _SNAPSHOTS.get(gateway)
+        except TypeError:
+            return
+        if not patients:
+            return
+        if dfn is None:
+            patients.clear()
+        else:
+            patients.pop(str(dfn), None)
+
+
+def invalidate_patient(gateway: Any, dfn: Optional[str] = None) -> None:
+    """Clear the gateway's domain cache and the snapshots built on it."""
+    clear_fn = getattr(gateway, 'clear_patient_cache', None)
+    if callable(clear_fn):
+        clear_fn(dfn)
+    clear_patient_snapshots(gateway, dfn)
+
+
+def patient_snapshot_stats() -> Dict[str, Any]:
+    """Totals over every resident snapshot in this worker.
+
+    Only counts: snapshots of all sessions are pooled here, so which patients
+    are open is not reported.
+    """
+    with _REGISTRY_LOCK:
+        snaps = [snap for patients in _SNAPSHOTS.values() for snap in patients.values()]
+    totals: Dict[str, Any] = {'patients': len(snaps), 'entries': {}, 'hits': 0, 'builds': 0}
+    for snap in snaps:
+        row = snap.stats()
+        for kind, count in row['entries'].items():
+            totals['entries'][kind] = totals['entries'].get(kind, 0) + count
+        totals['hits'] += row['hits']
+        totals['builds'] += row['builds']
+    return totals
+
+
+__all__ = [
+    'DocumentIndex',
+    'DocumentOrder',
+    'PatientSnapshot',
+    'clear_patient_snapshots',
+    'domain_generation',
+    'freeze_params',
+    'get_patient_snapshot',
+    'invalidate_patient',
+    'patient_snapshot_stats',
+]
@@ -0,0 +1,1133 @@
+"""Quick views: the JSON bodies behind ``/api/patient/<dfn>/quick/<domain>``.
+
+Each view takes a ``PatientService``, the DFN and the query args (any mapping
+with ``get``, normally the request's ``MultiDict``) and returns the body the
+endpoint serializes. The single-domain endpoints and ``/quick/bundle`` both
+call them, so nothing here reads the Flask request or session.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+from . import transforms as T
+from .document_search_service import get_or_build_index_for_dfn
+from .loinc_index import LoincIndex
+from .patient_service import PatientService
+
+# Per-domain allowlists for pass-through filters
+ALLOWED_PARAMS: Dict[str, Tuple[str, ...]] = {
+    'meds': ('start','stop','max','id','uid','vaType','raw'),
+    'labs': ('start','stop','max','id','uid','category','nowrap','raw'),
+    'vitals': ('start','stop','max','id','uid','raw'),
+    'documents': ('start','stop','max','id','uid','status','category','text','nowrap','raw'),
+    'radiology': ('start','stop','max','id','uid','raw'),
+    'procedures': ('start','stop','max','id','uid','raw'),
+    'encounters': ('start','stop','max','id','uid','raw'),
+    'problems': ('max','id','uid','status','raw'),
+    'allergies': ('start','stop','max','id','uid','raw'),
+    # Additional VPR domains
+    'appointment': ('start','stop','max','id','uid','raw'),
+    'order': ('start','stop','max','id','uid','raw'),
+    'consult': ('start','stop','max','id','uid','nowrap','raw'),
+    'immunization': ('start','stop','max','id','uid','raw'),
+    'cpt': ('start','stop','max','id','uid','raw'),
+    'exam': ('start','stop','max','id','uid','raw'),
+    'education': ('start','stop','max','id','uid','raw'),
+    'factor': ('start','stop','max','id','uid','raw'),
+    'pov': ('start','stop','max','id','uid','raw'),
+    'skin': ('start','stop','max','id','uid','raw'),
+    'obs': ('start','stop','max','id','uid','raw'),
+    'ptf': ('start','stop','max','id','uid','raw'),
+    'surgery': ('start','stop','max','id','uid','raw'),
+    'image': ('start','stop','max','id','uid','raw'),
+}
+
+
+def wants_raw(args: Mapping[str, Any]) -> bool:
+    try:
+        return str(args.get('raw', '')).strip().lower() in ('1','true','yes','on')
+    except Exception:
+        return False
+
+
+def with_raw(payload: Any, vpr_payload: Any, args: Mapping[str, Any], *, list_label: Optional[str] = None) -> Any:
+    """``payload``, plus the raw VPR text under ``raw`` when raw=1 was asked for."""
+    if not wants_raw(args):
+        return payload
+    raw_text = None
+    if isinstance(vpr_payload, dict):
+        raw_text = vpr_payload.get('raw')
+    if isinstance(payload, dict):
+        body = dict(payload)
+        body['raw'] = raw_text
+        return body
+    key = list_label or 'result'
+    return {key: payload, 'raw': raw_text}
+
+
+def collect_params(args: Mapping[str, Any], *keys: str) -> Dict[str, Any]:
+    """Collect allowed params and normalize dates.
+    - Converts start/stop to FileMan when provided.
+    - Supports relative range via last=14d|2w|6m|1y when start/stop absent; emits start/stop.
+    """
+    out: dict = {}
+    provided_keys = set(keys)
+    for k in keys:
+        v = args.get(k)
+        if v is None:
+            continue
+        s = str(v).strip()
+        if s == '':
+            continue
+        if k in ('start','stop'):
+            fm = T.to_fileman_datetime(s)
+            out[k] = fm or s
+        else:
+            out[k] = s
+    # Relative date convenience: only if endpoint accepts start/stop and not already provided
+    if ('start' in provided_keys or 'stop' in provided_keys) and ('start' not in out and 'stop' not in out):
+        last = args.get('last')
+        if last:
+            rng = T.parse_relative_last_to_iso_range(last)  # type: ignore
+            if rng:
+                s_iso, e_iso = rng
+                s_fm = T.to_fileman_datetime(s_iso)
+                e_fm = T.to_fileman_datetime(e_iso)
+                if s_fm:
+                    out['start'] = s_fm
+                if e_fm:
+                    out['stop'] = e_fm
+    return out
+
+
+_STATUS_COMPLETED_PATTERNS = ('complete', 'comp', 'result', 'done', 'finish', 'final')
+_STATUS_DISCONTINUED_PATTERNS = ('discont', 'cancel', 'void', 'stop', 'expire', 'lapse')
+_STATUS_PENDING_PATTERNS = ('pend', 'hold', 'draft', 'unsigned', 'in process', 'inprocess', 'in-progress', 'require', 'pre-release', 'prerelease', 'new')
+_STATUS_ACTIVE_PATTERNS = ('active', 'current', 'released', 'processing', 'in effect', 'in-effect', 'inforce', 'in force')
+
+
+def _orders_status_alias(value: str | None) -> str:
+    v = str(value or '').strip().lower()
+    if v in ('active', 'a'):
+        return 'active'
+    if v in ('pending', 'pend', 'p', 'hold', 'unsigned', 'draft'):
+        return 'pending'
+    if v in ('completed', 'complete', 'comp', 'finished', 'done', 'resulted', 'final'):
+        return 'completed'
+    if v in ('discontinued', 'cancelled', 'canceled', 'dc', 'void', 'stopped', 'expired', 'exp', 'lapsed', 'cancel'):
+        return 'discontinued'
+    if v in ('current', 'actpend', 'active+pending', 'ap', 'cur', 'c'):
+        return 'current'
+    if v in ('all', '*', 'any'):
+        return 'all'
+    return 'current'
+
+
+def _orders_type_alias(value: str | None) -> str:
+    v = str(value or '').strip().lower()
+    if v in ('med', 'meds', 'medication', 'medications', 'pharmacy', 'rx', 'drug', 'drugs'):
+        return 'meds'
+    if v in ('lab', 'labs', 'laboratory', 'chemistry', 'microbiology', 'pathology'):
+        return 'labs'
+    if v in ('imaging', 'image', 'radiology', 'rad', 'ct', 'mri', 'xray', 'x-ray', 'ultrasound', 'nuclear', 'pet'):
+        return 'imaging'
+    if v in ('consult', 'consults', 'referral', 'gmrc'):
+        return 'consults'
+    if v in ('nursing', 'nurse', 'nurs'):
+        return 'nursing'
+    if v in ('schedule', 'scheduling', 'appointment', 'appointments', 'appt', 'appts'):
+        return 'scheduling'
+    if v in ('other', 'misc', 'unknown'):
+        return 'other'
+    if v in ('all', '*', 'any'):
+        return 'all'
+    return 'all'
+
+
+# ----------------- Enrichment from raw VPR items -----------------
+
+def extract_full_text(raw_item: dict) -> str | None:
+    try:
+        # Common patterns across documents/radiology/procedures
+        # 1) text: [ { content: "..." }, ... ]
+        txt = raw_item.get('text')
+        if isinstance(txt, list) and txt:
+            pieces = []
+            for block in txt:
+                if isinstance(block, dict):
+                    c = block.get('content') or block.get('text') or block.get('summary')
+                    if isinstance(c, str) and c.strip():
+                        pieces.append(c)
+                elif isinstance(block, str) and block.strip():
+                    pieces.append(block)
+            if pieces:
+                return "\n".join(pieces)
+        # 2) report/impression (radiology)
+        rpt = raw_item.get('report') or raw_item.get('impression')
+        if isinstance(rpt, str) and rpt.strip():
+            return rpt
+        # 3) body/content/documentText
+        for k in ('body','content','documentText','noteText','clinicalText','details'):
+            v = raw_item.get(k)
+            if isinstance(v, str) and v.strip():
+                return v
+        # 4) nested content
+        doc = raw_item.get('document')
+        if isinstance(doc, dict):
+            for k in ('content','text','body'):
+                v = doc.get(k)
+                if isinstance(v, str) and v.strip():
+                    return v
+    except Exception:
+        pass
+    return None
+
+
+def extract_encounter_info(raw_item: dict) -> dict | None:
+    try:
+        enc = None
+        # VPR shapes: 'visit' or 'encounter' or 'appointment'
+        if isinstance(raw_item.get('visit'), dict):
+            enc = raw_item.get('visit')
+        elif isinstance(raw_item.get('encounter'), dict):
+            enc = raw_item.get('encounter')
+        elif isinstance(raw_item.get('appointment'), dict):
+            enc = raw_item.get('appointment')
+        out = {}
+        # visit/encounter identifiers
+        uid = None
+        if isinstance(enc, dict):
+            uid = enc.get('uid') or enc.get('visitUid')
+        if not uid:
+            uid = raw_item.get('encounterUid') or raw_item.get('visitUid') or raw_item.get('uid')
+        if uid:
+            out['visitUid'] = uid
+        # date/time
+        date_val = None
+        for k in ('dateTime','referenceDateTime','start','time'):
+            if isinstance(enc, dict) and enc.get(k):
+                date_val = enc.get(k)
+                break
+        if not date_val:
+            date_val = raw_item.get('dateTime') or raw_item.get('referenceDateTime') or raw_item.get('observed')
+        dt_iso = T._parse_any_datetime_to_iso(date_val)  # type: ignore
+        if dt_iso:
+            out['date'] = dt_iso
+        # location
+        loc_name = None
+        try:
+            if isinstance(raw_item.get('location'), dict):
+                loc_name = raw_item['location'].get('name') or raw_item['location'].get('displayName')
+        except Exception:
+            pass
+        if not loc_name:
+            for k in ('locationName','clinicName','clinic','wardName'):
+                v = raw_item.get(k)
+                if isinstance(v, str) and v.strip():
+                    loc_name = v
+                    break
+        if loc_name:
+            out['location'] = loc_name
+        # human-readable encounter name when present
+        ename = raw_item.get('encounterName')
+        if isinstance(ename, str) and ename.strip():
+            out['encounterName'] = ename
+        return out or None
+    except Exception:
+        return None
+
+
+def is_problem_active(status_val: str | None) -> bool | None:
+    if not status_val:
+        return None
+    s = status_val.strip().lower()
+    # Treat resolved/inactive/historical as inactive
+    if 'inactive' in s or 'resolved' in s or 'historical' in s or 'entered in error' in s:
+        return False
+    if 'active' in s and 'inactive' not in s:
+        return True
+    return None
+
+
+def extract_problem_comments(raw_item: dict) -> list[dict] | None:
+    try:
+        comments = raw_item.get('comments')
+        out = []
+        if isinstance(comments, list):
+            for c in comments:
+                if not isinstance(c, dict):
+                    continue
+                txt = c.get('comment') or c.get('text')
+                when = c.get('entered') or c.get('date') or c.get('enteredDateTime')
+                who = c.get('enteredBy') or c.get('author') or c.get('authorDisplayName')
+                if txt:
+                    out.append({
+                        'text': txt,
+                        'date': T._parse_any_datetime_to_iso(when),  # type: ignore
+                        'author': who
+                    })
+        return out or None
+    except Exception:
+        return None
+
+
+# ----------------- Views -----------------
+
+def demographics(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'patient', params=raw_params)
+    quick = svc.get_demographics_quick(dfn)
+    if (args.get('includeRaw', '0').lower() in ('1', 'true', 'yes', 'on')):
+        # Attach first raw item for traceability
+        item = None
+        try:
+            arr = T._get_nested_items(vpr)  # type: ignore
+            item = arr[0] if arr else None
+        except Exception:
+            item = None
+        if isinstance(quick, dict):
+            quick = dict(quick)
+            quick['_raw'] = item
+    return with_raw(quick, vpr, args)
+
+
+def medications(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'meds', params=raw_params)
+    quick = svc.get_medications_quick(dfn, params=raw_params)
+
+    # Optional filtering: status, days/start/end, name
+    status_raw = (args.get('status') or 'ALL').strip().upper()
+    # Normalize status filter to a set of allowed quick statuses
+    status_map = {
+        'ACTIVE': {'active'},
+        'PENDING': {'pending'},
+        'ACTIVE+PENDING': {'active', 'pending', 'new', 'hold'},
+        'CURRENT': {'active', 'pending'},
+        'ALL': None,
+    }
+    allowed_status = status_map.get(status_raw, None)
+
+    # Date range: support days (relative), start, end in common formats
+    from datetime import datetime, timezone, timedelta
+    def _to_iso(x):
+        try:
+            return T._parse_any_datetime_to_iso(x)  # type: ignore
+        except Exception:
+            return None
+    now = datetime.now(timezone.utc)
+    start_iso = None
+    end_iso = None
+    days = None
+    try:
+        d = args.get('days')
+        if d is not None:
+            di = int(str(d).strip() or '0')
+            if di and di > 0:
+                days = di
+    except Exception:
+        days = None
+    if days:
+        start_iso = (now - timedelta(days=days)).isoformat().replace('+00:00','Z')
+        end_iso = now.isoformat().replace('+00:00','Z')
+    s_arg = args.get('start')
+    e_arg = args.get('end')
+    if s_arg:
+        s_parsed = _to_iso(s_arg)
+        if s_parsed:
+            start_iso = s_parsed
+    if e_arg:
+        e_parsed = _to_iso(e_arg)
+        if e_parsed:
+            end_iso = e_parsed
+
+    name_filter = (args.get('name') or '').strip().lower()
+
+    start_epoch = T.datetime_to_epoch(start_iso) if start_iso else None
+    end_epoch = T.datetime_to_epoch(end_iso) if end_iso else None
+
+    def _status_ok(item):
+        if not allowed_status:
+            return True
+        s = (item.get('status') or '').strip().lower()
+        return s in allowed_status
+
+    def _name_ok(item):
+        if not name_filter:
+            return True
+        n = (item.get('name') or '').strip().lower()
+        return name_filter in n
+
+    # Apply filters when requested; the date range is a binary search over
+    # the canonical timestamps stamped by the transform (endDate, else startDate)
+    if isinstance(quick, list):
+        dated = T.select_date_range(quick, start_epoch, end_epoch, fallback_fields=('endDate', 'startDate'))
+        filtered = [q for q in dated if _status_ok(q) and _name_ok(q)]
+    else:
+        filtered = quick
+
+    include_raw_requested = args.get('includeRaw','0').lower() in ('1','true','yes','on')
+    if include_raw_requested and isinstance(filtered, list):
+        # Best effort: only attach _raw when no filters applied to preserve index alignment
+        filters_applied = (allowed_status is not None) or bool(days) or bool(start_iso) or bool(end_iso) or bool(name_filter)
+        if not filters_applied:
+            raw_items = []
+            try:
+                raw_items = T._get_nested_items(vpr)  # type: ignore
+            except Exception:
+                raw_items = []
+            out = []
+            for idx, q in enumerate(filtered):
+                obj = dict(q)
+                if idx < len(raw_items):
+                    obj['_raw'] = raw_items[idx]
+                out.append(obj)
+            filtered = out
+    payload = {'medications': filtered if isinstance(filtered, list) else (filtered or [])}
+    return with_raw(payload, vpr, args)
+
+
+def labs(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'labs', params=raw_params)
+
+    # Server-side filters: names (comma-separated), days, start, end
+    names_raw = (args.get('names') or '').strip()
+    name_tokens = [s.strip() for s in names_raw.split(',') if s.strip()] if names_raw else []
+
+    from datetime import datetime, timezone, timedelta
+    def _to_iso(x):
+        try:
+            return T._parse_any_datetime_to_iso(x)  # type: ignore
+        except Exception:
+            return None
+    now = datetime.now(timezone.utc)
+    start_iso = None
+    end_iso = None
+    # days → relative range
+    days = None
+    try:
+        d = args.get('days')
+        if d is not None:
+            di = int(str(d).strip() or '0')
+            if di and di > 0:
+                days = di
+    except Exception:
+        days = None
+    if days:
+        start_iso = (now - timedelta(days=days)).isoformat().replace('+00:00','Z')
+        end_iso = now.isoformat().replace('+00:00','Z')
+    s_arg = args.get('start')
+    e_arg = args.get('end')
+    if s_arg:
+        s_parsed = _to_iso(s_arg)
+        if s_parsed:
+            start_iso = s_parsed
+    if e_arg:
+        e_parsed = _to_iso(e_arg)
+        if e_parsed:
+            end_iso = e_parsed
+
+    filters_payload: dict[str, Any] = {'start': start_iso, 'end': end_iso}
+    max_panels_arg = args.get('maxPanels') or args.get('max')
+    if max_panels_arg:
+        try:
+            filters_payload['max_panels'] = int(str(max_panels_arg).strip())
+        except Exception:
+            pass
+
+    quick = svc.get_labs_quick(dfn, params=raw_params, filters=filters_payload)
+
+    # Date range first (binary search over the transform's canonical
+    # timestamps; RPC rows fall back to their date fields), so LOINC
+    # annotation only copies the rows that survive it.
+    start_epoch = T.datetime_to_epoch(start_iso) if start_iso else None
+    end_epoch = T.datetime_to_epoch(end_iso) if end_iso else None
+    if isinstance(quick, list) and (start_epoch is not None or end_epoch is not None):
+        quick = T.select_date_range(
+            quick,
+            start_epoch,
+            end_epoch,
+            fallback_fields=('observedDate', 'resulted', 'collected', 'date'),
+        )
+
+    # LOINC-aware name/code filtering
+    loinc_idx = LoincIndex.load()
+    if isinstance(quick, list):
+        quick = loinc_idx.annotate_labs(quick)
+    codes_set, substrings_set = loinc_idx.resolve_tokens(name_tokens)
+    def _name_ok(item):
+        if not name_tokens:
+            return True
+        try:
+            test = (item.get('test') or item.get('name') or item.get('display') or '').strip()
+            code = (item.get('loinc') or item.get('code') or item.get('typeCode') or '').strip().lower()
+            if code and code in codes_set:
+                return True
+            key = ''.join(ch.lower() if ch.isalnum() else ' ' for ch in test).strip()
+            return any(w in key for w in substrings_set)
+        except Exception:
+            return True
+
+    filtered = quick
+    filters_applied = bool(name_tokens) or bool(days) or bool(start_iso) or bool(end_iso)
+    if isinstance(quick, list) and name_tokens:
+        filtered = [q for q in quick if _name_ok(q)]
+
+    include_raw_items = args.get('includeRaw','0').lower() in ('1','true','yes','on')
+    if include_raw_items and isinstance(filtered, list):
+        if not filters_applied:
+            raw_items = []
+            try:
+                raw_items = T._get_nested_items(vpr)  # type: ignore
+            except Exception:
+                raw_items = []
+            vpr_index = 0
+            out = []
+            for q in filtered:
+                obj = dict(q)
+                if q.get('source') != 'rpc' and vpr_index < len(raw_items):
+                    obj['_raw'] = raw_items[vpr_index]
+                    vpr_index += 1
+                out.append(obj)
+            filtered = out
+    return with_raw(filtered, vpr, args, list_label='labs')
+
+
+def orders(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    include_raw = str(args.get('includeRaw', '0')).strip().lower() in ('1', 'true', 'yes', 'on')
+    status_filter = _orders_status_alias(args.get('status', 'current'))
+    type_filter = _orders_type_alias(args.get('type', 'all'))
+
+    params = dict(collect_params(args, *ALLOWED_PARAMS['order']))
+    days_arg = args.get('days')
+    start_arg = args.get('start')
+    end_arg = args.get('end')
+
+    from datetime import datetime, timezone, timedelta
+
+    now = datetime.now(timezone.utc)
+
+    def _coerce_iso(val: str | None) -> str | None:
+        if not val:
+            return None
+        try:
+            iso = T._parse_any_datetime_to_iso(val)  # type: ignore[attr-defined]
+        except Exception:
+            iso = None
+        if iso:
+            return iso
+        try:
+            txt = str(val).strip()
+        except Exception:
+            txt = ''
+        return txt or None
+
+    start_iso = _coerce_iso(start_arg)
+    end_iso = _coerce_iso(end_arg)
+
+    days_int = None
+    if days_arg is not None:
+        try:
+            days_int = int(str(days_arg).strip() or '0')
+            if days_int <= 0:
+                days_int = None
+        except Exception:
+            days_int = None
+
+    if days_int and not start_iso:
+        start_iso = (now - timedelta(days=days_int)).isoformat().replace('+00:00', 'Z')
+    if days_int and not end_iso:
+        end_iso = now.isoformat().replace('+00:00', 'Z')
+
+    if start_iso and start_iso.endswith('+00:00'):
+        start_iso = start_iso[:-6] + 'Z'
+    if end_iso and end_iso.endswith('+00:00'):
+        end_iso = end_iso[:-6] + 'Z'
+
+    if start_iso:
+        try:
+            fm_start = T.to_fileman_datetime(start_iso)
+            if fm_start:
+                params['start'] = fm_start
+        except Exception:
+            pass
+    if end_iso:
+        try:
+            fm_stop = T.to_fileman_datetime(end_iso)
+            if fm_stop:
+                params['stop'] = fm_stop
+        except Exception:
+            pass
+
+    if (raw_requested or include_raw) and 'raw' not in params:
+        params['raw'] = '1'
+
+    pass_params = params or None
+
+    vpr = svc.get_vpr_raw(dfn, 'order', params=pass_params)
+    quick = svc.get_orders_quick(dfn, params=pass_params)
+    orders = quick if isinstance(quick, list) else []
+
+    tokens_cache: dict[int, set[str]] = {}
+
+    def _status_tokens(order: dict) -> set[str]:
+        key = id(order)
+        if key in tokens_cache:
+            return tokens_cache[key]
+        tokens: set[str] = set()
+        for field in ('status_bucket', 'current_status', 'status', 'status_code'):
+            val = order.get(field)
+            if not val:
+                continue
+            text = str(val).strip().lower()
+            if text:
+                tokens.add(text)
+        tokens_cache[key] = tokens
+        return tokens
+
+    def _matches_patterns(token_set: set[str], patterns: tuple[str, ...]) -> bool:
+        for token in token_set:
+            for pattern in patterns:
+                if pattern and pattern in token:
+                    return True
+        return False
+
+    def _status_matches(order: dict) -> bool:
+        bucket = str(order.get('status_bucket') or '').strip().lower()
+        tokens = _status_tokens(order)
+        if bucket:
+            tokens = set(tokens)
+            tokens.add(bucket)
+        if status_filter == 'all':
+            return True
+        if status_filter == 'current':
+            if bucket:
+                return bucket in ('active', 'pending')
+            closed = _matches_patterns(tokens, _STATUS_COMPLETED_PATTERNS + _STATUS_DISCONTINUED_PATTERNS)
+            return not closed
+        if status_filter == 'active':
+            if bucket:
+                return bucket == 'active'
+            return _matches_patterns(tokens, _STATUS_ACTIVE_PATTERNS)
+        if status_filter == 'pending':
+            if bucket:
+                return bucket == 'pending'
+            return _matches_patterns(tokens, _STATUS_PENDING_PATTERNS)
+        if status_filter == 'completed':
+            if bucket:
+                return bucket == 'completed'
+            return _matches_patterns(tokens, _STATUS_COMPLETED_PATTERNS)
+        if status_filter == 'discontinued':
+            if bucket:
+                return bucket == 'discontinued'
+            return _matches_patterns(tokens, _STATUS_DISCONTINUED_PATTERNS)
+        return True
+
+    def _type_matches(order: dict) -> bool:
+        if type_filter == 'all':
+            return True
+        category = str(order.get('category') or '').strip().lower()
+        if category:
+            if category == type_filter:
+                return True
+        type_text = str(order.get('type') or '').strip().lower()
+        if type_text and type_text == type_filter:
+            return True
+        detail = str(order.get('type_detail') or '').strip().lower()
+        if not detail:
+            return type_filter == 'other'
+        if type_filter == 'labs':
+            return any(token in detail for token in ('lab', 'chem', 'hemat', 'micro', 'path'))
+        if type_filter == 'meds':
+            return any(token in detail for token in ('med', 'pharm', 'rx', 'drug'))
+        if type_filter == 'imaging':
+            return any(token in detail for token in ('imaging', 'radiology', 'x-ray', 'xray', 'ct', 'mri', 'ultrasound', 'nuclear', 'pet'))
+        if type_filter == 'consults':
+            return 'consult' in detail or 'referral' in detail
+        if type_filter == 'nursing':
+            return 'nurs' in detail or 'nursing' in detail
+        if type_filter == 'scheduling':
+            return any(token in detail for token in ('schedule', 'scheduling', 'appointment', 'appt'))
+        if type_filter == 'other':
+            return True
+        return False
+
+    def _to_dt(val: str | None) -> datetime | None:
+        if not val:
+            return None
+        text = str(val).strip()
+        if not text:
+            return None
+        try:
+            if text.endswith('Z'):
+                text = text[:-1] + '+00:00'
+            return datetime.fromisoformat(text)
+        except Exception:
+            try:
+                iso_val = T._parse_any_datetime_to_iso(text)  # type: ignore[attr-defined]
+            except Exception:
+                iso_val = None
+            if not iso_val:
+                return None
+            try:
+                adj = iso_val[:-1] + '+00:00' if iso_val.endswith('Z') else iso_val
+                return datetime.fromisoformat(adj)
+            except Exception:
+                return None
+
+    start_dt_filter = _to_dt(start_iso)
+    end_dt_filter = _to_dt(end_iso)
+
+    start_epoch = start_dt_filter.timestamp() if start_dt_filter else None
+    end_epoch = end_dt_filter.timestamp() if end_dt_filter else None
+    # Undated orders are kept, as before
+    dated_orders = T.select_date_range(
+        orders,
+        start_epoch,
+        end_epoch,
+        include_undated=True,
+        fallback_fields=('date', 'start', 'released', 'entered', 'signed', 'stop'),
+    )
+
+    filtered: list[dict] = []
+    for order in dated_orders:
+        if not isinstance(order, dict):
+            continue
+        if not _status_matches(order):
+            continue
+        if not _type_matches(order):
+            continue
+        filtered.append(order)
+
+    filtered.sort(key=lambda rec: (rec.get('date') or '', rec.get('fm_date') or ''), reverse=True)
+
+    limit_arg = args.get('limit')
+    if limit_arg is not None:
+        try:
+            limit_val = int(str(limit_arg).strip())
+            if limit_val > 0:
+                filtered = filtered[:limit_val]
+        except Exception:
+            pass
+
+    if include_raw and isinstance(filtered, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore[attr-defined]
+        except Exception:
+            raw_items = []
+
+        def _raw_keys(raw_item: dict) -> list[str]:
+            keys: list[str] = []
+            if not isinstance(raw_item, dict):
+                return keys
+            uid_val = raw_item.get('uid')
+            if isinstance(uid_val, str) and uid_val.strip():
+                keys.append(uid_val.strip())
+            def _pick(node):
+                if node is None:
+                    return None
+                if isinstance(node, dict):
+                    for attr in ('value', 'name', 'id', 'code'):
+                        if node.get(attr):
+                            return str(node[attr])
+                    return None
+                if isinstance(node, str):
+                    return node
+                return None
+            id_val = _pick(raw_item.get('id'))
+            if id_val and str(id_val).strip():
+                keys.append(str(id_val).strip())
+            result_val = _pick(raw_item.get('resultID'))
+            if result_val and str(result_val).strip():
+                keys.append(str(result_val).strip())
+            return [k for k in keys if k]
+
+        raw_index: dict[str, dict] = {}
+        for raw in raw_items:
+            if not isinstance(raw, dict):
+                continue
+            for key in _raw_keys(raw):
+                if key not in raw_index:
+                    raw_index[key] = raw
+
+        enriched: list[dict] = []
+        for order in filtered:
+            obj = dict(order)
+            key_candidates = [
+                obj.get('order_id'),
+                obj.get('id'),
+                obj.get('uid'),
+                obj.get('result_id'),
+            ]
+            for key in key_candidates:
+                if not key:
+                    continue
+                key_str = str(key).strip()
+                if key_str and key_str in raw_index:
+                    obj['_raw'] = raw_index[key_str]
+                    break
+            enriched.append(obj)
+        filtered = enriched
+
+    return with_raw(filtered, vpr, args, list_label='orders')
+
+
+def vitals(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'vitals', params=raw_params)
+    quick = svc.get_vitals_quick(dfn, params=raw_params)
+    if (args.get('includeRaw','0').lower() in ('1','true','yes','on')) and isinstance(quick, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        out = []
+        for idx, q in enumerate(quick):
+            obj = dict(q)
+            if idx < len(raw_items):
+                obj['_raw'] = raw_items[idx]
+            out.append(obj)
+        quick = out
+    return with_raw(quick, vpr, args, list_label='vitals')
+
+
+def notes(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'notes', params=raw_params)
+    quick = svc.get_notes_quick(dfn, params=raw_params)
+    include_raw = args.get('includeRaw','0').lower() in ('1','true','yes','on')
+    include_text = args.get('includeText','0').lower() in ('1','true','yes','on')
+    include_enc = args.get('includeEncounter','0').lower() in ('1','true','yes','on')
+    if (include_raw or include_text or include_enc) and isinstance(quick, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        out = []
+        for idx, q in enumerate(quick):
+            obj = dict(q)
+            if idx < len(raw_items):
+                r = raw_items[idx]
+                if include_raw:
+                    obj['_raw'] = r
+                if include_text:
+                    txt = extract_full_text(r)
+                    if txt:
+                        obj['text'] = txt
+                if include_enc:
+                    enc = extract_encounter_info(r)
+                    if enc:
+                        obj['encounter'] = enc
+            out.append(obj)
+        quick = out
+    return with_raw(quick, vpr, args, list_label='notes')
+
+
+def document_rows(
+    svc: PatientService, dfn: str, args: Mapping[str, Any],
+) -> Tuple[Iterator[Dict[str, Any]], Dict[str, Any], Any, bool]:
+    """Documents view parts: ``(rows, meta, quick, plain)``.
+
+    ``rows`` filters and enriches lazily, so a streamed response never holds
+    every note text at once. ``meta`` names the list and its filters (plus the
+    raw VPR text with raw=1). ``plain`` is True when no filter or enrichment
+    was asked for and ``quick``, the unfiltered quick list, is the result.
+    """
+    raw_requested = wants_raw(args)
+    include_raw = args.get('includeRaw','0').lower() in ('1','true','yes','on')
+    include_text = args.get('includeText','0').lower() in ('1','true','yes','on')
+    include_enc = args.get('includeEncounter','0').lower() in ('1','true','yes','on')
+    # Fetch raw and quick lists
+    doc_params: Dict[str, str] = {}
+    if include_text or raw_requested:
+        doc_params['text'] = '1'
+    else:
+        doc_params['text'] = '0'
+    if raw_requested or include_raw:
+        doc_params['raw'] = '1'
+    vpr = svc.get_vpr_raw(dfn, 'document', params=doc_params)
+    quick_list = svc.get_documents_quick(dfn, params=dict(doc_params))
+
+    # Proactively build keyword index if not present (lazy in search too)
+    try:
+        _ = get_or_build_index_for_dfn(str(dfn), gateway=svc.gateway, async_build=True)
+    except Exception:
+        pass
+
+    # Normalize filters
+    def _split_params(val: str | None) -> list[str]:
+        if not val:
+            return []
+        parts = []
+        for p in str(val).split(','):
+            s = p.strip()
+            if s:
+                parts.append(s)
+        return parts
+
+    class_filters = [s.lower() for s in _split_params(args.get('class'))]
+    type_filters = [s.lower() for s in _split_params(args.get('type'))]
+
+    raw_items = []
+    try:
+        raw_items = T._get_nested_items(vpr)  # type: ignore
+    except Exception:
+        raw_items = []
+
+    # Class filter (by class) and type filter (by name or code) come from the
+    # snapshot's document index; positions keep quick/raw alignment
+    positions = None
+    if class_filters or type_filters:
+        positions = svc.get_document_index(dfn, params=dict(doc_params)).select(class_filters, type_filters)
+    pairs: list[tuple[dict, dict | None]] = []
+    if isinstance(quick_list, list):
+        for idx in (positions if positions is not None else range(len(quick_list))):
+            q = quick_list[idx] if idx < len(quick_list) else None
+            r = raw_items[idx] if idx < len(raw_items) else None
+            if not isinstance(q, dict):
+                continue
+            pairs.append((q, r if isinstance(r, dict) else None))
+
+    # Enrichment
+    def _enrich(q: dict, r: dict | None) -> dict:
+        obj = dict(q)
+        if include_raw and isinstance(r, dict):
+            obj['_raw'] = r
+        if include_text and isinstance(r, dict):
+            txt = extract_full_text(r)
+            if txt:
+                obj['text'] = txt
+        if include_enc and isinstance(r, dict):
+            enc = extract_encounter_info(r)
+            if enc:
+                obj['encounter'] = enc
+        return obj
+
+    # No background embedding; RAG uses the keyword index's in-memory texts
+
+    meta: Dict[str, Any] = {'list': 'documents', 'class': class_filters, 'type': type_filters}
+    if raw_requested and isinstance(vpr, dict):
+        meta['raw'] = vpr.get('raw')
+    plain = not (include_raw or include_text or include_enc or class_filters or type_filters)
+    return (_enrich(q, r) for (q, r) in pairs), meta, quick_list, plain
+
+
+def documents(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    rows, meta, quick, plain = document_rows(svc, dfn, args)
+    result = quick if plain else list(rows)
+    if not wants_raw(args):
+        return result
+    return {'documents': result, 'raw': meta.get('raw')}
+
+
+def radiology(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'radiology', params=raw_params)
+    quick = svc.get_radiology_quick(dfn, params=raw_params)
+    include_raw = args.get('includeRaw','0').lower() in ('1','true','yes','on')
+    include_text = args.get('includeText','0').lower() in ('1','true','yes','on')
+    include_enc = args.get('includeEncounter','0').lower() in ('1','true','yes','on')
+    if (include_raw or include_text or include_enc) and isinstance(quick, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        out = []
+        for idx, q in enumerate(quick):
+            obj = dict(q)
+            if idx < len(raw_items):
+                r = raw_items[idx]
+                if include_raw:
+                    obj['_raw'] = r
+                if include_text:
+                    txt = extract_full_text(r)
+                    if txt:
+                        obj['text'] = txt
+                if include_enc:
+                    enc = extract_encounter_info(r)
+                    if enc:
+                        obj['encounter'] = enc
+            out.append(obj)
+        quick = out
+    return with_raw(quick, vpr, args, list_label='radiology')
+
+
+def procedures(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'procedures', params=raw_params)
+    quick = svc.get_procedures_quick(dfn, params=raw_params)
+    include_raw = args.get('includeRaw','0').lower() in ('1','true','yes','on')
+    include_text = args.get('includeText','0').lower() in ('1','true','yes','on')
+    include_enc = args.get('includeEncounter','0').lower() in ('1','true','yes','on')
+    if (include_raw or include_text or include_enc) and isinstance(quick, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        out = []
+        for idx, q in enumerate(quick):
+            obj = dict(q)
+            if idx < len(raw_items):
+                r = raw_items[idx]
+                if include_raw:
+                    obj['_raw'] = r
+                if include_text:
+                    txt = extract_full_text(r)
+                    if txt:
+                        obj['text'] = txt
+                if include_enc:
+                    enc = extract_encounter_info(r)
+                    if enc:
+                        obj['encounter'] = enc
+            out.append(obj)
+        quick = out
+    return with_raw(quick, vpr, args, list_label='procedures')
+
+
+def encounters(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'encounters', params=raw_params)
+    quick = svc.get_encounters_quick(dfn, params=raw_params)
+    if (args.get('includeRaw','0').lower() in ('1','true','yes','on')) and isinstance(quick, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        out = []
+        for idx, q in enumerate(quick):
+            obj = dict(q)
+            if idx < len(raw_items):
+                obj['_raw'] = raw_items[idx]
+            out.append(obj)
+        quick = out
+    return with_raw(quick, vpr, args, list_label='encounters')
+
+
+def problems(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'problems', params=raw_params)
+    quick = svc.get_problems_quick(dfn, params=raw_params)
+    include_raw = args.get('includeRaw','0').lower() in ('1','true','yes','on')
+    # Accept detail=1 as alias for includeComments=1 (frontend convenience)
+    include_comments = args.get('includeComments','0').lower() in ('1','true','yes','on')
+    if not include_comments:
+        include_comments = args.get('detail','0').lower() in ('1','true','yes','on')
+    status_filter = (args.get('status') or 'all').strip().lower()  # 'active' | 'inactive' | 'all'
+    if (include_raw or include_comments or status_filter != 'all') and isinstance(quick, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        out = []
+        for idx, q in enumerate(quick):
+            obj = dict(q)
+            raw = raw_items[idx] if idx < len(raw_items) else None
+            # status filtering
+            if status_filter != 'all':
+                # Try quick status first
+                is_active = is_problem_active(obj.get('status'))
+                if is_active is None and isinstance(raw, dict):
+                    is_active = is_problem_active(raw.get('statusName') or raw.get('status'))
+                # If still None, treat as unknown: only include in 'all'
+                if is_active is None:
+                    if status_filter in ('active','inactive'):
+                        continue
+                else:
+                    if status_filter == 'active' and not is_active:
+                        continue
+                    if status_filter == 'inactive' and is_active:
+                        continue
+            # enrich
+            if include_raw and isinstance(raw, dict):
+                obj['_raw'] = raw
+            if include_comments and isinstance(raw, dict):
+                comments = extract_problem_comments(raw)
+                if comments:
+                    obj['comments'] = comments
+            out.append(obj)
+        quick = out
+    return with_raw(quick, vpr, args, list_label='problems')
+
+
+def allergies(svc: PatientService, dfn: str, args: Mapping[str, Any]) -> Any:
+    raw_requested = wants_raw(args)
+    raw_params = {'raw': '1'} if raw_requested else None
+    vpr = svc.get_vpr_raw(dfn, 'allergies', params=raw_params)
+    quick = svc.get_allergies_quick(dfn, params=raw_params)
+    if (args.get('includeRaw','0').lower() in ('1','true','yes','on')) and isinstance(quick, list):
+        raw_items = []
+        try:
+            raw_items = T._get_nested_items(vpr)  # type: ignore
+        except Exception:
+            raw_items = []
+        out = []
+        for idx, q in enumerate(quick):
+            obj = dict(q)
+            if idx < len(raw_items):
+                obj['_raw'] = raw_items[idx]
+            out.append(obj)
+        quick = out
+    return with_raw(quick, vpr, args, list_label='allergies')
+
+
+# Quick endpoint name (as in /quick/<name>) -> view
+QUICK_VIEWS: Dict[str, Callable[[PatientService, str, Mapping[str, Any]], Any]] = {
+    'demographics': demographics,
+    'meds': medications,
+    'medications': medications,
+    'labs': labs,
+    'orders': orders,
+    'order': orders,
+    'vitals': vitals,
+    'notes': notes,
+    'documents': documents,
+    'radiology': radiology,
+    'procedures': procedures,
+    'encounters': encounters,
+    'problems': problems,
+    'allergies': allergies,
+}
+
+
+__all__ = [
+    'ALLOWED_PARAMS',
+    'QUICK_VIEWS',
+    'allergies',
+    'collect_params',
+    'demographics',
+    'document_rows',
+    'documents',
+    'encounters',
+    'extract_encounter_info',
+    'extract_full_text',
+    'extract_problem_comments',
+    'is_problem_active',
+    'labs',
+    'medications',
+    'notes',
+    'orders',
+    'problems',
+    'procedures',
+    'radiology',
+    'vitals',
+    'wants_raw',
+    'with_raw',
+]
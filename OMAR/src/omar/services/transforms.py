@@ -1,5 +1,8 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional, Tuple
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import datetime as dt
 
 
@@ -287,13 +290,22 @@ def _fileman_to_iso(val: Any) -> Optional[str]:
 def _parse_any_datetime_to_iso(val: Any) -> Optional[str]:
     """Best-effort parse of date representations to ISO8601 Z format.
     Supports ISO, yyyymmdd[HHMMSS], and FileMan YYYMMDD[.HHMM[SS]].
+    Results are memoized per distinct input text.
     """
     if val is None:
         return None
     try:
         s = str(val).strip()
-        if not s:
-            return None
+    except Exception:
+        return None
+    if not s:
+        return None
+    return _parse_datetime_text_to_iso(s)
+
+
+@lru_cache(maxsize=16384)
+def _parse_datetime_text_to_iso(s: str) -> Optional[str]:
+    try:
         # Try ISO first
         try:
             if 'T' in s or '-' in s:
@@ -319,6 +331,194 @@ def _parse_any_datetime_to_iso(val: Any) -> Optional[str]:
     return None
 
 
+# --------------------- Canonical timestamps & date index ---------------------
+# Quick transforms record each item's canonical timestamp (UTC seconds, or
+# None) once, beside the items in a QuickList, so endpoint date filters compare
+# numbers instead of re-parsing strings. Items themselves are not touched:
+# serialized payloads and their ETags stay as they were.
+
+
+@lru_cache(maxsize=16384)
+def _iso_text_to_epoch(iso: str) -> Optional[float]:
+    try:
+        return dt.datetime.fromisoformat(iso.replace('Z', '+00:00')).timestamp()
+    except Exception:
+        return None
+
+
+def datetime_to_epoch(val: Any) -> Optional[float]:
+    """Parse any supported date representation to epoch seconds (memoized)."""
+    iso = _parse_any_datetime_to_iso(val)
+    if not iso:
+        return None
+    return _iso_text_to_epoch(iso)
+
+
+class QuickList(list):
+    """List of quick items with one epoch per item kept alongside.
+
+    Also caches a date-sorted index over those epochs. Any in-place change to
+    the list (assignment, insert, sort, ...) drops both, and later lookups
+    fall back to parsing the items' date fields.
+    """
+
+    __slots__ = ('_epochs', '_date_index')
+
+    def __init__(self, items: Iterable[Any] = (), epochs: Optional[List[Optional[float]]] = None) -> None:
+        super().__init__(items)
+        self._epochs: Optional[List[Optional[float]]] = (
+            list(epochs) if epochs is not None and len(epochs) == len(self) else None
+        )
+        self._date_index: Optional[Tuple[List[float], List[int], List[int]]] = None
+
+    def _invalidate(self) -> None:
+        self._epochs = None
+        self._date_index = None
+
+
+def _invalidating(name: str) -> Any:
+    method = getattr(list, name)
+
+    def _wrapper(self: QuickList, *args: Any, **kwargs: Any) -> Any:
+        self._invalidate()
+        return method(self, *args, **kwargs)
+
+    _wrapper.__name__ = name
+    return _wrapper
+
+
+_LIST_MUTATORS = ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend',
+                  'insert', 'pop', 'remove', 'clear', 'sort', 'reverse')
+
+for _name in _LIST_MUTATORS:
+    setattr(QuickList, _name, _invalidating(_name))
+
+
+def _read_only(self: Any, *args: Any, **kwargs: Any) -> Any:
+    raise TypeError(f'shared quick {type(self).__name__} is read-only; copy it first')
+
+
+class FrozenQuickItem(dict):
+    """Read-only quick item shared through the patient snapshot.
+
+    ``dict(item)`` is a mutable shallow copy; nested objects stay frozen.
+    """
+
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    setdefault = pop = popitem = update = clear = _read_only
+
+    def copy(self) -> Dict[str, Any]:  # type: ignore[override]
+        return dict(self)
+
+    def __reduce__(self) -> Any:
+        # copy/deepcopy/pickle produce plain dicts
+        return (dict, (dict(self),))
+
+
+class FrozenQuickList(QuickList):
+    """Read-only QuickList shared through the patient snapshot; ``list(items)`` to edit."""
+
+    __slots__ = ()
+
+    def __reduce__(self) -> Any:
+        return (list, (list(self),))
+
+
+for _name in _LIST_MUTATORS:
+    setattr(FrozenQuickList, _name, _read_only)
+
+
+def freeze_quick(value: Any) -> Any:
+    """Read-only form of a quick view, built once per snapshot entry.
+
+    Dicts and lists become ``FrozenQuickItem``/``FrozenQuickList`` all the way
+    down (a QuickList keeps its epochs), so the one copy can be handed to
+    every request without per-request copying.
+    """
+    if isinstance(value, (FrozenQuickItem, FrozenQuickList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenQuickItem((k, freeze_quick(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return FrozenQuickList((freeze_quick(v) for v in value), getattr(value, '_epochs', None))
+    return value
+
+
+def _item_epoch(item: Any, fallback_fields: Tuple[str, ...]) -> Optional[float]:
+    if not isinstance(item, dict):
+        return None
+    for field in fallback_fields:
+        epoch = datetime_to_epoch(item.get(field))
+        if epoch is not None:
+            return epoch
+    return None
+
+
+def item_epochs(items: List[Any], fallback_fields: Tuple[str, ...] = ()) -> List[Optional[float]]:
+    """One epoch per item: a QuickList's recorded epochs, else parsed from ``fallback_fields``."""
+    epochs = getattr(items, '_epochs', None)
+    if epochs is not None:
+        return epochs
+    return [_item_epoch(item, fallback_fields) for item in items]
+
+
+def _build_date_index(items: List[Any], fallback_fields: Tuple[str, ...]) -> Tuple[List[float], List[int], List[int]]:
+    dated: List[Tuple[float, int]] = []
+    undated: List[int] = []
+    for pos, epoch in enumerate(item_epochs(items, fallback_fields)):
+        if epoch is None:
+            undated.append(pos)
+        else:
+            dated.append((epoch, pos))
+    dated.sort()
+    return ([e for e, _ in dated], [p for _, p in dated], undated)
+
+
+def select_date_range(
+    items: List[Any],
+    start_epoch: Optional[float],
+    end_epoch: Optional[float],
+    *,
+    include_undated: bool = False,
+    fallback_fields: Tuple[str, ...] = (),
+) -> List[Any]:
+    """Return items whose canonical timestamp lies in [start_epoch, end_epoch].
+
+    Original order is preserved. For a QuickList the date-sorted index is built
+    once and reused (binary search); other lists are scanned linearly. Without
+    recorded epochs, items' ``fallback_fields`` are parsed in order.
+    """
+    if start_epoch is None and end_epoch is None:
+        return list(items)
+    if not isinstance(items, QuickList):
+        out: List[Any] = []
+        for item in items:
+            epoch = _item_epoch(item, fallback_fields)
+            if epoch is None:
+                if include_undated:
+                    out.append(item)
+                continue
+            if start_epoch is not None and epoch < start_epoch:
+                continue
+            if end_epoch is not None and epoch > end_epoch:
+                continue
+            out.append(item)
+        return out
+    index = items._date_index
+    if index is None:
+        index = items._date_index = _build_date_index(items, fallback_fields)
+    epochs, positions, undated = index
+    lo = bisect_left(epochs, start_epoch) if start_epoch is not None else 0
+    hi = bisect_right(epochs, end_epoch) if end_epoch is not None else len(epochs)
+    picks = positions[lo:hi]
+    if include_undated and undated:
+        picks = picks + undated
+    picks.sort()
+    return [items[i] for i in picks]
+
+
 def _iso_to_mmddyyyy(val: Optional[str]) -> Optional[str]:
     if not val:
         return None
@@ -459,6 +659,7 @@ def vpr_to_quick_medications(vpr_payload: Any) -> List[Dict[str, Any]]:
     """Direct VPR → quick mapping for medications (fallback or comparison)."""
     items = _get_nested_items(vpr_payload)
     out: List[Dict[str, Any]] = []
+    epochs: List[Optional[float]] = []
     for it in items:
         if not isinstance(it, dict):
             continue
@@ -478,17 +679,30 @@ def vpr_to_quick_medications(vpr_payload: Any) -> List[Dict[str, Any]]:
         )
         start_iso = _parse_any_datetime_to_iso(start)
         stop_iso = _parse_any_datetime_to_iso(stop)
+        # Date filters use the end date, falling back to the start date
+        anchor_iso = stop_iso or start_iso
         out.append({
             'name': name,
             'status': status,
             'startDate': start_iso,
             'endDate': stop_iso,
         })
-    return out
+        epochs.append(_iso_text_to_epoch(anchor_iso) if anchor_iso else None)
+    return QuickList(out, epochs)
 
 
 # ===================== Labs =====================
 
+def _loinc_code(val: Any) -> Optional[str]:
+    """Bare LOINC code from a VPR 'loinc' value (e.g. 'urn:lnc:2823-3' -> '2823-3')."""
+    if not val or not isinstance(val, str):
+        return None
+    code = val.strip()
+    if code.lower().startswith('urn:lnc:'):
+        code = code[8:]
+    return code or None
+
+
 def vpr_to_quick_labs(vpr_payload: Any) -> List[Dict[str, Any]]:
     """Map VPR 'labs' items to a simplified quick shape.
     Fields (quick):
@@ -497,12 +711,14 @@ def vpr_to_quick_labs(vpr_payload: Any) -> List[Dict[str, Any]]:
       - abnormal (True/False when reference range present; else None)
       - observed (raw Fileman value if present)
       - observedDate (ISO)
+      - loinc (code from the VPR item when present)
     Also include a few compatibility aliases used by UI modules:
       - test (alias of name), unit (alias of units), resulted (ISO, same as observedDate)
       - refRange (legacy alias of referenceRange)
     """
     items = _get_nested_items(vpr_payload)
     out: List[Dict[str, Any]] = []
+    epochs: List[Optional[float]] = []
     for it in items:
         if not isinstance(it, dict):
             continue
@@ -605,10 +821,12 @@ def vpr_to_quick_labs(vpr_payload: Any) -> List[Dict[str, Any]]:
             'panelId': panel_id,
             'category': it.get('category') or None,
             'groupName': it.get('groupName') or None,
+            'loinc': _loinc_code(it.get('loinc')),
             'source': 'vpr',
         }
         out.append(obj)
-    return out
+        epochs.append(_iso_text_to_epoch(obs_iso) if obs_iso else None)
+    return QuickList(out, epochs)
 
 
 # ===================== Vitals =====================
@@ -619,6 +837,7 @@ def vpr_to_quick_vitals(vpr_payload: Any) -> List[Dict[str, Any]]:
     """
     items = _get_nested_items(vpr_payload)
     out: List[Dict[str, Any]] = []
+    epochs: List[Optional[float]] = []
     for it in items:
         if not isinstance(it, dict):
             continue
@@ -728,7 +947,8 @@ def vpr_to_quick_vitals(vpr_payload: Any) -> List[Dict[str, Any]]:
             if measurement_id is not None:
                 record['measurementId'] = str(measurement_id)
             out.append(record)
-    return out
+            epochs.append(_iso_text_to_epoch(dt_iso) if dt_iso else None)
+    return QuickList(out, epochs)
 
 
 # ===================== Notes/Documents =====================
@@ -1184,25 +1404,39 @@ _ORDER_ACTIVE_TOKENS = (
 )
 
 
+# Attribute-style keys tried in this order when reducing a node to one value
+# (xmltodict-style '@' prefixes and case are ignored)
+_ORDER_VALUE_KEYS = ('value', 'name', 'text', 'content', 'string', 'code', 'id', 'number', '#text')
+_ORDER_VALUE_RANK = {key: rank for rank, key in enumerate(_ORDER_VALUE_KEYS)}
+
+
+def _order_norm_key(key: Any) -> str:
+    try:
+        return str(key).lstrip('@').lower()
+    except Exception:
+        return ''
+
+
 def _order_extract_value(node: Any) -> Optional[Any]:
     if node is None:
         return None
     if isinstance(node, dict):
-        # Prefer common attribute-style keys (supports xmltodict-style '@' keys as well)
-        preferred = ('value', 'name', 'text', 'content', 'string', 'code', 'id', 'number', '#text')
-        for cand_key in preferred:
-            for key, val in node.items():
-                try:
-                    norm = str(key).lstrip('@').lower()
-                except Exception:
-                    norm = ''
-                if norm == cand_key.lstrip('@').lower():
-                    if isinstance(val, (list, dict)):
-                        extracted = _order_extract_value(val)
-                    else:
-                        extracted = val
-                    if extracted not in (None, ''):
-                        return extracted
+        # One pass over the keys; candidates are then tried by preferred key,
+        # then by position, exactly as a per-preferred-key scan would.
+        ranked = []
+        for pos, (key, val) in enumerate(node.items()):
+            rank = _ORDER_VALUE_RANK.get(_order_norm_key(key))
+            if rank is not None:
+                ranked.append((rank, pos, val))
+        if len(ranked) > 1:
+            ranked.sort(key=lambda entry: (entry[0], entry[1]))
+        for _rank, _pos, val in ranked:
+            if isinstance(val, (list, dict)):
+                extracted = _order_extract_value(val)
+            else:
+                extracted = val
+            if extracted not in (None, ''):
+                return extracted
         # Fallback: inspect remaining nested values
         for candidate in node.values():
             extracted = _order_extract_value(candidate)
@@ -1248,28 +1482,52 @@ def _order_extract_datetime(node: Any) -> tuple[Optional[str], Optional[str]]:
     return raw_str, iso
 
 
-def _order_attr(node: Any, key: str) -> Optional[str]:
+def _order_attrs(node: Any) -> Dict[str, str]:
+    """Index a node's attributes once: normalized key -> first non-empty text.
+
+    ``_order_attrs(node).get(key.lower())`` equals ``_order_attr(node, key)``;
+    callers that read several attributes of one node build this once.
+    """
+    attrs: Dict[str, str] = {}
     if not isinstance(node, dict):
-        return None
-    target = key.lower()
+        return attrs
     for cand, value in node.items():
-        try:
-            norm = str(cand).lstrip('@').lower()
-        except Exception:
-            norm = ''
-        if norm == target:
-            if isinstance(value, (dict, list)):
-                extracted = _order_extract_value(value)
-            else:
-                extracted = value
-            if extracted in (None, ''):
-                continue
-            text = str(extracted).strip()
-            if text:
-                return text
-    return None
+        norm = _order_norm_key(cand)
+        if norm in attrs:
+            continue
+        if isinstance(value, (dict, list)):
+            extracted = _order_extract_value(value)
+        else:
+            extracted = value
+        if extracted in (None, ''):
+            continue
+        text = str(extracted).strip()
+        if text:
+            attrs[norm] = text
+    return attrs
+
+
+def _order_attr(node: Any, key: str) -> Optional[str]:
+    return _order_attrs(node).get(key.lower())
+
 
+def _order_alternation(needles: Tuple[str, ...]) -> 're.Pattern[str]':
+    """One compiled alternation matching any needle as a substring."""
+    # Longest first so the regex engine tries the most specific needle first
+    ordered = sorted({n for n in needles if n}, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(n) for n in ordered))
 
+
+# Status buckets in precedence order: the first bucket any token hits wins
+_ORDER_STATUS_MATCHERS = (
+    ('discontinued', _order_alternation(_ORDER_DISCONTINUED_TOKENS)),
+    ('completed', _order_alternation(_ORDER_COMPLETED_TOKENS)),
+    ('pending', _order_alternation(_ORDER_PENDING_TOKENS)),
+    ('active', _order_alternation(_ORDER_ACTIVE_TOKENS)),
+)
+
+
+@lru_cache(maxsize=4096)
 def _order_status_bucket(name: Optional[str], code: Optional[str]) -> str:
     tokens: list[str] = []
     for raw in (name, code):
@@ -1278,75 +1536,82 @@ def _order_status_bucket(name: Optional[str], code: Optional[str]) -> str:
         norm = str(raw).strip().lower()
         if norm:
             tokens.append(norm)
-    for token in tokens:
-        if any(marker in token for marker in _ORDER_DISCONTINUED_TOKENS):
-            return 'discontinued'
-    for token in tokens:
-        if any(marker in token for marker in _ORDER_COMPLETED_TOKENS):
-            return 'completed'
-    for token in tokens:
-        if any(marker in token for marker in _ORDER_PENDING_TOKENS):
-            return 'pending'
-    for token in tokens:
-        if any(marker in token for marker in _ORDER_ACTIVE_TOKENS):
-            return 'active'
-    if tokens:
-        return 'other'
-    return 'unknown'
+    if not tokens:
+        return 'unknown'
+    for bucket, matcher in _ORDER_STATUS_MATCHERS:
+        for token in tokens:
+            if matcher.search(token):
+                return bucket
+    return 'other'
+
+
+# Category rules in precedence order. Each field is matched by one compiled
+# alternation (substring), a startswith prefix tuple, or an exact-value set.
+_ORDER_CATEGORY_RULES: Tuple[Tuple[str, Dict[str, Any]], ...] = (
+    ('labs', {
+        'service_prefix': ('lr',),
+        'group_exact': frozenset({'ch', 'mi', 'sp', 'cy', 'ap', 'lab'}),
+        'type': _order_alternation(('lab', 'chem', 'hemat', 'micro', 'path', 'specimen', 'culture')),
+        'name': _order_alternation(('lab', 'panel', 'cbc', 'chem', 'culture', 'pathology', 'specimen')),
+    }),
+    ('meds', {
+        'service_prefix': ('ps',),
+        'service_exact': frozenset({'pha', 'pharm', 'pharmacy'}),
+        'group_exact': frozenset({'med', 'rx', 'ps', 'psj', 'pharm', 'unit dose', 'clinicmed'}),
+        'type': _order_alternation(('med', 'pharm', 'prescription', 'drug', 'dose')),
+        'name': _order_alternation(('med', 'pharm', 'tablet', 'capsule', 'dose', 'rx')),
+    }),
+    ('imaging', {
+        'service_prefix': ('ra',),
+        'service': _order_alternation(('radiology', 'imaging')),
+        'group_exact': frozenset({'imaging', 'rad', 'ra'}),
+        'type': _order_alternation(('imaging', 'radiology', 'x-ray', 'xray', 'ct', 'mri', 'ultrasound', 'nuclear')),
+        'name': _order_alternation(('imaging', 'radiology', 'x-ray', 'xray', 'ct ', ' mri', 'ultrasound', 'nuclear', 'pet')),
+    }),
+    ('consults', {
+        'service_exact': frozenset({'gmrc', 'consult', 'con'}),
+        'type': _order_alternation(('consult', 'referral')),
+        'name': _order_alternation(('consult', 'referral')),
+    }),
+    ('nursing', {
+        'service': _order_alternation(('nurs',)),
+        'group': _order_alternation(('nurse',)),
+        'type': _order_alternation(('nurs', 'nursing')),
+        'name': _order_alternation(('nurs', 'nursing')),
+    }),
+)
 
 
+@lru_cache(maxsize=8192)
 def _order_categorize(service: Optional[str], group: Optional[str], order_type: Optional[str], name: Optional[str]) -> str:
     service_low = (service or '').strip().lower()
     group_low = (group or '').strip().lower()
     type_low = (order_type or '').strip().lower()
     name_low = (name or '').strip().lower()
 
-    def contains_any(text: str, needles: tuple[str, ...]) -> bool:
-        return any(needle in text for needle in needles if needle)
-
-    if (
-        service_low.startswith('lr')
-        or group_low in {'ch', 'mi', 'sp', 'cy', 'ap', 'lab'}
-        or contains_any(type_low, ('lab', 'chem', 'hemat', 'micro', 'path', 'specimen', 'culture'))
-        or contains_any(name_low, ('lab', 'panel', 'cbc', 'chem', 'culture', 'pathology', 'specimen'))
-    ):
-        return 'labs'
-    if (
-        service_low.startswith('ps')
-        or service_low in {'pha', 'pharm', 'pharmacy'}
-        or group_low in {'med', 'rx', 'ps', 'psj', 'pharm', 'unit dose', 'clinicmed'}
-        or contains_any(type_low, ('med', 'pharm', 'prescription', 'drug', 'dose'))
-        or contains_any(name_low, ('med', 'pharm', 'tablet', 'capsule', 'dose', 'rx'))
-    ):
-        return 'meds'
-    if (
-        service_low.startswith('ra')
-        or 'radiology' in service_low
-        or 'imaging' in service_low
-        or group_low in {'imaging', 'rad', 'ra'}
-        or contains_any(type_low, ('imaging', 'radiology', 'x-ray', 'xray', 'ct', 'mri', 'ultrasound', 'nuclear'))
-        or contains_any(name_low, ('imaging', 'radiology', 'x-ray', 'xray', 'ct ', ' mri', 'ultrasound', 'nuclear', 'pet'))
-    ):
-        return 'imaging'
-    if (
-        service_low in {'gmrc', 'consult', 'con'}
-        or contains_any(type_low, ('consult', 'referral'))
-        or contains_any(name_low, ('consult', 'referral'))
-    ):
-        return 'consults'
-    if (
-        'nurs' in service_low
-        or 'nurse' in group_low
-        or contains_any(type_low, ('nurs', 'nursing'))
-        or contains_any(name_low, ('nurs', 'nursing'))
-    ):
-        return 'nursing'
+    for category, rule in _ORDER_CATEGORY_RULES:
+        prefixes = rule.get('service_prefix')
+        if prefixes and service_low.startswith(prefixes):
+            return category
+        if service_low in rule.get('service_exact', ()):
+            return category
+        matcher = rule.get('service')
+        if matcher is not None and matcher.search(service_low):
+            return category
+        if group_low in rule.get('group_exact', ()):
+            return category
+        matcher = rule.get('group')
+        if matcher is not None and matcher.search(group_low):
+            return category
+        if rule['type'].search(type_low) or rule['name'].search(name_low):
+            return category
     return 'other'
 
 
 def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
     items = _get_nested_items(vpr_payload)
     out: List[Dict[str, Any]] = []
+    epochs: List[Optional[float]] = []
     for it in items:
         if not isinstance(it, dict):
             continue
@@ -1388,11 +1653,8 @@ def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
             order_name = order_name[:160].rstrip()
         name_code = None
         if isinstance(name_node, dict):
-            name_code = (
-                _order_attr(name_node, 'code')
-                or _order_attr(name_node, 'value')
-                or _order_attr(name_node, 'id')
-            )
+            name_attrs = _order_attrs(name_node)
+            name_code = name_attrs.get('code') or name_attrs.get('value') or name_attrs.get('id')
 
         group_val = _order_extract_string(it.get('group'))
         service_val = _order_extract_string(it.get('service'))
@@ -1402,23 +1664,19 @@ def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
         order_type_name = _order_extract_string(type_node)
         order_type_code = None
         if isinstance(type_node, dict):
-            order_type_code = (
-                _order_attr(type_node, 'code')
-                or _order_attr(type_node, 'value')
-            )
+            type_attrs = _order_attrs(type_node)
+            order_type_code = type_attrs.get('code') or type_attrs.get('value')
 
         status_node = it.get('status')
         status_name = _order_extract_string(status_node)
         status_code = None
         status_vuid = None
         if isinstance(status_node, dict):
-            status_code = (
-                _order_attr(status_node, 'code')
-                or _order_attr(status_node, 'value')
-            )
-            status_vuid = _order_attr(status_node, 'vuid')
+            status_attrs = _order_attrs(status_node)
+            status_code = status_attrs.get('code') or status_attrs.get('value')
+            status_vuid = status_attrs.get('vuid')
             if not status_name:
-                status_name = _order_attr(status_node, 'name')
+                status_name = status_attrs.get('name')
 
         signature_status = _order_extract_string(it.get('signatureStatus'))
 
@@ -1427,46 +1685,47 @@ def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
         facility_code = None
         if isinstance(facility_dict, dict):
             facility_name = _order_extract_string(facility_dict.get('name')) or _order_extract_string(facility_dict)
-            facility_code = _order_attr(facility_dict, 'code')
+            facility_code = _order_attrs(facility_dict).get('code')
 
         location_dict = it.get('location')
         location_name = None
         location_code = None
         if isinstance(location_dict, dict):
             location_name = _order_extract_string(location_dict.get('name')) or _order_extract_string(location_dict)
-            location_code = _order_attr(location_dict, 'code')
+            location_code = _order_attrs(location_dict).get('code')
 
         provider_dict = it.get('provider')
         provider_obj = None
         if isinstance(provider_dict, dict):
+            provider_attrs = _order_attrs(provider_dict)
             provider_code = (
-                _order_attr(provider_dict, 'code')
-                or _order_attr(provider_dict, 'id')
+                provider_attrs.get('code')
+                or provider_attrs.get('id')
                 or _order_extract_string(provider_dict.get('code') or provider_dict.get('id'))
             )
             provider_name = (
-                _order_attr(provider_dict, 'name')
+                provider_attrs.get('name')
                 or _order_extract_string(provider_dict.get('name'))
             )
             provider_id = (
-                _order_attr(provider_dict, 'id')
+                provider_attrs.get('id')
                 or _order_extract_string(provider_dict.get('id'))
             )
             provider_npi = (
-                _order_attr(provider_dict, 'npi')
+                provider_attrs.get('npi')
                 or _order_extract_string(provider_dict.get('npi'))
             )
             provider_phone = (
-                _order_attr(provider_dict, 'officePhone')
-                or _order_attr(provider_dict, 'phone')
+                provider_attrs.get('officephone')
+                or provider_attrs.get('phone')
                 or _order_extract_string(provider_dict.get('officePhone') or provider_dict.get('phone'))
             )
             provider_service = (
-                _order_attr(provider_dict, 'service')
+                provider_attrs.get('service')
                 or _order_extract_string(provider_dict.get('service'))
             )
             provider_title = (
-                _order_attr(provider_dict, 'title')
+                provider_attrs.get('title')
                 or _order_extract_string(provider_dict.get('title'))
             )
             provider_candidate = {
@@ -1492,14 +1751,15 @@ def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
         signed_by = None
         signed_by_name = None
         if isinstance(signed_dict, dict):
+            signed_attrs = _order_attrs(signed_dict)
             signed_by = (
-                _order_attr(signed_dict, 'by')
-                or _order_attr(signed_dict, 'byCode')
+                signed_attrs.get('by')
+                or signed_attrs.get('bycode')
                 or _order_extract_string(signed_dict.get('by') or signed_dict.get('byCode'))
             )
             signed_by_name = (
-                _order_attr(signed_dict, 'byName')
-                or _order_attr(signed_dict, 'name')
+                signed_attrs.get('byname')
+                or signed_attrs.get('name')
                 or _order_extract_string(signed_dict.get('byName') or signed_dict.get('name'))
             )
 
@@ -1510,9 +1770,10 @@ def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
         discontinued_by = None
         discontinued_by_name = None
         if isinstance(discontinued_dict, dict):
+            discontinued_attrs = _order_attrs(discontinued_dict)
             discontinued_raw = (
-                _order_attr(discontinued_dict, 'date')
-                or _order_attr(discontinued_dict, 'value')
+                discontinued_attrs.get('date')
+                or discontinued_attrs.get('value')
                 or _order_extract_string(discontinued_dict.get('date'))
                 or _order_extract_string(discontinued_dict.get('value'))
                 or _order_extract_string(discontinued_dict)
@@ -1520,15 +1781,15 @@ def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
             if discontinued_raw:
                 discontinued_iso = _parse_any_datetime_to_iso(discontinued_raw)
             discontinued_reason = (
-                _order_attr(discontinued_dict, 'reason')
+                discontinued_attrs.get('reason')
                 or _order_extract_string(discontinued_dict.get('reason'))
             )
             discontinued_by = (
-                _order_attr(discontinued_dict, 'by')
+                discontinued_attrs.get('by')
                 or _order_extract_string(discontinued_dict.get('by'))
             )
             discontinued_by_name = (
-                _order_attr(discontinued_dict, 'byName')
+                discontinued_attrs.get('byname')
                 or _order_extract_string(discontinued_dict.get('byName'))
             )
 
@@ -1649,9 +1910,10 @@ def vpr_to_quick_orders(vpr_payload: Any) -> List[Dict[str, Any]]:
             cleaned['provider'] = provider_obj
 
         out.append(cleaned)
+        epochs.append(_iso_text_to_epoch(date_iso) if date_iso else None)
 
-    out.sort(key=lambda rec: (rec.get('date') or '', rec.get('fm_date') or ''), reverse=True)
-    return out
+    order = sorted(range(len(out)), key=lambda i: (out[i].get('date') or '', out[i].get('fm_date') or ''), reverse=True)
+    return QuickList([out[i] for i in order], [epochs[i] for i in order])
 
 
 # ===================== Allergies =====================
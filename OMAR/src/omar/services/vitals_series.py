@@ -0,0 +1,236 @@
+"""Per-type vitals time series with server-side downsampling.
+
+Quick vitals rows (``vpr_to_quick_vitals``) are grouped by (type, units) into
+NumPy arrays sorted by time:
+
+    t   float64  taken time (UTC seconds)
+    v   float64  numeric value (systolic for blood pressure)
+    v2  float64  second component of "a/b" values (diastolic), NaN otherwise
+
+Rows without a timestamp or a numeric value are not charted and are left out.
+A range query is two ``searchsorted`` calls per type; the slice is then
+reduced to a point budget before serialization with either
+
+  * ``lttb``   Largest-Triangle-Three-Buckets (keeps the visual shape), or
+  * ``minmax`` per-bucket min and max (keeps every extreme).
+
+Both select indices on ``v``; ``v2`` is carried along at the same indices.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .patient_snapshot import domain_generation
+from .transforms import _VITAL_TYPE_MAP, _normalize_vital_code, item_epochs
+
+_PAIR_RE = re.compile(r'^\s*([-+]?\d+(?:\.\d+)?)\s*/\s*([-+]?\d+(?:\.\d+)?)')
+_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)')
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+
+def _parse_value(value: Any) -> Tuple[float, float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value), np.nan
+    text = str(value or '')
+    pair = _PAIR_RE.match(text)
+    if pair:
+        return float(pair.group(1)), float(pair.group(2))
+    match = _NUMBER_RE.search(text)
+    return (float(match.group(0)) if match else np.nan), np.nan
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, budget: int) -> np.ndarray:
+    """Indices of the Largest-Triangle-Three-Buckets reduction of (x, y) to ``budget`` points."""
+    n = int(x.shape[0])
+    if budget >= n or n <= 2:
+        return np.arange(n)
+    if budget < 3:
+        return np.array([0, n - 1][:max(budget, 1)])
+    # Interior buckets over [1, n - 1); first and last points are always kept
+    edges = np.floor(np.linspace(1, n - 1, budget - 1)).astype(np.int64)
+    sizes = np.diff(edges)
+    # Average of each bucket (the "third" vertex for the bucket before it)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+    avg_x = np.append(avg_x, x[n - 1])
+    avg_y = np.append(avg_y, y[n - 1])
+    # The selected vertex carries from bucket to bucket, so this walk is
+    # sequential; plain floats beat per-bucket NumPy calls on small buckets.
+    xs = x.tolist()
+    ys = y.tolist()
+    cxs = avg_x.tolist()
+    cys = avg_y.tolist()
+    bounds = edges.tolist()
+    out = [0]
+    a = 0
+    for b in range(budget - 2):
+        cx = cxs[b + 1]
+        cy = cys[b + 1]
+        ax = xs[a]
+        ay = ys[a]
+        dx = ax - cx
+        dy = cy - ay
+        best = -1.0
+        pick = bounds[b]
+        for i in range(bounds[b], bounds[b + 1]):
+            area = abs(dx * (ys[i] - ay) - (ax - xs[i]) * dy)
+            if area > best:
+                best = area
+                pick = i
+        a = pick
+        out.append(a)
+    out.append(n - 1)
+    return np.asarray(out, dtype=np.int64)
+
+
+def minmax_indices(y: np.ndarray, budget: int) -> np.ndarray:
+    """Indices of the min and max of ``budget // 2`` equal-count buckets (time order kept)."""
+    n = int(y.shape[0])
+    if budget >= n:
+        return np.arange(n)
+    buckets = max(1, min(budget // 2, n))
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    # Sort by value inside each bucket: first/last of a bucket are its min/max
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    order = np.lexsort((y, bucket_ids))
+    picks = np.concatenate((order[edges[:-1]], order[edges[1:] - 1]))
+    return np.unique(picks)
+
+
+class _Series:
+    __slots__ = ('type', 'code', 'units', 't', 'v', 'v2')
+
+    def __init__(self, vtype: str, code: Optional[str], units: Optional[str],
+                 t: List[float], v: List[float], v2: List[float]) -> None:
+        order = np.argsort(np.asarray(t, dtype=np.float64), kind='stable')
+        self.type = vtype
+        self.code = code
+        self.units = units
+        self.t = np.asarray(t, dtype=np.float64)[order]
+        self.v = np.asarray(v, dtype=np.float64)[order]
+        second = np.asarray(v2, dtype=np.float64)[order]
+        self.v2 = second if np.isfinite(second).any() else None
+
+
+class VitalsSeries:
+    """Immutable per-type arrays over one patient's quick vitals."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], generation: Optional[int] = None) -> None:
+        self.generation = generation
+        groups: Dict[Tuple[str, str], Tuple[Optional[str], List[float], List[float], List[float]]] = {}
+        if not isinstance(rows, list):
+            rows = list(rows)
+        for row, epoch in zip(rows, item_epochs(rows, ('takenDate',))):
+            if not isinstance(row, dict):
+                continue
+            if epoch is None:
+                continue
+            v, v2 = _parse_value(row.get('value'))
+            if np.isnan(v):
+                continue
+            vtype = str(row.get('type') or row.get('code') or '').strip()
+            if not vtype:
+                continue
+            units = str(row.get('units') or '')
+            group = groups.get((vtype, units))
+            if group is None:
+                group = groups[(vtype, units)] = (row.get('code'), [], [], [])
+            group[1].append(epoch)
+            group[2].append(v)
+            group[3].append(v2)
+        self.series: List[_Series] = [
+            _Series(vtype, code, units or None, t, v, v2)
+            for (vtype, units), (code, t, v, v2) in groups.items()
+        ]
+
+    def __len__(self) -> int:
+        return sum(int(s.t.shape[0]) for s in self.series)
+
+    def select(self, types: Optional[Iterable[str]] = None) -> List[_Series]:
+        """Series whose type matches any token (vital code, alias or display substring)."""
+        tokens = [str(t).strip() for t in (types or []) if str(t).strip()]
+        if not tokens:
+            return list(self.series)
+        displays = set()
+        subs = []
+        for token in tokens:
+            code = _normalize_vital_code(token)
+            if code and code in _VITAL_TYPE_MAP:
+                displays.add(_VITAL_TYPE_MAP[code][0].lower())
+            subs.append(token.lower())
+        return [
+            s for s in self.series
+            if s.type.lower() in displays
+            or (s.code or '').upper() in {t.upper() for t in tokens}
+            or any(sub in s.type.lower() for sub in subs)
+        ]
+
+    def query(
+        self,
+        *,
+        types: Optional[Iterable[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        budget: int = 0,
+        method: str = 'lttb',
+    ) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for s in self.select(types):
+            lo = int(np.searchsorted(s.t, start, side='left')) if start is not None else 0
+            hi = int(np.searchsorted(s.t, end, side='right')) if end is not None else int(s.t.shape[0])
+            if hi <= lo:
+                continue
+            t = s.t[lo:hi]
+            v = s.v[lo:hi]
+            idx: Optional[np.ndarray] = None
+            if budget and budget < t.shape[0]:
+                idx = minmax_indices(v, budget) if method == 'minmax' else lttb_indices(t, v, budget)
+            entry: Dict[str, Any] = {
+                'type': s.type,
+                'code': s.code,
+                'units': s.units,
+                'count': int(t.shape[0]),
+                'min': float(v.min()),
+                'max': float(v.max()),
+                'last': {'t': float(t[-1]), 'v': float(v[-1])},
+            }
+            if idx is not None:
+                t, v = t[idx], v[idx]
+            entry['returned'] = int(t.shape[0])
+            entry['t'] = t.tolist()
+            entry['v'] = v.tolist()
+            if s.v2 is not None:
+                v2 = s.v2[lo:hi]
+                if np.isfinite(v2[-1]):
+                    entry['last']['v2'] = float(v2[-1])
+                v2 = v2[idx] if idx is not None else v2
+                entry['v2'] = [None if np.isnan(x) else x for x in v2.tolist()]
+            out.append(entry)
+        return out
+
+
+# --------------------- Snapshot view ---------------------
+
+def get_vitals_series(svc: Any, dfn: str) -> VitalsSeries:
+    """Return the vitals series for ``dfn``, rebuilding it only on a new vital generation."""
+    gateway = svc.gateway
+    dfn = str(dfn)
+
+    def _build() -> VitalsSeries:
+        rows = svc.get_vitals_quick(dfn)
+        return VitalsSeries(rows or [], generation=domain_generation(gateway, dfn, 'vital'))
+
+    return svc.snapshot_view(dfn, 'vital', 'vitals-series', _build)
+
+
+__all__ = [
+    'DOWNSAMPLE_METHODS',
+    'VitalsSeries',
+    'get_vitals_series',
+    'lttb_indices',
+    'minmax_indices',
+]
@@ -0,0 +1,261 @@
+"""Negotiated response compression (gzip, brotli when installed).
+
+``init_compression(app)`` registers an ``after_request`` hook that encodes
+JSON, NDJSON, text, JavaScript and CSS responses for clients that accept it:
+
+  * buffered bodies smaller than ``COMPRESS_MIN_BYTES`` are left alone,
+  * streamed bodies (NDJSON, ``stream_with_context``) are compressed chunk by
+    chunk with a sync flush after each one, so every chunk the view yields
+    still reaches the client when it is produced,
+  * ``Content-Encoding``, ``Cache-Control: no-transform``, file responses
+    (``direct_passthrough``) and Server-Sent Events are passed through.
+
+Brotli is preferred over gzip when the ``brotli`` package is importable and
+the client's ``Accept-Encoding`` ranks it at least as high. A compressed
+response's ETag gets an ``-<coding>`` suffix (one tag per representation);
+the suffix is stripped from ``If-None-Match`` before views compare tags.
+
+Knobs (environment):
+
+  * ``COMPRESS_RESPONSES`` - 0 disables the hook (default 1)
+  * ``COMPRESS_MIN_BYTES`` - smallest buffered body to compress (default 1024)
+  * ``COMPRESS_LEVEL``     - gzip level 1-9 (default 6)
+  * ``COMPRESS_BROTLI_QUALITY`` - brotli quality 0-11 (default 4)
+
+``compression_stats()`` reports, per endpoint, responses, bytes in/out,
+bytes saved and CPU seconds spent compressing.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from flask import Flask, request
+
+try:  # optional
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    brotli = None  # type: ignore
+
+_COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'text/csv',
+    'text/markdown',
+)
+_ETAG_SUFFIX = re.compile(r'-(?:gzip|br)"')
+
+
+def _env_int(name: str, default: int, low: int, high: int) -> int:
+    try:
+        value = int(os.getenv(name, str(default)) or default)
+    except ValueError:
+        value = default
+    return max(low, min(high, value))
+
+
+# --------------------- Encoders ---------------------
+
+class _GzipEncoder:
+    coding = 'gzip'
+
+    def __init__(self, level: int) -> None:
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    coding = 'br'
+
+    def __init__(self, quality: int) -> None:
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+# --------------------- Metrics ---------------------
+
+_STATS_LOCK = threading.Lock()
+_STATS: Dict[str, Dict[str, Any]] = {}
+
+
+def _record(endpoint: str, coding: str, bytes_in: int, bytes_out: int, cpu: float) -> None:
+    with _STATS_LOCK:
+        row = _STATS.setdefault(endpoint, {
+            'responses': 0, 'bytesIn': 0, 'bytesOut': 0, 'cpuSeconds': 0.0, 'codings': {},
+        })
+        row['responses'] += 1
+        row['bytesIn'] += bytes_in
+        row['bytesOut'] += bytes_out
+        row['cpuSeconds'] += cpu
+        row['codings'][coding] = row['codings'].get(coding, 0) + 1
+
+
+def compression_stats() -> Dict[str, Any]:
+    """Per-endpoint compression counters plus totals."""
+    with _STATS_LOCK:
+        endpoints = {name: dict(row, codings=dict(row['codings'])) for name, row in _STATS.items()}
+    totals = {'responses': 0, 'bytesIn': 0, 'bytesOut': 0, 'cpuSeconds': 0.0}
+    for row in endpoints.values():
+        row['bytesSaved'] = row['bytesIn'] - row['bytesOut']
+        row['ratio'] = round(row['bytesOut'] / row['bytesIn'], 4) if row['bytesIn'] else None
+        row['cpuSeconds'] = round(row['cpuSeconds'], 6)
+        for key in totals:
+            totals[key] += row[key]
+    totals['bytesSaved'] = totals['bytesIn'] - totals['bytesOut']
+    totals['cpuSeconds'] = round(totals['cpuSeconds'], 6)
+    return {
+        'codings': ['br', 'gzip'] if brotli is not None else ['gzip'],
+        'totals': totals,
+        'endpoints': endpoints,
+    }
+
+
+def reset_compression_stats() -> None:
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+# --------------------- Middleware ---------------------
+
+def _negotiate(accept_encodings: Any) -> Optional[str]:
+    gzip_q = accept_encodings['gzip']
+    if brotli is not None:
+        br_q = accept_encodings['br']
+        if br_q and br_q >= gzip_q:
+            return 'br'
+    return 'gzip' if gzip_q else None
+
+
+def _compressible(resp: Any) -> bool:
+    if resp.direct_passthrough or 'Content-Encoding' in resp.headers:
+        return False
+    if resp.status_code < 200 or resp.status_code in (204, 206, 304):
+        return False
+    if 'no-transform' in (resp.headers.get('Cache-Control') or ''):
+        return False
+    mimetype = (resp.mimetype or '').lower()
+    return mimetype in _COMPRESSIBLE_TYPES or mimetype.endswith('+json')
+
+
+def _stream(
+    chunks: Iterable[bytes],
+    encoder: Any,
+    record: Callable[[int, int, float], None],
+    close: Optional[Callable[[], None]],
+) -> Iterator[bytes]:
+    bytes_in = bytes_out = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            started = time.thread_time()
+            out = encoder.compress(chunk) + encoder.flush()
+            cpu += time.thread_time() - started
+            bytes_in += len(chunk)
+            bytes_out += len(out)
+            yield out
+        started = time.thread_time()
+        tail = encoder.finish()
+        cpu += time.thread_time() - started
+        bytes_out += len(tail)
+        if tail:
+            yield tail
+    finally:
+        record(bytes_in, bytes_out, cpu)
+        if close is not None:
+            close()
+
+
+def init_compression(app: Flask) -> None:
+    """Register the compression hooks on ``app`` (no-op when disabled)."""
+    if os.getenv('COMPRESS_RESPONSES', '1').lower() in ('0', 'false', 'no', 'off'):
+        return
+    min_bytes = _env_int('COMPRESS_MIN_BYTES', 1024, 0, 1 << 30)
+    level = _env_int('COMPRESS_LEVEL', 6, 1, 9)
+    quality = _env_int('COMPRESS_BROTLI_QUALITY', 4, 0, 11)
+
+    def _encoder(coding: str) -> Any:
+        return _BrotliEncoder(quality) if coding == 'br' else _GzipEncoder(level)
+
+    @app.before_request
+    def _strip_etag_coding():
+        # Views compare identity tags; clients echo the tag of the encoded body
+        header = request.environ.get('HTTP_IF_NONE_MATCH')
+        if header and '-' in header:
+            request.environ['HTTP_IF_NONE_MATCH'] = _ETAG_SUFFIX.sub('"', header)
+
+    @app.after_request
+    def _compress_response(resp):
+        if request.method == 'HEAD':
+            return resp
+        coding = _negotiate(request.accept_encodings)
+        etag, weak = resp.get_etag()
+        if coding is None or not (_compressible(resp) or (resp.status_code == 304 and etag)):
+            return resp
+        resp.vary.add('Accept-Encoding')
+        if etag and not weak:
+            resp.set_etag(f'{etag}-{coding}')
+        if resp.status_code == 304:
+            return resp
+        endpoint = request.endpoint or request.path
+
+        if resp.is_streamed:
+            body = resp.response
+            resp.response = _stream(
+                body,
+                _encoder(coding),
+                lambda n_in, n_out, cpu: _record(endpoint, coding, n_in, n_out, cpu),
+                getattr(body, 'close', None),
+            )
+            resp.headers.pop('Content-Length', None)
+            resp.headers['Content-Encoding'] = coding
+            return resp
+
+        data = resp.get_data()
+        if len(data) < min_bytes:
+            if etag and not weak:
+                resp.set_etag(etag)
+            return resp
+        started = time.thread_time()
+        encoder = _encoder(coding)
+        packed = encoder.compress(data) + encoder.finish()
+        cpu = time.thread_time() - started
+        if len(packed) >= len(data):
+            if etag and not weak:
+                resp.set_etag(etag)
+            return resp
+        resp.set_data(packed)
+        resp.headers['Content-Encoding'] = coding
+        _record(endpoint, coding, len(data), len(packed), cpu)
+        return resp
+
+
+__all__ = ['compression_stats', 'init_compression', 'reset_compression_stats']
@@ -3,7 +3,10 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
-from flask import g, session as flask_session, request
+from flask import current_app, g, has_request_context, session as flask_session, request
+
+# Blueprints whose JSON responses carry the context block (see context_blueprint)
+_CONTEXT_BLUEPRINTS: set = set()
 
 
 def _clean_str(value: Optional[Any]) -> Optional[str]:
@@ -127,3 +130,40 @@ def merge_context(payload: Any, *, dfn: Optional[Any] = None, **overrides: Any)
         'result': payload,
         'context': context,
     }
+
+
+def context_blueprint(bp: Any) -> Any:
+    """Mark ``bp`` so JSON responses from its views carry the context block.
+
+    The JSON provider (``utils.json_provider``) merges the block while
+    serializing ``jsonify`` payloads. Any other ``application/json`` response
+    (hand-built bodies) is patched by an ``after_request`` hook, which is the
+    only path that still parses a body back.
+    """
+    _CONTEXT_BLUEPRINTS.add(bp.name)
+    bp.after_request(_attach_missing_context)
+    return bp
+
+
+def _attach_missing_context(response: Any) -> Any:
+    if getattr(response, 'context_attached', False) or response.is_streamed or not response.is_json:
+        return response
+    if not response_wants_context():
+        return response
+    try:
+        data = response.get_json(silent=True)
+        if data is None:
+            return response
+        wrapped = merge_context(data)
+        if wrapped is not data:
+            response.set_data(current_app.json.dumps(wrapped))
+    except Exception:
+        pass
+    return response
+
+
+def response_wants_context() -> bool:
+    """True inside a request to a ``context_blueprint`` view."""
+    if not has_request_context():
+        return False
+    return request.blueprint in _CONTEXT_BLUEPRINTS
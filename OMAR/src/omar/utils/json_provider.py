@@ -0,0 +1,141 @@
+"""Flask JSON provider: single-pass context injection and an opt-in fast encoder.
+
+``jsonify`` goes through ``OmarJSONProvider.response``. For views of
+blueprints registered with ``utils.context.context_blueprint`` the
+``context`` block is merged into the payload before it is serialized, so a
+response is encoded exactly once (the old ``after_request`` hooks parsed
+every JSON body back and encoded it a second time).
+
+``jsonify`` output keeps Flask's defaults (sorted keys, ASCII escapes).
+Views with large payloads opt in per response with ``fast_jsonify``, which
+keeps keys in insertion order and writes UTF-8 with the encoding backend
+(``OMAR_JSON_BACKEND``); NDJSON/SSE streams encode their records the same
+way through ``dumps_bytes``:
+
+  * ``auto`` (default) - orjson when installed, else the stdlib encoder
+  * ``orjson``         - orjson; payloads it rejects (ints beyond 64 bits,
+                         unknown types) fall back to the stdlib encoder
+  * ``stdlib``         - ``json.dumps``
+
+Lazy VPR items, QuickLists and other dict/list subclasses are handed to
+``default`` so they serialize from their public view (orjson would
+otherwise read a subclass's raw storage).
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+from ..gateways.lazy_items import LazyVprItem
+from .context import merge_context, response_wants_context
+
+try:  # optional
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+
+def _orjson_backend() -> Optional[Callable[[Any, Callable[[Any], Any], bool], bytes]]:
+    if orjson is None:
+        return None
+    base = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_PASSTHROUGH_DATETIME
+    pretty = base | orjson.OPT_INDENT_2
+
+    def _dumps(obj: Any, default: Callable[[Any], Any], indent: bool) -> bytes:
+        return orjson.dumps(obj, default=default, option=pretty if indent else base)
+
+    return _dumps
+
+
+# name -> factory returning a bytes encoder (obj, default, indent) or None when unavailable
+_BACKENDS: Dict[str, Callable[[], Optional[Callable[[Any, Callable[[Any], Any], bool], bytes]]]] = {
+    'orjson': _orjson_backend,
+}
+
+
+def _plain(o: Any) -> Any:
+    """``default`` hook: public view of subclasses and NumPy scalars/arrays, then Flask's rules."""
+    if isinstance(o, LazyVprItem):
+        return o.to_dict()
+    if isinstance(o, dict):
+        return dict(o)
+    if isinstance(o, (list, tuple)):
+        return list(o)
+    if isinstance(o, str):
+        return str(o)
+    if isinstance(o, int):
+        return int(o)
+    if isinstance(o, float):
+        return float(o)
+    tolist = getattr(o, 'tolist', None)
+    if callable(tolist):
+        return tolist()
+    return DefaultJSONProvider.default(o)
+
+
+class OmarJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_plain)  # type: ignore[assignment]
+
+    def __init__(self, app: Any) -> None:
+        super().__init__(app)
+        wanted = (os.getenv('OMAR_JSON_BACKEND') or 'auto').strip().lower()
+        self.backend = 'stdlib'
+        self._encode: Optional[Callable[[Any, Callable[[Any], Any], bool], bytes]] = None
+        for name in (('orjson',) if wanted == 'auto' else (wanted,)):
+            factory = _BACKENDS.get(name)
+            encoder = factory() if factory else None
+            if encoder is not None:
+                self.backend = name
+                self._encode = encoder
+                break
+
+    def dumps_bytes(self, obj: Any, *, indent: bool = False) -> bytes:
+        """Fast encoding: insertion-ordered keys, UTF-8, compact unless ``indent``."""
+        if self._encode is not None:
+            try:
+                return self._encode(obj, self.default, indent)
+            except TypeError:
+                pass  # orjson.JSONEncodeError: retry with the stdlib encoder
+        return json.dumps(
+            obj,
+            default=self.default,
+            ensure_ascii=False,
+            indent=2 if indent else None,
+            separators=None if indent else (',', ':'),
+        ).encode('utf-8')
+
+    def _with_context(self, args: Any, kwargs: Any) -> Any:
+        obj = self._prepare_response_obj(args, kwargs)
+        if response_wants_context():
+            obj = merge_context(obj)
+        return obj
+
+    def response(self, *args: Any, **kwargs: Any) -> Any:
+        """``jsonify``: add the context block when the view wants one, then encode once."""
+        resp = super().response(self._with_context(args, kwargs))
+        resp.context_attached = True
+        return resp
+
+    def fast_response(self, *args: Any, **kwargs: Any) -> Any:
+        """``response`` encoded with ``dumps_bytes`` (see ``fast_jsonify``)."""
+        obj = self._with_context(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        resp = self._app.response_class(self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+        resp.context_attached = True
+        return resp
+
+
+def fast_jsonify(*args: Any, **kwargs: Any) -> Any:
+    """``jsonify`` for large payloads: unsorted keys, UTF-8, orjson when installed."""
+    provider = current_app.json
+    fast_response = getattr(provider, 'fast_response', None)
+    if fast_response is None:
+        return provider.response(*args, **kwargs)
+    return fast_response(*args, **kwargs)
+
+
+__all__ = ['OmarJSONProvider', 'fast_jsonify']
@@ -0,0 +1,95 @@
+"""Shared fixtures: the Flask app wired to an in-memory chart gateway."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+# Importable from the repository root too, where OMAR/pytest.ini is not read
+SRC_DIR = Path(__file__).resolve().parents[1] / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+def document_item(i: int, date: str, uid: Optional[str] = None) -> Dict[str, Any]:
+    """A VPR document item dated ``date`` (FileMan-style ``YYYYMMDDHHMM``)."""
+    return {
+        'uid': uid or f'urn:va:document:500:1:{i}',
+        'localId': str(i),
+        'referenceDateTime': date,
+        'localTitle': f'NOTE {i}',
+        'documentClass': 'PROGRESS NOTES',
+        'documentTypeName': 'Progress Note',
+        'statusName': 'completed',
+        'facilityName': 'CAMP',
+    }
+
+
+def vital_item(i: int, date: str) -> Dict[str, Any]:
+    return {
+        'uid': f'urn:va:vital:500:1:{i}',
+        'localId': str(i),
+        'observed': date,
+        'typeName': 'PULSE',
+        'result': str(60 + i),
+        'units': '/min',
+        'facilityName': 'CAMP',
+    }
+
+
+class ChartGateway:
+    """Serves VPR payloads from memory and reports a generation per domain,
+    like the socket gateway's cache (bump one with ``touch``)."""
+
+    station = '500'
+    duz = '983'
+
+    def __init__(self) -> None:
+        self.items: Dict[str, List[Dict[str, Any]]] = {
+            'document': [document_item(i, f'2024010{i + 1}1200') for i in range(5)],
+            'vital': [vital_item(i, f'2024020{i + 1}0800') for i in range(3)],
+        }
+        self.generations: Dict[str, int] = {}
+        self.fetches: Dict[str, int] = {}
+
+    def touch(self, domain: str) -> None:
+        self.generations[domain] = self.generations.get(domain, 1) + 1
+
+    def domain_generation(self, dfn: str, domain: str, params: Optional[Dict[str, Any]] = None) -> int:
+        return self.generations.get(domain, 1)
+
+    def get_vpr_domain(self, dfn: str, domain: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self.fetches[domain] = self.fetches.get(domain, 0) + 1
+        items = [dict(it) for it in self.items.get(domain, [])]
+        return {'data': {'items': items, 'totalItems': len(items)}}
+
+    def get_lab_panels(self, dfn: str, **_kwargs: Any) -> List[Dict[str, Any]]:
+        return []
+
+    def get_document_texts(self, dfn: str, ids: List[str]) -> Dict[str, List[str]]:
+        return {}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('OMAR_DEBUG_COLOR', '0')
+    import omar
+    return omar.create_app()
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    from omar.blueprints import patient
+    from omar.services.patient_snapshot import clear_patient_snapshots
+
+    gw = ChartGateway()
+    monkeypatch.setattr(patient, 'get_gateway', lambda **_: gw)
+    yield gw
+    clear_patient_snapshots(gw)
+
+
+@pytest.fixture
+def client(app, gateway):
+    return app.test_client()
@@ -0,0 +1,46 @@
+"""ETag / If-None-Match on quick views backed by generation-tracked snapshot reads."""
+from __future__ import annotations
+
+_URL = '/api/patient/1/quick/vitals'
+
+
+def test_unchanged_generation_answers_304_without_fetching(client, gateway):
+    first = client.get(_URL)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+    fetches = dict(gateway.fetches)
+
+    again = client.get(_URL, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.get_data() == b''
+    assert gateway.fetches == fetches
+
+
+def test_bumped_generation_returns_fresh_body_and_new_etag(client, gateway):
+    etag = client.get(_URL).headers['ETag']
+    gateway.touch('vital')
+    resp = client.get(_URL, headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+    assert resp.get_json()
+
+
+def test_other_domains_do_not_invalidate(client, gateway):
+    etag = client.get(_URL).headers['ETag']
+    gateway.touch('document')
+    assert client.get(_URL, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_etag_is_per_query(client):
+    etag = client.get(_URL).headers['ETag']
+    resp = client.get(_URL + '?raw=1', headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+
+
+def test_relative_windows_get_no_etag(client):
+    resp = client.get(_URL + '?days=30')
+    assert resp.status_code == 200
+    assert 'ETag' not in resp.headers
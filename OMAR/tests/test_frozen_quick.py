@@ -0,0 +1,40 @@
+"""Read-only quick views shared through the patient snapshot."""
+from __future__ import annotations
+
+import copy
+
+import pytest
+
+from omar.services.transforms import FrozenQuickItem, FrozenQuickList, QuickList, freeze_quick
+
+
+@pytest.fixture()
+def frozen():
+    return freeze_quick(QuickList([{'uid': 'a', 'codes': [{'code': '1'}]}], [1.0]))
+
+
+def test_freeze_is_deep_and_keeps_epochs(frozen):
+    assert isinstance(frozen, FrozenQuickList)
+    assert isinstance(frozen[0], FrozenQuickItem)
+    assert isinstance(frozen[0]['codes'][0], FrozenQuickItem)
+    assert frozen._epochs == [1.0]
+    assert freeze_quick(frozen) is frozen
+
+
+def test_frozen_views_reject_mutation(frozen):
+    with pytest.raises(TypeError):
+        frozen.append({})
+    with pytest.raises(TypeError):
+        frozen[0]['uid'] = 'b'
+    with pytest.raises(TypeError):
+        frozen[0]['codes'].sort()
+
+
+def test_copies_are_mutable(frozen):
+    item = dict(frozen[0])
+    item['uid'] = 'b'
+    assert frozen[0]['uid'] == 'a'
+    deep = copy.deepcopy(frozen)
+    assert type(deep) is list and type(deep[0]) is dict
+    deep[0]['codes'].append({'code': '2'})
+    assert len(frozen[0]['codes']) == 1
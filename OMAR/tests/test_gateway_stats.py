@@ -0,0 +1,24 @@
+"""/api/gateway/stats reports totals without naming patients."""
+from __future__ import annotations
+
+
+def test_snapshot_stats_are_counts_only(client, gateway):
+    assert client.get('/api/patient/4242/quick/vitals').status_code == 200
+    stats = client.get('/api/gateway/stats').get_json()
+    snapshots = stats['snapshots']
+    assert snapshots['patients'] == 1
+    assert snapshots['builds'] >= 1 and snapshots['entries']
+    assert '4242' not in client.get('/api/gateway/stats').get_data(as_text=True)
+
+
+def test_document_index_stats_are_totals_only(client, gateway):
+    from omar.services.document_search_service import clear_index_for_dfn, get_index_for_dfn
+
+    get_index_for_dfn('4243', gateway=gateway)
+    try:
+        resp = client.get('/api/gateway/stats')
+        resident = resp.get_json()['documentIndexes']['resident']
+        assert resident['indexes'] >= 1
+        assert '4243' not in resp.get_data(as_text=True)
+    finally:
+        clear_index_for_dfn('4243')
@@ -0,0 +1,62 @@
+"""Background note hydration: batches, site slots and job state."""
+from __future__ import annotations
+
+import threading
+import time
+
+from omar.services import hydration_scheduler as hs
+from omar.services.index_builds import BuildCoordinator
+
+
+class _Index:
+    station, duz, dfn = '500', '983', '1'
+
+    def __init__(self, docs):
+        self.missing = list(docs)
+        self.lock = threading.Lock()
+
+    def is_building(self):
+        return False
+
+    def hydration_plan(self):
+        with self.lock:
+            return [(0, doc_id) for doc_id in self.missing]
+
+    def hydrate_texts(self, batch):
+        with self.lock:
+            self.missing = [d for d in self.missing if d not in batch]
+        return len(batch)
+
+
+class _SlowExitScheduler(hs.HydrationScheduler):
+    """Widens the window between a batch finishing and its pool future clearing."""
+
+    def _run(self, job, batch):
+        super()._run(job, batch)
+        time.sleep(0.005)
+
+
+def _wait_done(scheduler, index, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        progress = scheduler.progress(index)
+        if progress['state'] == 'done':
+            return progress
+        time.sleep(0.005)
+    return scheduler.progress(index)
+
+
+def test_back_to_back_batches_all_run_and_release_the_site(monkeypatch):
+    monkeypatch.setattr(hs, 'INDEX_BUILDS', BuildCoordinator('TestHydrate', 2))
+    scheduler = _SlowExitScheduler(concurrency=1, rate=0, batch=2)
+    index = _Index([f'doc{i}' for i in range(7)])
+    scheduler.enqueue(index)
+
+    progress = _wait_done(scheduler, index)
+    assert progress['state'] == 'done', progress
+    assert (progress['hydrated'], progress['batches']) == (7, 4)
+    assert index.missing == []
+    assert scheduler.stats()['sites']['500']['running'] == 0
+    # A synchronous fetch still gets the site's only slot
+    with scheduler.site_slot('500', 1):
+        assert scheduler.stats()['sites']['500']['running'] == 1
@@ -0,0 +1,111 @@
+"""LazyVprItem: per-field decoding, materialization and thread safety."""
+from __future__ import annotations
+
+import copy
+import threading
+
+from omar.gateways.lazy_items import LazyVprItem, copy_payload, materialize_items
+
+_RAW = {'uid': {'@value': 'urn:va:vital:500:1:1'}, 'result': {'@value': '120/80'},
+        'qualifiers': {'qualifier': [{'@name': 'SITTING'}, {'@name': 'L ARM'}]}}
+_FIELDS = {'uid': 'uid', 'result': 'result', 'qualifiers': 'qualifiers'}
+
+
+def _normalize(value):
+    if isinstance(value, dict) and '@value' in value:
+        return value['@value']
+    if isinstance(value, dict):
+        return [q['@name'] for q in value['qualifier']]
+    return value
+
+
+class _Calls:
+    def __init__(self):
+        self.fields = []
+        self.full = 0
+        self.lock = threading.Lock()
+
+    def decode_field(self, raw, spec):
+        with self.lock:
+            self.fields.append(spec)
+        return _normalize(raw[spec])
+
+    def materialize(self, raw):
+        with self.lock:
+            self.full += 1
+        return {key: _normalize(raw[spec]) for key, spec in _FIELDS.items()}
+
+
+def _item(calls=None):
+    calls = calls or _Calls()
+    return LazyVprItem(_RAW, _FIELDS, calls.decode_field, calls.materialize), calls
+
+
+def test_fields_decode_once_on_first_read():
+    item, calls = _item()
+    assert 'result' in item and len(item) == 3
+    assert calls.fields == []
+    assert item['result'] == '120/80'
+    assert item.get('result') == '120/80'
+    assert item.get('missing', 'x') == 'x'
+    assert calls.fields == ['result'] and calls.full == 0
+
+
+def test_materialize_keeps_values_already_handed_out():
+    item, _ = _item()
+    qualifiers = item['qualifiers']
+    item.materialize()
+    assert item['qualifiers'] is qualifiers
+    assert list(item) == list(_FIELDS)
+
+
+def test_mutation_materializes_first():
+    item, calls = _item()
+    item['extra'] = 1
+    assert calls.full == 1
+    assert item.to_dict() == {'uid': 'urn:va:vital:500:1:1', 'result': '120/80',
+                              'qualifiers': ['SITTING', 'L ARM'], 'extra': 1}
+
+
+def test_to_dict_matches_eager_normalization():
+    item, calls = _item()
+    assert item.to_dict() == calls.materialize(_RAW)
+    assert item == calls.materialize(_RAW)
+    assert type(copy.deepcopy(item)) is dict
+
+
+def test_clone_is_independent():
+    item, _ = _item()
+    twin = item.clone()
+    assert isinstance(twin, LazyVprItem) and twin is not item
+    twin['qualifiers'].append('CUFF')
+    assert item['qualifiers'] == ['SITTING', 'L ARM']
+    item.materialize()
+    detached = copy_payload({'items': [item]})['items'][0]
+    detached['result'] = 'changed'
+    assert item['result'] == '120/80'
+    assert type(materialize_items([item])[0]) is dict
+
+
+def test_concurrent_readers_see_one_consistent_item():
+    item, _ = _item()
+    barrier = threading.Barrier(8)
+    seen, errors = [], []
+
+    def read():
+        try:
+            barrier.wait()
+            qualifiers = item['qualifiers']
+            snapshot = dict(item.items())
+            seen.append((qualifiers, snapshot))
+        except Exception as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len({id(q) for q, _ in seen}) == 1
+    assert all(snapshot == item.to_dict() for _, snapshot in seen)
@@ -0,0 +1,52 @@
+"""/quick/bundle builds each domain with the same view as /quick/<domain>."""
+from __future__ import annotations
+
+import json
+
+_DOMAINS = ('demographics', 'meds', 'labs', 'vitals', 'problems', 'allergies', 'documents', 'orders', 'notes')
+
+
+def _single(client, domain, query=''):
+    body = client.get(f'/api/patient/1/quick/{domain}{query}').get_json()
+    body.pop('context', None)
+    # The context block wraps list payloads as {'result': [...]}
+    return body['result'] if set(body) == {'result'} else body
+
+
+def test_bundle_parts_match_single_endpoints(client):
+    resp = client.get('/api/patient/1/quick/bundle', query_string={
+        'domains': ','.join(_DOMAINS), 'documents.includeText': '1', 'vitals.includeRaw': '1',
+    })
+    assert resp.status_code == 200
+    bundle = resp.get_json()
+    assert list(bundle['domains']) == list(_DOMAINS)
+    assert bundle['context']['dfn'] == '1'
+    for domain in _DOMAINS:
+        query = {'documents': '?includeText=1', 'vitals': '?includeRaw=1'}.get(domain, '')
+        assert bundle['domains'][domain] == _single(client, domain, query), domain
+        assert bundle['status'][domain] == 200
+    assert len(bundle['domains']['documents']) == 5
+
+
+def test_bundle_rejects_unknown_domains(client):
+    resp = client.get('/api/patient/1/quick/bundle?domains=vitals,bundle')
+    assert resp.status_code == 400
+    assert 'bundle' in resp.get_json()['error']
+
+
+def test_bundle_streams_one_line_per_domain(client):
+    resp = client.get('/api/patient/1/quick/bundle?domains=vitals,documents&stream=1')
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert sorted(line['domain'] for line in lines[:-1]) == ['documents', 'vitals']
+    assert all(line['status'] == 200 for line in lines[:-1])
+    assert lines[-1]['done'] is True and lines[-1]['errors'] == 0
+
+
+def test_bundle_reports_failing_views_per_domain(client, gateway, monkeypatch):
+    def _broken(*_args, **_kwargs):
+        raise RuntimeError('vitals unavailable')
+
+    monkeypatch.setattr(gateway, 'get_vpr_domain', _broken)
+    bundle = client.get('/api/patient/1/quick/bundle?domains=vitals').get_json()
+    assert bundle['status'] == {'vitals': 500}
+    assert bundle['domains']['vitals'] == {'error': 'vitals unavailable'}
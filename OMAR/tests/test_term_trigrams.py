@@ -0,0 +1,61 @@
+"""Trigram substring and bounded edit-distance expansion (services/term_trigrams.py)."""
+from __future__ import annotations
+
+import pytest
+
+from omar.services.term_trigrams import TermTrigramIndex, edit_distance, max_edits, padded_trigrams
+
+_VOCAB = sorted(['metformin', 'metoprolol', 'hypertension', 'hypotension', 'medication',
+                 'medications', 'assessment', 'abcxbcd', 'pain', 'plan'])
+
+
+@pytest.fixture(scope='module')
+def index():
+    return TermTrigramIndex(_VOCAB)
+
+
+@pytest.mark.parametrize('term, budget', [
+    ('', 0), ('pan', 0), ('pain', 1), ('metform', 1), ('metfromi', 2), ('hypertensoin', 2),
+])
+def test_max_edits_budget(term, budget):
+    assert max_edits(term) == budget
+
+
+@pytest.mark.parametrize('a, b, distance', [
+    ('metformin', 'metformin', 0),
+    ('metfromin', 'metformin', 1),   # adjacent transposition is one edit
+    ('medicaton', 'medication', 1),  # deletion
+    ('asessment', 'assessment', 1),
+    ('hypotension', 'hypertension', 2),
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 2) == distance
+
+
+def test_edit_distance_stops_at_limit():
+    assert edit_distance('metformin', 'metoprolol', 2) == 3
+    assert edit_distance('pain', 'pain' + 'x' * 5, 2) == 3  # length gap alone exceeds the limit
+    assert edit_distance('abc', 'xyz', 0) == 1
+
+
+def test_padded_trigrams_mark_word_edges():
+    assert padded_trigrams('pain') == {'  p', ' pa', 'pai', 'ain', 'in '}
+
+
+def test_substring_confirms_trigram_candidates(index):
+    assert index.substring('tfor') == ['metformin']
+    assert index.substring('tension') == ['hypertension', 'hypotension']
+    # 'abcxbcd' holds both trigrams of 'abcd' but not the fragment itself
+    assert index.substring('abcd') == []
+    assert index.substring('ab') == []
+
+
+def test_fuzzy_respects_limit_and_orders_by_distance(index):
+    assert index.fuzzy('metfromin', 1) == [('metformin', 1)]
+    assert index.fuzzy('medicaton', 2) == [('medication', 1), ('medications', 2)]
+    assert index.fuzzy('hypertensoin', 0) == []
+
+
+def test_fuzzy_excludes_the_query_term(index):
+    assert ('medication', 0) not in index.fuzzy('medication', 2)
+    assert index.fuzzy('medication', 1) == [('medications', 1)]